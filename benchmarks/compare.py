@@ -0,0 +1,56 @@
+"""Compare two benchmark result files.
+
+    python -m benchmarks.compare baseline.json results.json [--threshold 0.1]
+
+Exits with status 1 if the median time of a benchmark grew by more than the
+threshold.
+"""
+
+import argparse
+import sys
+
+from .runner import read_results
+
+
+def compare(baseline: dict, current: dict, threshold) -> list:
+    """Return (name, baseline median, current median, change, regressed)"""
+    rows = []
+    for name, result in sorted(current["benchmarks"].items()):
+        base = baseline["benchmarks"].get(name)
+        if base is None:
+            rows.append((name, None, result["median"], None, False))
+            continue
+        change = result["median"] / base["median"] - 1
+        rows.append(
+            (name, base["median"], result["median"], change, change > threshold)
+        )
+    return rows
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    baseline = read_results(args.baseline)
+    current = read_results(args.current)
+    print(f"{baseline['version']} -> {current['version']}")
+    regressed = False
+    for name, base, median, change, slower in compare(
+        baseline, current, args.threshold
+    ):
+        if base is None:
+            print(f"{name:50} {'new':>10} {median * 1000:10.3f}ms")
+            continue
+        mark = "  REGRESSION" if slower else ""
+        print(
+            f"{name:50} {base * 1000:10.3f}ms {median * 1000:10.3f}ms {change:+8.1%}{mark}"
+        )
+        regressed |= slower
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
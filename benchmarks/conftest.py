@@ -0,0 +1,39 @@
+"""Fixtures for the SunSpec benchmarks.
+
+Run with "pytest benchmarks", results are written to the file given with
+--benchmark-json (benchmarks/results.json by default).
+"""
+
+import json
+from pathlib import Path
+
+import pytest
+
+from .runner import Benchmark
+from .runner import write_results
+
+pytest_plugins = ["tests.conftest"]
+
+MANIFEST = Path(__file__).parent.parent / "custom_components/sunspec/manifest.json"
+
+RESULTS = {}
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--benchmark-json",
+        default=str(Path(__file__).parent / "results.json"),
+        help="File the benchmark results are written to",
+    )
+
+
+def pytest_sessionfinish(session, exitstatus):
+    if RESULTS:
+        version = json.loads(MANIFEST.read_text())["version"]
+        write_results(session.config.getoption("--benchmark-json"), RESULTS, version)
+
+
+@pytest.fixture
+def benchmark(request):
+    """Benchmark named after the test"""
+    return Benchmark(request.node.name, RESULTS)
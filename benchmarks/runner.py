@@ -0,0 +1,71 @@
+"""Timing helpers and result files of the SunSpec benchmarks."""
+
+import json
+import platform
+import statistics
+import time
+
+RESULTS_VERSION = 1
+
+
+class Benchmark:
+    """Times a function over a number of rounds and keeps the statistics"""
+
+    def __init__(self, name, results: dict) -> None:
+        self.name = name
+        self._results = results
+
+    def record(self, timings, ops=1, **extra) -> dict:
+        """Store timings measured by the benchmark itself"""
+        timings = sorted(timings)
+        result = {
+            "rounds": len(timings),
+            "ops": ops,
+            "min": timings[0],
+            "median": statistics.median(timings),
+            "mean": statistics.fmean(timings),
+            "p95": timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+            "p99": timings[min(len(timings) - 1, int(len(timings) * 0.99))],
+            "ops_per_sec": ops / statistics.median(timings),
+        }
+        result.update(extra)
+        self._results[self.name] = result
+        return result
+
+    def run(self, func, rounds=20, ops=1, **extra) -> dict:
+        """Time func(), ops is the number of operations one call does"""
+        timings = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+        return self.record(timings, ops, **extra)
+
+    async def async_run(self, func, rounds=20, ops=1, setup=None, **extra) -> dict:
+        """Time await func(), setup() is called untimed before every round"""
+        timings = []
+        for _ in range(rounds):
+            if setup is not None:
+                setup()
+            start = time.perf_counter()
+            await func()
+            timings.append(time.perf_counter() - start)
+        return self.record(timings, ops, **extra)
+
+
+def write_results(path, results: dict, version):
+    data = {
+        "format": RESULTS_VERSION,
+        "version": version,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "benchmarks": results,
+    }
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(data, file, indent=2, sort_keys=True)
+
+
+def read_results(path) -> dict:
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
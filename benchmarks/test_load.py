@@ -0,0 +1,102 @@
+"""Load tests polling fleets of simulated devices."""
+
+import asyncio
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from custom_components.sunspec.api import SunSpecApiClient
+from custom_components.sunspec.const import TRANSPORT_ASYNCIO
+from custom_components.sunspec.const import TRANSPORT_EXECUTOR
+from tests.modbus_server import ModbusSimulator
+
+MODEL_IDS = [103, 160]
+ROUNDS = 5
+# Devices scanned at the same time, a scan keeps the event loop busy
+SCAN_CONCURRENCY = 10
+
+
+class SimulatorThread:
+    """Run the simulator on its own event loop, like devices on the network"""
+
+    def __init__(self, simulator) -> None:
+        self.simulator = simulator
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        asyncio.run_coroutine_threadsafe(self.simulator.start(), self.loop).result()
+        return self.simulator
+
+    def __exit__(self, *args):
+        asyncio.run_coroutine_threadsafe(self.simulator.stop(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+
+def reset_caches():
+    SunSpecApiClient.CLIENT_CACHE = {}
+    SunSpecApiClient.GATEWAY_CACHE = {}
+    SunSpecApiClient.ASYNC_CLIENT_CACHE = {}
+    SunSpecApiClient.ASYNC_GATEWAY_CACHE = {}
+
+
+@pytest.mark.parametrize(
+    "transport,ports,units",
+    [
+        (TRANSPORT_EXECUTOR, 5, 10),
+        (TRANSPORT_ASYNCIO, 5, 10),
+        (TRANSPORT_ASYNCIO, 10, 50),
+    ],
+)
+async def test_fleet_poll(hass, benchmark, socket_enabled, transport, ports, units):
+    reset_caches()
+    # Debug mode records a traceback for every future, far more than a poll costs
+    hass.loop.set_debug(False)
+    simulator = ModbusSimulator(ports=ports, units=units, latency=0.002, jitter=0.002)
+    with SimulatorThread(simulator):
+        await poll_fleet(hass, benchmark, simulator, transport)
+    reset_caches()
+
+
+async def poll_fleet(hass, benchmark, simulator, transport):
+    apis = [
+        SunSpecApiClient(
+            host=host, port=port, slave_id=unit_id, hass=hass, transport=transport
+        )
+        for host, port, unit_id in simulator.devices
+    ]
+    semaphore = asyncio.Semaphore(SCAN_CONCURRENCY)
+
+    async def scan(api):
+        async with semaphore:
+            await api.async_read_models(MODEL_IDS)
+
+    with patch("sunspec2.modbus.client.time.sleep"):
+        await asyncio.gather(*[scan(api) for api in apis])
+
+    async def poll(api):
+        api.wrapper_cache = {}
+        start = time.perf_counter()
+        await api.async_read_models(MODEL_IDS)
+        return time.perf_counter() - start
+
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        latencies += await asyncio.gather(*[poll(api) for api in apis])
+    elapsed = time.perf_counter() - start
+
+    benchmark.record(
+        latencies,
+        devices=len(apis),
+        polls_per_sec=len(latencies) / elapsed,
+        requests=simulator.requests,
+    )
+
+    for api in apis:
+        await api.async_close()
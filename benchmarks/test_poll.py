@@ -0,0 +1,55 @@
+"""Benchmarks of a coordinator update over Modbus TCP."""
+
+from unittest.mock import patch
+
+import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.sunspec import SunSpecDataUpdateCoordinator
+from custom_components.sunspec.api import SunSpecApiClient
+from custom_components.sunspec.const import CONF_ENABLED_MODELS
+from custom_components.sunspec.const import DOMAIN
+from custom_components.sunspec.const import TRANSPORT_ASYNCIO
+from custom_components.sunspec.const import TRANSPORT_EXECUTOR
+from tests.const import MOCK_CONFIG
+
+MODEL_IDS = [1, 103, 160, 304, 701, 702, 704]
+
+
+def reset_caches():
+    SunSpecApiClient.CLIENT_CACHE = {}
+    SunSpecApiClient.GATEWAY_CACHE = {}
+    SunSpecApiClient.ASYNC_CLIENT_CACHE = {}
+    SunSpecApiClient.ASYNC_GATEWAY_CACHE = {}
+
+
+@pytest.mark.parametrize("delay", [0, 0.005])
+@pytest.mark.parametrize("transport", [TRANSPORT_EXECUTOR, TRANSPORT_ASYNCIO])
+async def test_update_data(hass, benchmark, modbus_server, transport, delay):
+    reset_caches()
+    host, port = modbus_server.address
+    entry = MockConfigEntry(
+        domain=DOMAIN, data=MOCK_CONFIG, options={CONF_ENABLED_MODELS: MODEL_IDS}
+    )
+    api = SunSpecApiClient(
+        host=host, port=port, slave_id=1, hass=hass, transport=transport
+    )
+    coordinator = SunSpecDataUpdateCoordinator(hass, client=api, entry=entry)
+    with patch("sunspec2.modbus.client.time.sleep"):
+        coordinator.data = await coordinator._async_update_data()
+    modbus_server.delay = delay
+
+    def setup():
+        # Read every model again as if all of them were due
+        api.wrapper_cache = {}
+        coordinator.scheduler.expire(MODEL_IDS)
+
+    modbus_server.requests.clear()
+    result = await benchmark.async_run(
+        coordinator._async_update_data, rounds=10, setup=setup, delay=delay
+    )
+    result["requests_per_update"] = len(modbus_server.requests) / result["rounds"]
+
+    coordinator.unsub()
+    await coordinator.async_close()
+    reset_caches()
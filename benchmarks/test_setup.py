@@ -0,0 +1,46 @@
+"""Benchmark of creating the entities of a device."""
+
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.sunspec import SunSpecDataUpdateCoordinator
+from custom_components.sunspec.api import SunSpecApiClient
+from custom_components.sunspec.const import CONF_ENABLED_MODELS
+from custom_components.sunspec.const import DOMAIN
+from custom_components.sunspec.entity import SunSpecEntity
+from custom_components.sunspec.sensor import create_device_callback
+from tests.const import MOCK_CONFIG
+
+
+async def test_setup_entities(hass, benchmark, sunspec_modbus_device_mock):
+    SunSpecApiClient.CLIENT_CACHE = {}
+    model_ids = [
+        m for m in sunspec_modbus_device_mock.models if type(m) is int and m != 1
+    ]
+    entry = MockConfigEntry(
+        domain=DOMAIN, data=MOCK_CONFIG, options={CONF_ENABLED_MODELS: model_ids}
+    )
+    api = SunSpecApiClient(host="test", port=123, slave_id=1, hass=hass)
+    coordinator = SunSpecDataUpdateCoordinator(hass, client=api, entry=entry)
+    await coordinator.async_refresh()
+    await api.asynch_first_read()
+    hass.data.setdefault(DOMAIN, {})[entry.entry_id] = coordinator
+    points = sum(
+        len(wrapper.getKeys()) * wrapper.num_models
+        for wrapper in coordinator.data.values()
+    )
+    entities = []
+
+    async def setup():
+        entities.clear()
+        await SunSpecEntity.async_setup_entry(
+            hass, entry, entities.extend, create_device_callback
+        )
+
+    result = await benchmark.async_run(setup, rounds=10, ops=points, points=points)
+    result["per_1k_points"] = result["median"] * 1000 / points
+    assert entities
+
+    hass.data[DOMAIN].pop(entry.entry_id)
+    coordinator.unsub()
+    await coordinator.async_close()
+    SunSpecApiClient.CLIENT_CACHE = {}
@@ -0,0 +1,48 @@
+"""Benchmarks of the model wrapper lookups."""
+
+import pytest
+
+from custom_components.sunspec.api import SunSpecModelWrapper
+from custom_components.sunspec.planner import ReadPlan
+from tests.conftest import MockFileClientDevice
+from tests.conftest import MockModbusClientDevice
+
+
+def create_wrappers(source) -> list:
+    """Wrappers of the test models with entities, decoded in bulk for the modbus source"""
+    if source == "file":
+        device = MockFileClientDevice("./tests/test_data/inverter.json")
+        device.scan()
+        images = {}
+    else:
+        device = MockModbusClientDevice()
+        device.scan(connect=False, full_model_read=False)
+        images = ReadPlan(device.model_list).execute(device.read)
+    return [
+        SunSpecModelWrapper(models, images)
+        for model_id, models in device.models.items()
+        # The common model only provides the device info
+        if type(model_id) is int and model_id != 1
+    ]
+
+
+def point_keys(wrappers) -> list:
+    return [(wrapper, key) for wrapper in wrappers for key in wrapper.getKeys()]
+
+
+@pytest.mark.parametrize("source", ["file", "modbus"])
+def test_get_keys(benchmark, source):
+    wrappers = create_wrappers(source)
+    benchmark.run(lambda: [w.getKeys() for w in wrappers], ops=len(wrappers))
+
+
+@pytest.mark.parametrize("source", ["file", "modbus"])
+def test_get_point(benchmark, source):
+    keys = point_keys(create_wrappers(source))
+    benchmark.run(lambda: [w.getPoint(key) for w, key in keys], ops=len(keys))
+
+
+@pytest.mark.parametrize("source", ["file", "modbus"])
+def test_get_value(benchmark, source):
+    keys = point_keys(create_wrappers(source))
+    benchmark.run(lambda: [w.getValue(key) for w, key in keys], ops=len(keys))
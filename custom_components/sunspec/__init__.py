@@ -8,23 +8,48 @@ https://github.com/cjne/ha-sunspec
 import asyncio
 from datetime import timedelta
 import logging
+import time
 
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import EVENT_HOMEASSISTANT_CLOSE
 from homeassistant.core_config import Config
 from homeassistant.core import HomeAssistant
+from homeassistant.core import callback
+from homeassistant.helpers.event import async_call_later
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
 from homeassistant.helpers.update_coordinator import UpdateFailed
 
 from .api import SunSpecApiClient
+from .connection import DEFAULT_IDLE_TIMEOUT
+from .connection import PREWARM_TIME
+from .const import CONF_CACHE_TTLS
+from .const import CONF_DEADBANDS
 from .const import CONF_ENABLED_MODELS
 from .const import CONF_HOST
+from .const import CONF_IDLE_TIMEOUT
+from .const import CONF_LOOP_BLOCK_THRESHOLD
+from .const import CONF_MAX_AGE
+from .const import CONF_MODEL_INTERVALS
+from .const import CONF_POINT_DEADBANDS
 from .const import CONF_PORT
 from .const import CONF_SCAN_INTERVAL
+from .const import CONF_SETTLE_TIMES
 from .const import CONF_SLAVE_ID
+from .const import CONF_TRANSPORT
 from .const import DEFAULT_MODELS
+from .const import DEFAULT_TRANSPORT
 from .const import DOMAIN
 from .const import PLATFORMS
 from .const import STARTUP_MESSAGE
+from .deadband import DEFAULT_MAX_AGE
+from .deadband import DeadbandFilter
+from .fleet import get_fleet_scheduler
+from .loop_monitor import LoopMonitor
+from .loop_monitor import monitored
+from .profiler import async_setup_services
+from .schedule import ModelScheduler
+from .worker import shutdown_workers
+from .write_queue import WriteQueue
 
 SCAN_INTERVAL = timedelta(seconds=30)
 
@@ -33,6 +58,12 @@ _LOGGER: logging.Logger = logging.getLogger(__package__)
 
 async def async_setup(hass: HomeAssistant, config: Config):
     """Set up this integration using YAML is not supported."""
+    async_setup_services(hass)
+
+    async def _async_stop_workers(event):
+        await hass.async_add_executor_job(shutdown_workers)
+
+    hass.bus.async_listen_once(EVENT_HOMEASSISTANT_CLOSE, _async_stop_workers)
     return True
 
 
@@ -45,8 +76,19 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
     host = entry.data.get(CONF_HOST)
     port = entry.data.get(CONF_PORT)
     slave_id = entry.data.get(CONF_SLAVE_ID, 1)
+    idle_timeout = entry.options.get(CONF_IDLE_TIMEOUT, DEFAULT_IDLE_TIMEOUT)
+    transport = entry.options.get(CONF_TRANSPORT, DEFAULT_TRANSPORT)
 
-    client = SunSpecApiClient(host, port, slave_id, hass)
+    client = SunSpecApiClient(
+        host,
+        port,
+        slave_id,
+        hass,
+        idle_timeout=idle_timeout,
+        transport=transport,
+        settle_times=entry.options.get(CONF_SETTLE_TIMES),
+        cache_ttls=entry.options.get(CONF_CACHE_TTLS),
+    )
 
     _LOGGER.debug("Setup conifg entry for SunSpec")
     coordinator = SunSpecDataUpdateCoordinator(hass, client=client, entry=entry)
@@ -73,6 +115,7 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     if unloaded:
         coordinator = hass.data[DOMAIN].pop(entry.entry_id)
         coordinator.unsub()
+        await coordinator.async_close()
 
     return True  # unloaded
 
@@ -111,6 +154,36 @@ class SunSpecDataUpdateCoordinator(DataUpdateCoordinator):
             )
         )
         self.option_model_filter = set(map(lambda m: int(m), models))
+        self.scheduler = ModelScheduler(
+            entry.options.get(CONF_MODEL_INTERVALS, {}),
+            int(scan_interval.total_seconds()),
+        )
+        self.write_queue = WriteQueue(hass, self)
+        self.deadbands = DeadbandFilter(
+            entry.options.get(CONF_DEADBANDS, ""),
+            entry.options.get(CONF_POINT_DEADBANDS, ""),
+            entry.options.get(CONF_MAX_AGE, DEFAULT_MAX_AGE),
+        )
+        self._model_ids = None
+        self._model_ids_state = None
+        # Entity state writes done and skipped because nothing changed
+        self.state_writes = 0
+        self.state_writes_skipped = 0
+        self._model_listeners = {}
+        # Set by the profile service while the next refreshes are profiled
+        self.profiler = None
+        loop_block_threshold = entry.options.get(CONF_LOOP_BLOCK_THRESHOLD, 0)
+        if loop_block_threshold:
+            client.loop_monitor = LoopMonitor(
+                f"{entry.data.get(CONF_HOST)}:{entry.data.get(CONF_PORT)}:"
+                f"{entry.data.get(CONF_SLAVE_ID)}",
+                loop_block_threshold / 1000,
+            )
+        self.gateway = f"{entry.data.get(CONF_HOST)}:{entry.data.get(CONF_PORT)}"
+        self.fleet = get_fleet_scheduler(hass)
+        self._phase_delay = self.fleet.register(self, self.gateway, self.scheduler.tick)
+        self._cancel_idle_close = None
+        self._cancel_prewarm = None
         self.unsub = entry.add_update_listener(async_reload_entry)
         _LOGGER.debug(
             "Setup entry with models %s, scan interval %s. IP: %s Port: %s ID: %s",
@@ -120,23 +193,154 @@ class SunSpecDataUpdateCoordinator(DataUpdateCoordinator):
             entry.data.get(CONF_PORT),
             entry.data.get(CONF_SLAVE_ID),
         )
-        super().__init__(hass, _LOGGER, name=DOMAIN, update_interval=scan_interval)
+        super().__init__(
+            hass,
+            _LOGGER,
+            name=DOMAIN,
+            update_interval=timedelta(seconds=self.scheduler.tick),
+        )
+
+    @property
+    def loop_monitor(self):
+        return self.api.loop_monitor
+
+    @monitored
+    async def _async_refresh(self, *args, **kwargs):
+        """Refresh the data and the entities, profiled if requested"""
+        profiler = self.profiler
+        if profiler is None:
+            return await super()._async_refresh(*args, **kwargs)
+        with profiler.section():
+            await super()._async_refresh(*args, **kwargs)
+        profiler.refresh_done(self)
 
     async def _async_update_data(self):
         """Update data via library."""
+        if self._phase_delay and self.data is not None:
+            # Move the polls of this device to its phase in the fleet, once
+            delay, self._phase_delay = self._phase_delay, 0
+            await asyncio.sleep(delay)
+        async with self.fleet.poll(self.gateway):
+            return await self._async_poll()
+
+    async def _async_poll(self):
         _LOGGER.debug("SunSpec Update data coordinator update")
         data = {}
+        start = time.monotonic()
         try:
-            model_ids = self.option_model_filter & set(
-                await self.api.async_get_models()
-            )
-            _LOGGER.debug("SunSpec Update data got models %s", model_ids)
+            model_ids = await self._async_get_model_ids()
+            previous = self.data or {}
+            due = self.scheduler.due(model_ids) | (model_ids - previous.keys())
+            _LOGGER.debug("SunSpec Update data got models %s, due %s", model_ids, due)
 
+            # Read all models with as few requests as possible
+            wrappers = await self.api.async_read_models(due)
             for model_id in model_ids:
-                data[model_id] = await self.api.async_get_data(model_id)
-            self.api.close()
+                if model_id in due:
+                    data[model_id] = wrappers[model_id]
+                else:
+                    data[model_id] = previous[model_id]
+            self.scheduler.mark_read(due)
+            self._schedule_keepalive()
+            self.api.telemetry.record_refresh(time.monotonic() - start)
             return data
         except Exception as exception:
             _LOGGER.warning(exception)
+            self.api.telemetry.record_refresh(time.monotonic() - start, failed=True)
+            self._model_ids = None
             self.api.reconnect_next()
+            # Reconnect now so the next poll does not pay for it
+            self.hass.async_create_background_task(
+                self.api.async_reconnect(), f"{DOMAIN} reconnect"
+            )
             raise UpdateFailed() from exception
+
+    @callback
+    def async_add_model_listener(self, model_id, update_callback):
+        """Listen for refreshes of a single model, returns a function removing the listener"""
+        listeners = self._model_listeners.setdefault(model_id, set())
+        listeners.add(update_callback)
+
+        @callback
+        def remove_listener():
+            listeners.discard(update_callback)
+
+        return remove_listener
+
+    @monitored
+    async def async_refresh_models(self, model_ids):
+        """Re-read only model_ids and update the entities of those models"""
+        model_ids = set(model_ids) & (self.data or {}).keys()
+        if not model_ids:
+            return
+        _LOGGER.debug("SunSpec refreshing models %s", model_ids)
+        if self.profiler is not None:
+            with self.profiler.section():
+                await self._async_refresh_models(model_ids)
+            return
+        await self._async_refresh_models(model_ids)
+
+    async def _async_refresh_models(self, model_ids):
+        # Not from the wrapper cache or a read that started before the write
+        wrappers = await self.api.async_read_models(model_ids, force=True)
+        self.data = {
+            **self.data,
+            **{model_id: wrappers[model_id] for model_id in model_ids},
+        }
+        self.scheduler.mark_read(model_ids)
+        for model_id in model_ids:
+            for update_callback in list(self._model_listeners.get(model_id, ())):
+                update_callback()
+
+    @property
+    def state_write_skip_rate(self) -> float:
+        """Share of entity updates that did not need a state write"""
+        total = self.state_writes + self.state_writes_skipped
+        return self.state_writes_skipped / total if total else 0.0
+
+    async def _async_get_model_ids(self) -> set:
+        """Enabled models present on the device, cached until the connection changes"""
+        state = self.api.connection_state()
+        if self._model_ids is None or state is None or state != self._model_ids_state:
+            self._model_ids = self.option_model_filter & set(
+                await self.api.async_get_models()
+            )
+            self._model_ids_state = self.api.connection_state()
+        return self._model_ids
+
+    def _schedule_keepalive(self):
+        """Close the connection when idle and reopen it ahead of the next poll"""
+        self._cancel_keepalive()
+        idle_timeout = self.api.connection.idle_timeout if self.api.connection else None
+        if idle_timeout is None or self.update_interval is None:
+            return
+        interval = self.update_interval.total_seconds()
+        if idle_timeout + PREWARM_TIME >= interval:
+            return
+        self._cancel_idle_close = async_call_later(
+            self.hass, idle_timeout, self._async_idle_close
+        )
+        self._cancel_prewarm = async_call_later(
+            self.hass, interval - PREWARM_TIME, self._async_prewarm
+        )
+
+    def _cancel_keepalive(self):
+        for cancel in (self._cancel_idle_close, self._cancel_prewarm):
+            if cancel is not None:
+                cancel()
+        self._cancel_idle_close = self._cancel_prewarm = None
+
+    async def _async_idle_close(self, _now):
+        self._cancel_idle_close = None
+        await self.api.async_close_idle()
+
+    async def _async_prewarm(self, _now):
+        self._cancel_prewarm = None
+        await self.api.async_reconnect()
+
+    async def async_close(self):
+        """Stop keepalive handling and close the connection"""
+        self._cancel_keepalive()
+        self.fleet.unregister(self)
+        await self.write_queue.async_shutdown()
+        await self.api.async_close()
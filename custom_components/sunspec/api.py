@@ -1,22 +1,44 @@
 """Sample API Client."""
 
+import asyncio
 import logging
 import socket
 import threading
-from datetime import (datetime)
 import time
 from types import SimpleNamespace
+import weakref
 
 from homeassistant.core import HomeAssistant
 import sunspec2.modbus.client as modbus_client
 from sunspec2.modbus.client import SunSpecModbusClientException
 from sunspec2.modbus.client import SunSpecModbusClientTimeout
 from sunspec2.modbus.modbus import ModbusClientError
+from sunspec2.modbus.modbus import ModbusClientException
+
+from .connection import DEFAULT_IDLE_TIMEOUT
+from .connection import SunSpecConnection
+from .const import DEFAULT_TRANSPORT
+from .const import NAMEPLATE_MODELS
+from .const import TRANSPORT_ASYNCIO
+from .decode import decode_model
+from .gateway import SunSpecGateway
+from .loop_monitor import monitored
+from .planner import ScaleFactorCache
+from .planner import WritePlan
+from .planner import dirty_points
+from .planner import discard_changes
+from .scan_cache import async_get_scan_cache
+from .scan_cache import create_model_map
+from .scan_cache import restore_model_map
+from .scan_cache import verify_reads
+from .telemetry import DeviceTelemetry
+from .timeouts import CONNECT_TIMEOUT
+from .transport import AsyncModbusTCPClient
+from .transport import AsyncSunSpecModbusDevice
+from .worker import get_worker
 
 #from .entity import SunSpecEntity
 
-TIMEOUT = 120
-
 _LOGGER: logging.Logger = logging.getLogger(__package__)
 
 
@@ -28,11 +50,38 @@ class ConnectionError(Exception):
     pass
 
 
+# Point lookup tables, kept for as long as the pysunspec2 model object lives
+_POINT_INDEX = weakref.WeakKeyDictionary()
+
+
+def point_index(model) -> dict:
+    """Map the point keys used by the entities to the points of a model"""
+    index = _POINT_INDEX.get(model)
+    if index is None:
+        index = dict(model.points)
+        for group_name, model_group in model.groups.items():
+            groups = model_group if type(model_group) is list else [model_group]
+            for idx, group in enumerate(groups):
+                for name, point in group.points.items():
+                    index[f"{group_name}:{idx}:{name}"] = point
+        _POINT_INDEX[model] = index
+    return index
+
+
 class SunSpecModelWrapper:
-    def __init__(self, models) -> None:
+    def __init__(self, models, images=None) -> None:
         """Sunspec model wrapper"""
         self._models = models
         self.num_models = len(models)
+        self._index = [point_index(model) for model in models]
+        # Values decoded in bulk from the registers read, None where the
+        # values have to come from the pysunspec2 points, as for models with
+        # changes that have not been written yet
+        images = images or {}
+        self._snapshots = [
+            None if dirty_points(model) else decode_model(model, images.get(model))
+            for model in models
+        ]
 
     def isValidPoint(self, point_name):
         point = self.getPoint(point_name)
@@ -68,23 +117,41 @@ class SunSpecModelWrapper:
                 keys.extend(filter(self.isValidPoint, group_keys))
         return keys
 
+    def _snapshotSlot(self, point_name, model_index):
+        snapshot = self._snapshots[model_index]
+        if snapshot is None:
+            return None, None
+        return snapshot, snapshot.slot(point_name)
+
     def setValueRaw(self, point_name, new_value, model_index=0): 
         point = self.getPoint(point_name, model_index)
         point.value = new_value
+        # The points now hold values that differ from the registers read
+        self._snapshots[model_index] = None
 
     def getValueRaw(self, point_name, model_index=0):
+        snapshot, slot = self._snapshotSlot(point_name, model_index)
+        if slot is not None:
+            return snapshot.values[slot]
         point = self.getPoint(point_name, model_index)
         return point.value
 
     def setValue(self, point_name, new_value, model_index=0): 
         point = self.getPoint(point_name, model_index)
         point.cvalue = new_value
+        self._snapshots[model_index] = None
 
     def getValue(self, point_name, model_index=0):
+        snapshot, slot = self._snapshotSlot(point_name, model_index)
+        if slot is not None:
+            return snapshot.cvalues[slot]
         point = self.getPoint(point_name, model_index)
         return point.cvalue
 
     def getSf(self, point_name, model_index=0):
+        snapshot, slot = self._snapshotSlot(point_name, model_index)
+        if slot is not None:
+            return snapshot.sfs[slot]
         point = self.getPoint(point_name, model_index)
         point.cvalue
         return point.sf_value
@@ -96,6 +163,12 @@ class SunSpecModelWrapper:
         return self._models[0].gdef
 
     def getPoint(self, point_name, model_index=0):
+        point = self._index[model_index].get(point_name)
+        if point is not None:
+            return point
+        return self._findPoint(point_name, model_index)
+
+    def _findPoint(self, point_name, model_index):
         point_path = point_name.split(":")
         if len(point_path) == 1:
             return self._models[model_index].points[point_name]
@@ -113,15 +186,25 @@ class SunSpecModelWrapper:
             ]  # Generic access if no specific subgrouping is specified
 
 
+# Seconds a model read is served from the wrapper cache
+CACHE_TTL = 1
+NAMEPLATE_CACHE_TTL = 60
+
+
+def default_cache_ttl(model_id) -> float:
+    """Seconds a read of model_id is cached unless configured otherwise"""
+    return NAMEPLATE_CACHE_TTL if model_id in NAMEPLATE_MODELS else CACHE_TTL
+
+
 class ModelWrapperCacheItem:
-    def __init__(self, wrapper: SunSpecModelWrapper) -> None:
+    def __init__(self, wrapper: SunSpecModelWrapper, ttl=CACHE_TTL) -> None:
         """Sunspec model wrapper"""
         self.wrapper = wrapper
-        self.time = datetime.now()
+        self.ttl = ttl
+        self.time = time.monotonic()
 
     def isExpired(self) -> bool:
-        duration = datetime.now() - self.time
-        return (duration.total_seconds() > 1)
+        return time.monotonic() - self.time > self.ttl
 
     
 # pragma: not covered
@@ -132,9 +215,21 @@ def progress(msg):
 
 class SunSpecApiClient:
     CLIENT_CACHE = {}
+    ASYNC_CLIENT_CACHE = {}
+    GATEWAY_CACHE = {}
+    GATEWAY_LOCK = threading.Lock()
+    ASYNC_GATEWAY_CACHE = {}
 
     def __init__(
-        self, host: str, port: int, slave_id: int, hass: HomeAssistant
+        self,
+        host: str,
+        port: int,
+        slave_id: int,
+        hass: HomeAssistant,
+        idle_timeout=DEFAULT_IDLE_TIMEOUT,
+        transport=DEFAULT_TRANSPORT,
+        settle_times=None,
+        cache_ttls=None,
     ) -> None:
         """Sunspec modbus client."""
 
@@ -143,28 +238,210 @@ class SunSpecApiClient:
         self._port = port
         self._hass = hass
         self._slave_id = slave_id
+        self._idle_timeout = idle_timeout
+        self._transport = transport
+        self._settle_times = {
+            int(model_id): float(seconds)
+            for model_id, seconds in (settle_times or {}).items()
+        }
+        self._cache_ttls = {
+            int(model_id): float(seconds)
+            for model_id, seconds in (cache_ttls or {}).items()
+        }
         self._client_key = f"{host}:{port}:{slave_id}"
         self._lock = threading.Lock()
         self._reconnect = False
         self.first_wrapper: SunSpecModelWrapper = None
         self.wrapper_cache = {}
+        # Futures of the reads in progress, by model id
+        self._inflight = {}
+        self.sf_cache = ScaleFactorCache()
+        self._sf_connection_state = None
         self.lock = threading.Lock() 
+        self.async_lock = asyncio.Lock()
+        self._scan_cache = None
+        # The models of the connection come from the scan cache
+        self._model_map_cached = False
+        self.telemetry = DeviceTelemetry()
+        # Set to a LoopMonitor to find calls blocking the event loop
+        self.loop_monitor = None
+
+    async def async_load_scan_cache(self):
+        if self._scan_cache is None:
+            self._scan_cache = await async_get_scan_cache(self._hass)
+
+    def _cached_model_map(self, key):
+        if self._scan_cache is None:
+            return None
+        return self._scan_cache.get(key)
+
+    def _store_model_map(self, key, client):
+        if self._scan_cache is not None:
+            self._scan_cache.set(key, create_model_map(client))
+
+    def _remove_model_map(self, key):
+        if self._scan_cache is not None:
+            self._scan_cache.remove(key)
+
+    def _forget_model_map(self):
+        """Drop the cached models after a read the device refused, the next connect scans"""
+        if not self._model_map_cached:
+            return
+        self._model_map_cached = False
+        _LOGGER.warning(
+            f"Reading {self._client_key} failed with the cached model map, rescanning"
+        )
+        self._remove_model_map(self._client_key)
+        if self.use_asyncio:
+            SunSpecApiClient.ASYNC_CLIENT_CACHE.pop(self._client_key, None)
+        else:
+            SunSpecApiClient.CLIENT_CACHE.pop(self._client_key, None)
+
+    def _sf_read_plan(self, models):
+        """Read plan using the cached scale factors of this connection"""
+        state = self.connection_state()
+        if state != self._sf_connection_state:
+            # Scale factors may have changed while we were not connected
+            self.sf_cache.invalidate()
+            self._sf_connection_state = state
+        return self.sf_cache.plan(models)
+
+    def cache_ttl(self, model_id) -> float:
+        """Seconds a read of model_id is served from the wrapper cache"""
+        ttl = self._cache_ttls.get(model_id)
+        if ttl is None:
+            return default_cache_ttl(model_id)
+        return ttl
+
+    def settle_time(self, model_id) -> float:
+        """Seconds to wait after writing model_id before it is read back"""
+        return self._settle_times.get(model_id, 0)
+
+    @property
+    def use_asyncio(self) -> bool:
+        return self._transport == TRANSPORT_ASYNCIO
+
+    @property
+    def connection(self):
+        if self.use_asyncio:
+            device = SunSpecApiClient.ASYNC_CLIENT_CACHE.get(self._client_key, None)
+            return device.transport if device is not None else None
+        return SunSpecApiClient.CLIENT_CACHE.get(self._client_key, None)
+
+    @staticmethod
+    def get_gateway(host, port) -> SunSpecGateway:
+        """Return the connection shared by all slave ids behind host:port"""
+        key = f"{host}:{port}"
+        with SunSpecApiClient.GATEWAY_LOCK:
+            gateway = SunSpecApiClient.GATEWAY_CACHE.get(key, None)
+            if gateway is None:
+                gateway = SunSpecGateway(host, port)
+                SunSpecApiClient.GATEWAY_CACHE[key] = gateway
+        return gateway
+
+    @staticmethod
+    def get_async_gateway(host, port, idle_timeout) -> AsyncModbusTCPClient:
+        key = f"{host}:{port}"
+        transport = SunSpecApiClient.ASYNC_GATEWAY_CACHE.get(key, None)
+        if transport is None:
+            transport = AsyncModbusTCPClient(host, port, idle_timeout=idle_timeout)
+            SunSpecApiClient.ASYNC_GATEWAY_CACHE[key] = transport
+        return transport
+
+    def connection_state(self):
+        """Identify the device models and connection, changes on reconnect or rescan"""
+        if self.use_asyncio:
+            device = SunSpecApiClient.ASYNC_CLIENT_CACHE.get(self._client_key, None)
+            if device is None:
+                return None
+            return (id(device), device.transport.connect_count)
+        cached = SunSpecApiClient.CLIENT_CACHE.get(self._client_key, None)
+        if cached is None:
+            return None
+        return (id(cached.client), cached.connect_count)
 
     def get_client(self, config=None):
-        cached = SunSpecApiClient.CLIENT_CACHE.get(self._client_key, None)
+        cached = self.connection
         if cached is None or config is not None:
             _LOGGER.debug("Not using cached connection")
-            cached = self.modbus_connect(config)
+            cached = SunSpecConnection(self.modbus_connect(config), self._idle_timeout)
+            cached.mark_connected()
             SunSpecApiClient.CLIENT_CACHE[self._client_key] = cached
         if self._reconnect:
             if self.check_port():
+                cached.close()
                 cached.connect()
                 self._reconnect = False
+        return cached.ensure_connected()
+
+    async def _async_io(self, func, *args):
+        """Run blocking Modbus I/O on the worker thread of the gateway"""
+        worker = get_worker(f"{self._host}:{self._port}")
+        return await worker.async_run(func, *args, queue_wait=self.telemetry.io_wait)
+
+    @monitored
+    async def async_get_client(self, config=None):
+        await self.async_load_scan_cache()
+        if self.use_asyncio:
+            return await self.async_get_asyncio_client(config)
+        return await self._async_io(self.get_client, config)
+
+    @monitored
+    async def async_get_asyncio_client(self, config=None) -> AsyncSunSpecModbusDevice:
+        """Return the device using the asyncio transport, scanning it on first use"""
+        cached = SunSpecApiClient.ASYNC_CLIENT_CACHE.get(self._client_key, None)
+        if cached is None or config is not None:
+            use_config = config or {
+                "host": self._host,
+                "port": self._port,
+                "slave_id": self._slave_id,
+            }
+            _LOGGER.debug(
+                f"Asyncio client connect to IP {use_config['host']} port {use_config['port']} slave id {use_config['slave_id']}"
+            )
+            transport = self.get_async_gateway(
+                use_config["host"], use_config["port"], self._idle_timeout
+            )
+            device = AsyncSunSpecModbusDevice(
+                transport, use_config["slave_id"], self.telemetry
+            )
+            key = f"{use_config['host']}:{use_config['port']}:{use_config['slave_id']}"
+            try:
+                self._model_map_cached = await self._async_restore_model_map(
+                    key, device
+                )
+                if not self._model_map_cached:
+                    await device.async_scan()
+                    self._store_model_map(key, device)
+            except ModbusClientError as err:
+                raise ConnectionError(
+                    f"Failed to connect to {use_config['host']}:{use_config['port']} slave id {use_config['slave_id']}"
+                ) from err
+            SunSpecApiClient.ASYNC_CLIENT_CACHE[self._client_key] = device
+            cached = device
+        if self._reconnect:
+            await cached.transport.connect(self.telemetry)
+            self._reconnect = False
         return cached
 
-    def async_get_client(self, config=None):
-        return self._hass.async_add_executor_job(self.get_client, config)
+    async def _async_restore_model_map(self, key, device) -> bool:
+        """Recreate the models of the asyncio device from the scan cache"""
+        entry = self._cached_model_map(key)
+        if entry is None:
+            return False
+        try:
+            data = [await device.async_read(*read) for read in verify_reads(entry)]
+        except ModbusClientException as err:
+            data = None
+            _LOGGER.debug(f"Validating cached model map failed: {err}")
+        if data is not None and restore_model_map(device, entry, data):
+            _LOGGER.debug(f"Using cached model map for {key}")
+            return True
+        _LOGGER.debug(f"Cached model map for {key} does not match the device")
+        self._remove_model_map(key)
+        return False
 
+    @monitored
     async def async_get_data(self, model_id) -> SunSpecModelWrapper:
         try:
             _LOGGER.debug("Get data for model %s", model_id)
@@ -176,17 +453,142 @@ class SunSpecApiClient:
             _LOGGER.warning("Async get data connect_error")
             raise ConnectionError() from connect_error
 
-    async def read(self, model_id) -> SunSpecModelWrapper:
+    def _cached_wrapper(self, model_id):
         cached = self.wrapper_cache.get(model_id)
         if (cached is not None) and not (cached.isExpired()):
-            _LOGGER.debug (f"Returning {model_id} from cache as it has been less than 1 second")
             return cached.wrapper
-        wrapper: SunSpecModelWrapper = await self._hass.async_add_executor_job(self.read_model, model_id)
-        self.wrapper_cache[model_id] = ModelWrapperCacheItem(wrapper)
-        return wrapper
+        return None
+
+    async def _async_shared_read(self, model_ids, read, force=False) -> dict:
+        """Read models using read(missing), joining reads of other callers in progress
+
+        With force all models are read from the device, neither cached
+        wrappers nor reads that started earlier are used.
+        """
+        wrappers = {}
+        waiting = {}
+        missing = []
+        for model_id in model_ids:
+            wrapper = None if force else self._cached_wrapper(model_id)
+            if wrapper is not None:
+                wrappers[model_id] = wrapper
+            elif model_id in self._inflight and not force:
+                waiting[model_id] = self._inflight[model_id]
+            else:
+                missing.append(model_id)
+        if waiting:
+            _LOGGER.debug(f"Waiting for reads of models {list(waiting)} in progress")
+        if missing:
+            futures = {
+                model_id: self._hass.loop.create_future() for model_id in missing
+            }
+            self._inflight.update(futures)
+            try:
+                read_wrappers = await read(missing)
+            except BaseException as err:
+                for future in futures.values():
+                    if isinstance(err, Exception):
+                        future.set_exception(err)
+                        # Mark as retrieved, there may be no other caller
+                        future.exception()
+                    else:
+                        future.cancel()
+                raise
+            finally:
+                for model_id in missing:
+                    # A forced read may have taken over the model meanwhile
+                    if self._inflight.get(model_id) is futures[model_id]:
+                        del self._inflight[model_id]
+            for model_id, wrapper in read_wrappers.items():
+                self.wrapper_cache[model_id] = ModelWrapperCacheItem(
+                    wrapper, self.cache_ttl(model_id)
+                )
+                futures[model_id].set_result(wrapper)
+            wrappers.update(read_wrappers)
+        for model_id, future in waiting.items():
+            wrappers[model_id] = await asyncio.shield(future)
+        return wrappers
+
+    @monitored
+    async def async_read_models(self, model_ids, force=False) -> dict:
+        """Read several models with coalesced requests and fill the wrapper cache
+
+        force reads the models from the device, e.g. to read back a write.
+        """
+        return await self._async_shared_read(model_ids, self._async_read_models, force)
+
+    async def _async_read_models(self, model_ids) -> dict:
+        await self.async_load_scan_cache()
+        try:
+            _LOGGER.debug("Get data for models %s", model_ids)
+            if self.use_asyncio:
+                return await self.async_read_models_asyncio(model_ids)
+            return await self._async_io(self.read_models, model_ids)
+        except SunSpecModbusClientTimeout as timeout_error:
+            _LOGGER.warning("Async read models timeout")
+            raise ConnectionTimeoutError() from timeout_error
+        except SunSpecModbusClientException as connect_error:
+            _LOGGER.warning("Async read models connect_error")
+            raise ConnectionError() from connect_error
 
+    async def async_read_models_asyncio(self, model_ids) -> dict:
+        wait_start = time.monotonic()
+        async with self.async_lock:
+            self.telemetry.lock_wait.observe(time.monotonic() - wait_start)
+            device = await self.async_get_asyncio_client()
+            models = {model_id: device.models[model_id] for model_id in model_ids}
+            plan = self._sf_read_plan([m for ms in models.values() for m in ms])
+            start = time.monotonic()
+            try:
+                images = await device.async_read_models(plan.models, plan)
+            except ModbusClientException:
+                self._forget_model_map()
+                raise
+            self.telemetry.record_model_reads(models, time.monotonic() - start)
+            self.sf_cache.update(plan, images)
+        return {
+            model_id: SunSpecModelWrapper(model_list, images)
+            for model_id, model_list in models.items()
+        }
+
+    @monitored
+    async def read(self, model_id) -> SunSpecModelWrapper:
+        if self.use_asyncio:
+            return (await self.async_read_models([model_id]))[model_id]
+        return (await self._async_shared_read([model_id], self._async_read_model))[
+            model_id
+        ]
+
+    async def _async_read_model(self, model_ids) -> dict:
+        await self.async_load_scan_cache()
+        model_id = model_ids[0]
+        return {model_id: await self._async_io(self.read_model, model_id)}
+
+    @monitored
     async def write(self, model_id, model_index) -> SunSpecModelWrapper:
-        return await self._hass.async_add_executor_job(self.write_model, model_id, model_index)
+        await self.async_load_scan_cache()
+        try:
+            await self._async_write(model_id, model_index)
+        finally:
+            # The next read must come from the device, reads that finished
+            # while waiting for the write cached the values from before it
+            self.wrapper_cache.pop(model_id, None)
+
+    async def _async_write(self, model_id, model_index):
+        if self.use_asyncio:
+            wait_start = time.monotonic()
+            async with self.async_lock:
+                self.telemetry.lock_wait.observe(time.monotonic() - wait_start)
+                device = await self.async_get_asyncio_client()
+                model = device.models[model_id][model_index]
+                try:
+                    await device.async_write_model(model)
+                finally:
+                    self.sf_cache.invalidate(model)
+                await asyncio.sleep(self.settle_time(model_id))
+            return
+        await self._async_io(self.write_model, model_id, model_index)
+        await asyncio.sleep(self.settle_time(model_id))
 
     async def async_get_device_info(self) -> SunSpecModelWrapper:
         return await self.read(1)
@@ -194,6 +596,7 @@ class SunSpecApiClient:
     async def asynch_first_read(self):
         self.first_wrapper = await self.async_get_device_info()
 
+    @monitored
     async def async_get_models(self, config=None) -> list:
         _LOGGER.debug("Fetching models")
         client = await self.async_get_client(config)
@@ -203,19 +606,68 @@ class SunSpecApiClient:
     def reconnect_next(self):
         self._reconnect = True
 
+    def reconnect(self):
+        """Reopen the connection, used to reconnect in the background after a failure"""
+        with self.lock:
+            try:
+                self.get_client()
+            except Exception as err:  # pylint: disable=broad-except
+                _LOGGER.debug(f"Background reconnect failed: {err}")
+
+    @monitored
+    async def async_reconnect(self):
+        if self.use_asyncio:
+            try:
+                await self.async_get_asyncio_client()
+            except Exception as err:  # pylint: disable=broad-except
+                _LOGGER.debug(f"Background reconnect failed: {err}")
+            return
+        await self._async_io(self.reconnect)
+
+    @monitored
+    async def async_close_idle(self) -> bool:
+        if self.use_asyncio:
+            connection = self.connection
+            return connection is not None and await connection.close_if_idle()
+        return await self._async_io(self.close_idle)
+
+    @monitored
+    async def async_close(self):
+        if self.use_asyncio:
+            device = SunSpecApiClient.ASYNC_CLIENT_CACHE.pop(self._client_key, None)
+            if device is None:
+                return
+            # The connection is shared with the other slave ids of the gateway
+            if not any(
+                other.transport is device.transport
+                for other in SunSpecApiClient.ASYNC_CLIENT_CACHE.values()
+            ):
+                await device.transport.close()
+            return
+        await self._async_io(self.close)
+
+    def close_idle(self) -> bool:
+        """Close the connection if it has not been used for the idle timeout"""
+        connection = self.connection
+        if connection is None:
+            return False
+        with self.lock:
+            return connection.close_if_idle()
+
     def close(self):
-        client = self.get_client()
-        client.close()
+        connection = self.connection
+        if connection is not None:
+            connection.close()
 
     def check_port(self) -> bool:
         """Check if port is available"""
         with self._lock:
-            sock_timeout = float(3)
+            sock_timeout = CONNECT_TIMEOUT
             _LOGGER.debug(
                 f"Check_Port: opening socket on {self._host}:{self._port} with a {sock_timeout}s timeout."
             )
-            socket.setdefaulttimeout(sock_timeout)
             sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.settimeout(sock_timeout)
             sock_res = sock.connect_ex((self._host, self._port))
             is_open = sock_res == 0  # True if open, False if not
             if is_open:
@@ -238,60 +690,124 @@ class SunSpecApiClient:
             )
         )
         _LOGGER.debug(
-            f"Client connect to IP {use_config.host} port {use_config.port} slave id {use_config.slave_id} using timeout {TIMEOUT}"
+            f"Client connect to IP {use_config.host} port {use_config.port} slave id {use_config.slave_id} using timeout {CONNECT_TIMEOUT}"
         )
         client = modbus_client.SunSpecModbusClientDeviceTCP(
             slave_id=use_config.slave_id,
             ipaddr=use_config.host,
             ipport=use_config.port,
-            timeout=TIMEOUT,
+            timeout=CONNECT_TIMEOUT,
         )
-        if self.check_port():
-            _LOGGER.debug("Inverter ready for Modbus TCP connection")
-            try:
-                with self._lock:
-                    client.connect()
-                if not client.is_connected():
-                    raise ConnectionError(
-                        f"Failed to connect to {self._host}:{self._port} slave id {self._slave_id}"
-                    )
+        gateway = self.get_gateway(use_config.host, use_config.port)
+        client.client = gateway.unit_client(use_config.slave_id, self.telemetry)
+        try:
+            with self._lock:
+                client.connect()
+            if not client.is_connected():
+                raise ConnectionError(
+                    f"Failed to connect to {self._host}:{self._port} slave id {self._slave_id}"
+                )
+            key = f"{use_config.host}:{use_config.port}:{use_config.slave_id}"
+            self._model_map_cached = self._restore_model_map(key, client)
+            if not self._model_map_cached:
                 _LOGGER.debug("Client connected, perform initial scan")
                 client.scan(
                     connect=False, progress=progress, full_model_read=False, delay=0.5
                 )
+                if self._scan_cache is not None:
+                    # The serial number identifies the device in the cache
+                    client.models[1][0].read()
+                    self._store_model_map(key, client)
+
+            return client
+        except ModbusClientError as err:
+            raise ConnectionError(
+                f"Failed to connect to {use_config.host}:{use_config.port} slave id {use_config.slave_id}: {err}"
+            ) from err
+
+    def _restore_model_map(self, key, client) -> bool:
+        """Recreate the models from the scan cache, validated with a few reads"""
+        entry = self._cached_model_map(key)
+        if entry is None:
+            return False
+        try:
+            data = [client.read(*read) for read in verify_reads(entry)]
+        except ModbusClientException as err:
+            # The device refuses an address of the map
+            data = None
+            _LOGGER.debug(f"Validating cached model map failed: {err}")
+        except ModbusClientError as err:
+            _LOGGER.debug(f"Validating cached model map failed: {err}")
+            return False
+        if data is not None and restore_model_map(client, entry, data):
+            _LOGGER.debug(f"Using cached model map for {key}")
+            return True
+        _LOGGER.debug(f"Cached model map for {key} does not match the device")
+        self._remove_model_map(key)
+        return False
 
-                return client
-            except ModbusClientError:
-                raise ConnectionError(
-                    f"Failed to connect to {use_config.host}:{use_config.port} slave id {use_config.slave_id}"
-                )
-        else:
-            _LOGGER.debug("Inverter not ready for Modbus TCP connection")
-            raise ConnectionError(f"Inverter not active on {self._host}:{self._port}")
+    def _acquire_lock(self):
+        wait_start = time.monotonic()
+        self.lock.acquire(True)
+        self.telemetry.lock_wait.observe(time.monotonic() - wait_start)
 
     def write_model(self, model_id, model_index):
-        self.lock.acquire(True)
+        self._acquire_lock()
+        model = None
         try:
             client = self.get_client()
             model = client.models[model_id][model_index]
-            model.write()
-            time.sleep(0.5)
+            if isinstance(client, modbus_client.SunSpecModbusClientDevice):
+                plan = WritePlan(model)
+                _LOGGER.debug(
+                    f"Writing {len(plan.points)} points of model {model_id} using {plan.num_requests} requests"
+                )
+                plan.execute(client.write)
+            else:
+                model.write()
+            self.sf_cache.invalidate(model)
         except Exception as err:
+            if model is not None:
+                # Read back what the device has instead of the refused values
+                discard_changes(model)
+                self.sf_cache.invalidate(model)
             self.lock.release()
             raise err    
         self.lock.release()
 
-    def read_model(self, model_id) -> dict:
+    def read_model(self, model_id) -> SunSpecModelWrapper:
         _LOGGER.debug(f"Starting read_model {model_id}")
-        self.lock.acquire(True)
+        return self.read_models([model_id])[model_id]
+
+    def read_models(self, model_ids) -> dict:
+        _LOGGER.debug(f"Starting read_models {model_ids}")
+        self._acquire_lock()
+        images = {}
         try:
             client = self.get_client()
-            models = client.models[model_id]
-            for model in models:
-                model.read()
+            models = {model_id: client.models[model_id] for model_id in model_ids}
+            start = time.monotonic()
+            if isinstance(client, modbus_client.SunSpecModbusClientDevice):
+                plan = self._sf_read_plan([m for ms in models.values() for m in ms])
+                _LOGGER.debug(
+                    f"Reading {len(models)} models using {plan.num_requests} requests"
+                    f" of {plan.num_registers} registers"
+                )
+                images = plan.execute(client.read)
+                self.sf_cache.update(plan, images)
+            else:
+                for model_list in models.values():
+                    for model in model_list:
+                        model.read()
+            self.telemetry.record_model_reads(models, time.monotonic() - start)
         except Exception as err:
+            if isinstance(err, ModbusClientException):
+                self._forget_model_map()
             self.lock.release()
             raise err    
         self.lock.release()
 
-        return SunSpecModelWrapper(models)
+        return {
+            model_id: SunSpecModelWrapper(model_list, images)
+            for model_id, model_list in models.items()
+        }
@@ -5,21 +5,56 @@ import logging
 from homeassistant import config_entries
 from homeassistant.core import callback
 import homeassistant.helpers.config_validation as cv
+from sunspec2 import device as sunspec_device
+from sunspec2 import mdef
 import voluptuous as vol
 
 from . import SCAN_INTERVAL
 from .api import SunSpecApiClient
+from .api import default_cache_ttl
+from .connection import DEFAULT_IDLE_TIMEOUT
+from .const import CONF_CACHE_TTLS
+from .const import CONF_DEADBANDS
 from .const import CONF_ENABLED_MODELS
 from .const import CONF_HOST
+from .const import CONF_IDLE_TIMEOUT
+from .const import CONF_LOOP_BLOCK_THRESHOLD
+from .const import CONF_MAX_AGE
+from .const import CONF_MODEL_INTERVALS
+from .const import CONF_POINT_DEADBANDS
 from .const import CONF_PORT
 from .const import CONF_PREFIX
 from .const import CONF_SCAN_INTERVAL
+from .const import CONF_SETTLE_TIMES
 from .const import CONF_SLAVE_ID
+from .const import CONF_TELEMETRY_SENSORS
+from .const import CONF_TRANSPORT
 from .const import DEFAULT_MODELS
+from .const import DEFAULT_TRANSPORT
 from .const import DOMAIN
+from .const import TRANSPORTS
+from .deadband import DEFAULT_MAX_AGE
+from .deadband import deadbands_validator
+from .schedule import default_model_interval
 
 _LOGGER: logging.Logger = logging.getLogger(__package__)
 
+SETTLE_SUFFIX = "_settle"
+CACHE_SUFFIX = "_cache"
+
+
+def _has_writable_points(group) -> bool:
+    if any(p.get(mdef.ACCESS) == mdef.ACCESS_RW for p in group.get(mdef.POINTS, [])):
+        return True
+    return any(_has_writable_points(g) for g in group.get(mdef.GROUPS, []))
+
+
+def is_writable_model(model_id) -> bool:
+    try:
+        return _has_writable_points(sunspec_device.get_model_def(model_id)[mdef.GROUP])
+    except Exception:  # pylint: disable=broad-except
+        return False
+
 
 class SunSpecFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
     """Config flow for sunspec."""
@@ -180,6 +215,8 @@ class SunSpecOptionsFlowHandler(config_entries.OptionsFlow):
         """Handle a flow initialized by the user."""
         if user_input is not None:
             self.options.update(user_input)
+            if self.options.get(CONF_ENABLED_MODELS):
+                return await self.async_step_model_intervals()
             return await self._update_options()
 
         prefix = self.config_entry.options.get(
@@ -188,6 +225,17 @@ class SunSpecOptionsFlowHandler(config_entries.OptionsFlow):
         scan_interval = self.config_entry.options.get(
             CONF_SCAN_INTERVAL, self.config_entry.data.get(CONF_SCAN_INTERVAL)
         )
+        idle_timeout = self.config_entry.options.get(
+            CONF_IDLE_TIMEOUT, DEFAULT_IDLE_TIMEOUT
+        )
+        transport = self.config_entry.options.get(CONF_TRANSPORT, DEFAULT_TRANSPORT)
+        deadbands = self.config_entry.options.get(CONF_DEADBANDS, "")
+        point_deadbands = self.config_entry.options.get(CONF_POINT_DEADBANDS, "")
+        max_age = self.config_entry.options.get(CONF_MAX_AGE, DEFAULT_MAX_AGE)
+        telemetry_sensors = self.config_entry.options.get(CONF_TELEMETRY_SENSORS, False)
+        loop_block_threshold = self.config_entry.options.get(
+            CONF_LOOP_BLOCK_THRESHOLD, 0
+        )
         try:
             models = set(await self.coordinator.api.async_get_models(self.settings))
             model_filter = {model for model in sorted(models)}
@@ -204,10 +252,29 @@ class SunSpecOptionsFlowHandler(config_entries.OptionsFlow):
                     {
                         vol.Optional(CONF_PREFIX, default=prefix): str,
                         vol.Optional(CONF_SCAN_INTERVAL, default=scan_interval): int,
+                        vol.Optional(CONF_IDLE_TIMEOUT, default=idle_timeout): int,
+                        vol.Optional(CONF_TRANSPORT, default=transport): vol.In(
+                            TRANSPORTS
+                        ),
                         vol.Optional(
                             CONF_ENABLED_MODELS,
                             default=default_models,
                         ): cv.multi_select(model_filter),
+                        vol.Optional(CONF_DEADBANDS, default=deadbands): vol.All(
+                            str, deadbands_validator
+                        ),
+                        vol.Optional(
+                            CONF_POINT_DEADBANDS, default=point_deadbands
+                        ): vol.All(str, deadbands_validator),
+                        vol.Optional(CONF_MAX_AGE, default=max_age): vol.All(
+                            vol.Coerce(int), vol.Range(min=1)
+                        ),
+                        vol.Optional(
+                            CONF_TELEMETRY_SENSORS, default=telemetry_sensors
+                        ): bool,
+                        vol.Optional(
+                            CONF_LOOP_BLOCK_THRESHOLD, default=loop_block_threshold
+                        ): vol.All(vol.Coerce(int), vol.Range(min=0)),
                     }
                 ),
             )
@@ -223,6 +290,62 @@ class SunSpecOptionsFlowHandler(config_entries.OptionsFlow):
                 data=self.settings, errors={"base": "connection"}
             )
 
+    async def async_step_model_intervals(self, user_input=None):
+        """Polling interval, cache time and write settle time of each enabled model"""
+        scan_interval = self.options.get(
+            CONF_SCAN_INTERVAL,
+            self.config_entry.data.get(
+                CONF_SCAN_INTERVAL, SCAN_INTERVAL.total_seconds()
+            ),
+        )
+        if user_input is not None:
+            intervals = {}
+            settle_times = {}
+            cache_ttls = {}
+            for key, value in user_input.items():
+                if key.endswith(SETTLE_SUFFIX):
+                    if value:
+                        settle_times[key[: -len(SETTLE_SUFFIX)]] = value
+                elif key.endswith(CACHE_SUFFIX):
+                    model_id = key[: -len(CACHE_SUFFIX)]
+                    if value != default_cache_ttl(int(model_id)):
+                        cache_ttls[model_id] = value
+                # Models left at their default keep following the scan interval
+                elif value != default_model_interval(int(key), scan_interval):
+                    intervals[key] = value
+            self.options[CONF_MODEL_INTERVALS] = intervals
+            self.options[CONF_SETTLE_TIMES] = settle_times
+            self.options[CONF_CACHE_TTLS] = cache_ttls
+            return await self._update_options()
+
+        intervals = self.config_entry.options.get(CONF_MODEL_INTERVALS, {})
+        settle_times = self.config_entry.options.get(CONF_SETTLE_TIMES, {})
+        cache_ttls = self.config_entry.options.get(CONF_CACHE_TTLS, {})
+        schema = {}
+        for model_id in sorted(map(int, self.options[CONF_ENABLED_MODELS])):
+            default = intervals.get(
+                str(model_id), default_model_interval(model_id, scan_interval)
+            )
+            schema[vol.Optional(str(model_id), default=default)] = vol.All(
+                vol.Coerce(int), vol.Range(min=1)
+            )
+            schema[
+                vol.Optional(
+                    f"{model_id}{CACHE_SUFFIX}",
+                    default=cache_ttls.get(str(model_id), default_cache_ttl(model_id)),
+                )
+            ] = vol.All(vol.Coerce(float), vol.Range(min=0))
+            if is_writable_model(model_id):
+                schema[
+                    vol.Optional(
+                        f"{model_id}{SETTLE_SUFFIX}",
+                        default=settle_times.get(str(model_id), 0),
+                    )
+                ] = vol.All(vol.Coerce(float), vol.Range(min=0))
+        return self.async_show_form(
+            step_id="model_intervals", data_schema=vol.Schema(schema)
+        )
+
     async def _update_options(self):
         """Update config entry options."""
         # self.settings[CONF_PORT] = 503
@@ -0,0 +1,123 @@
+"""Modbus TCP connection management for SunSpec devices."""
+
+import logging
+import select
+import socket
+import time
+
+from sunspec2.modbus.modbus import ModbusClientTCP
+
+from .gateway import GatewayUnitClient
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+DEFAULT_IDLE_TIMEOUT = 300
+# Seconds before the next poll that a connection closed for idleness is reopened
+PREWARM_TIME = 5
+
+KEEPALIVE_IDLE = 30
+KEEPALIVE_INTERVAL = 10
+KEEPALIVE_COUNT = 3
+
+
+def configure_socket(sock):
+    """Enable TCP keepalive and disable Nagle on a connected socket"""
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    # Not available on every platform
+    for option, value in (
+        ("TCP_KEEPIDLE", KEEPALIVE_IDLE),
+        ("TCP_KEEPINTVL", KEEPALIVE_INTERVAL),
+        ("TCP_KEEPCNT", KEEPALIVE_COUNT),
+    ):
+        if hasattr(socket, option):
+            sock.setsockopt(socket.IPPROTO_TCP, getattr(socket, option), value)
+
+
+class SunSpecConnection:
+    """Keeps the socket of a pysunspec2 client open between polls"""
+
+    def __init__(self, client, idle_timeout=DEFAULT_IDLE_TIMEOUT) -> None:
+        self.client = client
+        self.idle_timeout = idle_timeout
+        self.connect_count = 0
+        self.connected_at = None
+        self.last_used = None
+
+    @property
+    def socket(self):
+        tcp = getattr(self.client, "client", None)
+        return getattr(tcp, "socket", None)
+
+    @property
+    def connection_age(self):
+        """Seconds since the current connection was opened"""
+        if self.connected_at is None:
+            return None
+        return time.monotonic() - self.connected_at
+
+    @property
+    def idle_time(self):
+        if self.last_used is None:
+            return None
+        return time.monotonic() - self.last_used
+
+    def mark_connected(self):
+        """Record a connection that has been opened by the client"""
+        sock = self.socket
+        if sock is not None:
+            configure_socket(sock)
+        self.connect_count += 1
+        self.connected_at = self.last_used = time.monotonic()
+
+    def connect(self):
+        _LOGGER.debug("Opening Modbus connection")
+        self.client.connect()
+        self.mark_connected()
+
+    def is_alive(self) -> bool:
+        tcp = getattr(self.client, "client", None)
+        if not isinstance(tcp, (ModbusClientTCP, GatewayUnitClient)):
+            return bool(self.client.is_connected())
+        sock = tcp.socket
+        if sock is None:
+            return False
+        try:
+            # An idle Modbus socket must not be readable, if it is the peer
+            # either closed it or sent data we will never match to a request
+            readable, _, _ = select.select([sock], [], [], 0)
+        except (OSError, ValueError):
+            return False
+        return not readable
+
+    def ensure_connected(self):
+        """Return the client, reconnecting first if the socket died"""
+        if not self.is_alive():
+            if self.connected_at is not None:
+                _LOGGER.debug("Modbus connection lost, reconnecting")
+                self.close()
+            self.connect()
+        self.last_used = time.monotonic()
+        return self.client
+
+    def close_if_idle(self) -> bool:
+        idle = self.idle_time
+        if self.connected_at is None or idle is None or idle < self.idle_timeout:
+            return False
+        _LOGGER.debug(f"Closing Modbus connection after {idle:.0f}s idle")
+        self.close()
+        return True
+
+    def close(self):
+        self.client.close()
+        disconnect = getattr(self.client, "disconnect", None)
+        if disconnect is not None:
+            disconnect()
+        self.connected_at = None
+
+    def stats(self) -> dict:
+        return {
+            "connected": self.connected_at is not None,
+            "connect_count": self.connect_count,
+            "connection_age": self.connection_age,
+        }
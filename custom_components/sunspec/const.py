@@ -31,6 +31,22 @@ CONF_SLAVE_ID = "slave_id"
 CONF_PREFIX = "prefix"
 CONF_SCAN_INTERVAL = "scan_interval"
 CONF_ENABLED_MODELS = "models_enabled"
+CONF_IDLE_TIMEOUT = "idle_timeout"
+CONF_TRANSPORT = "transport"
+CONF_MODEL_INTERVALS = "model_intervals"
+CONF_SETTLE_TIMES = "settle_times"
+CONF_CACHE_TTLS = "cache_ttls"
+CONF_DEADBANDS = "deadbands"
+CONF_POINT_DEADBANDS = "point_deadbands"
+CONF_MAX_AGE = "max_age"
+CONF_TELEMETRY_SENSORS = "telemetry_sensors"
+CONF_LOOP_BLOCK_THRESHOLD = "loop_block_threshold"
+
+# Modbus transports
+TRANSPORT_EXECUTOR = "executor"
+TRANSPORT_ASYNCIO = "asyncio"
+TRANSPORTS = [TRANSPORT_EXECUTOR, TRANSPORT_ASYNCIO]
+DEFAULT_TRANSPORT = TRANSPORT_EXECUTOR
 
 DEFAULT_MODELS = set(
     [
@@ -62,6 +78,15 @@ DEFAULT_MODELS = set(
         809,
     ]
 )
+# Default polling intervals in seconds of models that rarely change,
+# all other models are read every scan interval
+NAMEPLATE_INTERVAL = 3600
+SETTINGS_INTERVAL = 300
+NAMEPLATE_MODELS = set([1, 120, 702])
+SETTINGS_MODELS = set(
+    [121, 123, 124, 126, 127, 128, 129, 130, 132, 145] + list(range(703, 713))
+)
+
 # Defaults
 DEFAULT_NAME = DOMAIN
 
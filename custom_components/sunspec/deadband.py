@@ -0,0 +1,80 @@
+"""Deadbands filtering insignificant changes of noisy points.
+
+Deadbands are set per SunSpec unit (the keys of HA_META) and can be
+overridden for single points. A deadband is written as an absolute value
+("0.5") or as a percentage of the last written value ("2%").
+"""
+
+import voluptuous as vol
+
+# Seconds after which a value inside the deadband is written anyway
+DEFAULT_MAX_AGE = 300
+
+
+class Deadband:
+    """Smallest change of a value that is passed on to HA"""
+
+    def __init__(self, value: float, percent=False) -> None:
+        self.value = value
+        self.percent = percent
+
+    @classmethod
+    def parse(cls, spec: str) -> "Deadband":
+        spec = str(spec).strip()
+        percent = spec.endswith("%")
+        value = float(spec[:-1] if percent else spec)
+        if value < 0:
+            raise ValueError(f"Negative deadband {spec}")
+        return cls(value, percent)
+
+    def exceeded(self, old, new) -> bool:
+        """True if the change from old to new is significant"""
+        if not isinstance(old, (int, float)) or not isinstance(new, (int, float)):
+            return old != new
+        limit = abs(old) * self.value / 100 if self.percent else self.value
+        return abs(new - old) > limit
+
+
+def parse_deadbands(text: str) -> dict:
+    """Parse "V=0.5, Hz=0.01, 103:PhVphA=1%" into a dict of Deadband"""
+    deadbands = {}
+    for item in (text or "").split(","):
+        if not item.strip():
+            continue
+        name, sep, spec = item.rpartition("=")
+        if not sep or not name.strip():
+            raise ValueError(f"Invalid deadband {item.strip()}")
+        deadbands[name.strip()] = Deadband.parse(spec)
+    return deadbands
+
+
+def deadbands_validator(text):
+    """Voluptuous validator for deadband lists in the options flow"""
+    try:
+        parse_deadbands(text)
+    except ValueError as err:
+        raise vol.Invalid(str(err)) from err
+    return text
+
+
+class DeadbandFilter:
+    """Deadbands of the points of a device"""
+
+    def __init__(
+        self, units: str = "", points: str = "", max_age=DEFAULT_MAX_AGE
+    ) -> None:
+        self.units = parse_deadbands(units)
+        self.points = parse_deadbands(points)
+        self.max_age = max_age
+
+    def deadband(self, model_id, key, unit):
+        """Deadband of a point, None if every change is significant
+
+        Point overrides are given as <model id>:<point key>.
+        """
+        deadband = self.points.get(f"{model_id}:{key}")
+        if deadband is None:
+            deadband = self.units.get(unit)
+        if deadband is not None and deadband.value == 0:
+            return None
+        return deadband
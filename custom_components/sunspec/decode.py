@@ -0,0 +1,213 @@
+"""Bulk decoding of SunSpec model register blocks.
+
+A layout is compiled once per model object with the position, type and scale
+factor of every point. A model's registers are then decoded with a single
+struct call, not implemented values and scale factors are applied in one
+pass over the result instead of point by point through pysunspec2.
+"""
+
+import math
+import struct
+import weakref
+
+from sunspec2 import mb
+from sunspec2 import mdef
+
+# struct codes of the fixed size integer types
+_INT_CODES = {
+    mdef.TYPE_INT16: "h",
+    mdef.TYPE_UINT16: "H",
+    mdef.TYPE_COUNT: "H",
+    mdef.TYPE_ACC16: "H",
+    mdef.TYPE_ENUM16: "H",
+    mdef.TYPE_BITFIELD16: "H",
+    mdef.TYPE_PAD: "H",
+    mdef.TYPE_SUNSSF: "h",
+    mdef.TYPE_INT32: "i",
+    mdef.TYPE_UINT32: "I",
+    mdef.TYPE_ACC32: "I",
+    mdef.TYPE_ENUM32: "I",
+    mdef.TYPE_BITFIELD32: "I",
+    mdef.TYPE_IPADDR: "I",
+    mdef.TYPE_INT64: "q",
+    mdef.TYPE_UINT64: "Q",
+    mdef.TYPE_ACC64: "Q",
+}
+
+# Register values marking an integer point as not implemented
+_NOT_IMPLEMENTED = {
+    mdef.TYPE_INT16: -0x8000,
+    mdef.TYPE_UINT16: 0xFFFF,
+    mdef.TYPE_COUNT: 0xFFFF,
+    mdef.TYPE_ACC16: 0,
+    mdef.TYPE_ENUM16: 0xFFFF,
+    mdef.TYPE_BITFIELD16: 0xFFFF,
+    mdef.TYPE_SUNSSF: -0x8000,
+    mdef.TYPE_INT32: -0x80000000,
+    mdef.TYPE_UINT32: 0xFFFFFFFF,
+    mdef.TYPE_ACC32: 0,
+    mdef.TYPE_ENUM32: 0xFFFFFFFF,
+    mdef.TYPE_BITFIELD32: 0xFFFFFFFF,
+    mdef.TYPE_IPADDR: 0,
+    mdef.TYPE_INT64: -0x8000000000000000,
+    mdef.TYPE_UINT64: 0xFFFFFFFFFFFFFFFF,
+    mdef.TYPE_ACC64: 0,
+}
+
+_FLOAT_CODES = {
+    mdef.TYPE_FLOAT32: "f",
+    mdef.TYPE_FLOAT64: "d",
+}
+
+# Layouts, kept for as long as the pysunspec2 model object lives
+_LAYOUTS = weakref.WeakKeyDictionary()
+
+
+def _float_value(value):
+    # NaN marks a float point as not implemented
+    return None if value != value else value
+
+
+def _bytes_converter(info):
+    def convert(data):
+        try:
+            value = info.data_to(data)
+        except UnicodeDecodeError:
+            return None
+        return value if info.is_impl(value) else None
+
+    return convert
+
+
+def _model_points(model):
+    """Return (key, point) of all points using the keys of the entities"""
+    points = [(name, point) for name, point in model.points.items()]
+    for group_name, model_group in model.groups.items():
+        groups = model_group if type(model_group) is list else [model_group]
+        for idx, group in enumerate(groups):
+            for name, point in group.points.items():
+                points.append((f"{group_name}:{idx}:{name}", point))
+    return points
+
+
+def _scale_factor_point(point):
+    sf = point.group.points.get(point.sf) if point.group is not None else None
+    if sf is None:
+        sf = point.model.points.get(point.sf)
+    return sf
+
+
+class ModelSnapshot:
+    """Decoded values of one model read, indexed by the slots of its layout"""
+
+    __slots__ = ("layout", "values", "cvalues", "sfs")
+
+    def __init__(self, layout, values, cvalues, sfs) -> None:
+        self.layout = layout
+        self.values = values
+        self.cvalues = cvalues
+        self.sfs = sfs
+
+    def slot(self, key):
+        """Return the slot of a point key, None if the layout does not cover it"""
+        return self.layout.slots.get(key)
+
+
+class ModelLayout:
+    """Precompiled register layout of a model"""
+
+    def __init__(self, model) -> None:
+        self.slots = {}
+        fmt = [">"]
+        pos = 0
+        sentinels = []
+        converters = []
+        scaled = []
+        keys = []
+        slot_of_point = {}
+        for key, point in sorted(_model_points(model), key=lambda kp: kp[1].offset):
+            ptype = point.pdef[mdef.TYPE]
+            size = int(point.len)
+            if point.offset < pos or ptype not in mb.point_type_info:
+                continue
+            if point.offset > pos:
+                fmt.append(f"{(point.offset - pos) * 2}x")
+            slot = len(self.slots)
+            if ptype in _INT_CODES:
+                fmt.append(_INT_CODES[ptype])
+                if ptype in _NOT_IMPLEMENTED:
+                    sentinels.append((slot, _NOT_IMPLEMENTED[ptype]))
+            elif ptype in _FLOAT_CODES:
+                fmt.append(_FLOAT_CODES[ptype])
+                converters.append((slot, _float_value))
+            else:
+                fmt.append(f"{size * 2}s")
+                converters.append((slot, _bytes_converter(point.info)))
+            self.slots[key] = slot
+            keys.append(key)
+            slot_of_point[id(point)] = slot
+            pos = point.offset + size
+            if point.sf_required:
+                scaled.append((slot, point))
+
+        self._scaled = []
+        for slot, point in scaled:
+            if point.sf is None:
+                self._scaled.append((slot, None, int(point.pdef[mdef.SF])))
+                continue
+            sf_point = _scale_factor_point(point)
+            sf_slot = slot_of_point.get(id(sf_point))
+            if sf_slot is None:
+                # Leave points with an unknown scale factor to pysunspec2
+                del self.slots[keys[slot]]
+                continue
+            self._scaled.append((slot, sf_slot, None))
+
+        self.struct = struct.Struct("".join(fmt))
+        self._sentinels = sentinels
+        self._converters = converters
+
+    @property
+    def size(self):
+        """Number of bytes needed to decode the model"""
+        return self.struct.size
+
+    def decode(self, data) -> ModelSnapshot:
+        """Decode the registers of a model read, starting with its ID register"""
+        values = list(self.struct.unpack_from(data))
+        for slot, sentinel in self._sentinels:
+            if values[slot] == sentinel:
+                values[slot] = None
+        for slot, convert in self._converters:
+            values[slot] = convert(values[slot])
+
+        cvalues = list(values)
+        sfs = [None] * len(values)
+        for slot, sf_slot, sf in self._scaled:
+            value = values[slot]
+            if value is None:
+                continue
+            if sf_slot is not None:
+                sf = values[sf_slot]
+            sfs[slot] = sf
+            if sf:
+                cvalues[slot] = round(value * math.pow(10, sf), -1 * sf)
+        return ModelSnapshot(self, values, cvalues, sfs)
+
+
+def model_layout(model) -> ModelLayout:
+    layout = _LAYOUTS.get(model)
+    if layout is None:
+        layout = ModelLayout(model)
+        _LAYOUTS[model] = layout
+    return layout
+
+
+def decode_model(model, data):
+    """Decode a model read, None if data does not cover the whole model"""
+    if data is None:
+        return None
+    layout = model_layout(model)
+    if len(data) < layout.size:
+        return None
+    return layout.decode(data)
@@ -0,0 +1,46 @@
+"""Diagnostics support for SunSpec."""
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import CONF_HOST
+from .const import DOMAIN
+from .worker import find_worker
+
+TO_REDACT = {CONF_HOST}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict:
+    """Return the poll telemetry and connection state of a config entry"""
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+    connection = coordinator.api.connection
+    update_interval = coordinator.update_interval
+    worker = find_worker(coordinator.gateway)
+    return {
+        "entry": {
+            "data": async_redact_data(dict(entry.data), TO_REDACT),
+            "options": dict(entry.options),
+        },
+        "coordinator": {
+            "last_update_success": coordinator.last_update_success,
+            "update_interval": (
+                update_interval.total_seconds() if update_interval is not None else None
+            ),
+            "models": sorted(coordinator.data or {}),
+            "state_writes": coordinator.state_writes,
+            "state_writes_skipped": coordinator.state_writes_skipped,
+            "state_write_skip_rate": coordinator.state_write_skip_rate,
+        },
+        "connection": connection.stats() if connection is not None else None,
+        "telemetry": coordinator.api.telemetry.as_dict(),
+        "fleet": coordinator.fleet.stats(),
+        "worker": worker.stats() if worker is not None else None,
+        "loop": (
+            coordinator.loop_monitor.stats()
+            if coordinator.loop_monitor is not None
+            else None
+        ),
+    }
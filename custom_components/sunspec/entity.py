@@ -6,6 +6,7 @@ from __future__ import annotations
 
 import logging
 import inspect
+import time
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from homeassistant.components.sensor import SensorDeviceClass
 from homeassistant.core import callback
@@ -143,21 +144,66 @@ class SunSpecEntity(CoordinatorEntity):
         )
         _LOGGER.debug(self._meta)
         self._attr_extra_state_attributes = self.create_extra_state_attributes()
+        # (value, raw, available) of the last state written to HA
+        self._last_snapshot = None
+        self._last_written = None
+        self._deadband = coordinator.deadbands.deadband(
+            self.model_id, self.key, sunspec_unit
+        )
+
+    def _state_snapshot(self):
+        """Values that decide whether the state in HA has to be written"""
+        try:
+            wrapper = self.coordinator.data[self.model_id]
+            value = wrapper.getValue(self.key, self.model_index)
+            raw = wrapper.getValueRaw(self.key, self.model_index)
+        except (KeyError, TypeError, OverflowError):
+            value = raw = None
+        return value, raw, self.available
+
+    async def async_added_to_hass(self) -> None:
+        """Remember the values of the state written when the entity is added"""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self.coordinator.async_add_model_listener(
+                self.model_id, self._handle_coordinator_update
+            )
+        )
+        self._last_snapshot = self._state_snapshot()
+        self._last_written = time.monotonic()
+
+    def _inside_deadband(self, snapshot) -> bool:
+        """True if only the value changed and by less than the deadband"""
+        if self._deadband is None or self._last_snapshot is None:
+            return False
+        value, _, available = snapshot
+        last_value, _, last_available = self._last_snapshot
+        if available != last_available or value is None or last_value is None:
+            return False
+        if time.monotonic() - self._last_written >= self.coordinator.deadbands.max_age:
+            return False
+        return not self._deadband.exceeded(last_value, value)
 
     @callback
     def _handle_coordinator_update(self) -> None:
         """Update sensor with latest data from coordinator."""
-        self._attr_extra_state_attributes["raw"] = self.coordinator.data[self.model_id].getValueRaw(
-            self.key, self.model_index
-        )
+        snapshot = self._state_snapshot()
+        if snapshot == self._last_snapshot or self._inside_deadband(snapshot):
+            self.coordinator.state_writes_skipped += 1
+            return
+        self._last_snapshot = snapshot
+        self._last_written = time.monotonic()
+        self.coordinator.state_writes += 1
+        self._attr_extra_state_attributes["raw"] = snapshot[1]
         super()._handle_coordinator_update()
 
     async def write(self, new_value):
         self.model_wrapper.setValue(self.key, new_value, self.model_index)
         _LOGGER.debug(f"Writing: {new_value}")
-        await self.coordinator.api.write(self.model_id, self.model_index)
-        await self.coordinator.async_refresh()
+        await self.coordinator.write_queue.async_write(self.model_id, self.model_index)
         _LOGGER.debug(f"found value: {self.model_wrapper.getValue(self.key, self.model_index)}")
+        self._last_snapshot = self._state_snapshot()
+        self._last_written = time.monotonic()
         self.async_write_ha_state()
 
 
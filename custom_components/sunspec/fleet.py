@@ -0,0 +1,120 @@
+"""Polling of many SunSpec devices with bounded concurrency.
+
+Every coordinator registers with the fleet scheduler of the integration. A
+poll only starts once a slot of its gateway and a global slot are free, so a
+large fleet cannot use up the executor or flood a shared gateway. The polls
+of the devices are spread over the scan interval with phase offsets.
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+import logging
+import time
+
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+from .telemetry import LatencyHistogram
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+DATA_FLEET = f"{DOMAIN}_fleet"
+
+# Polls running at the same time, in total and per gateway
+DEFAULT_MAX_POLLS = 8
+DEFAULT_MAX_GATEWAY_POLLS = 1
+
+# Fractional part of the golden ratio, spreads any number of phases evenly
+PHASE_STEP = 0.6180339887498949
+
+
+class FleetScheduler:
+    """Admission of the polls of all SunSpec devices"""
+
+    def __init__(
+        self, max_polls=DEFAULT_MAX_POLLS, max_gateway_polls=DEFAULT_MAX_GATEWAY_POLLS
+    ) -> None:
+        self.max_polls = max_polls
+        self.max_gateway_polls = max_gateway_polls
+        self._slots = asyncio.Semaphore(max_polls)
+        self._gateway_slots = {}
+        self._members = {}
+        self._registrations = 0
+        self.waiting = 0
+        self.peak_waiting = 0
+        self.running = 0
+        self.polls = 0
+        self.wait_time = LatencyHistogram()
+
+    @property
+    def queue_depth(self) -> int:
+        """Polls waiting for a slot"""
+        return self.waiting
+
+    def register(self, member, gateway, interval) -> float:
+        """Add a device polled every interval seconds, returns its phase offset"""
+        self._members[member] = gateway
+        if gateway not in self._gateway_slots:
+            self._gateway_slots[gateway] = asyncio.Semaphore(self.max_gateway_polls)
+        phase = (self._registrations * PHASE_STEP) % 1 * interval
+        self._registrations += 1
+        _LOGGER.debug(f"Fleet member on {gateway} polls with a {phase:.1f}s offset")
+        return phase
+
+    def unregister(self, member):
+        gateway = self._members.pop(member, None)
+        if gateway is not None and gateway not in self._members.values():
+            self._gateway_slots.pop(gateway, None)
+
+    @asynccontextmanager
+    async def poll(self, gateway):
+        """Wait for a slot of gateway and a global slot for a poll"""
+        gateway_slots = self._gateway_slots.get(gateway)
+        if gateway_slots is None:
+            gateway_slots = self._gateway_slots[gateway] = asyncio.Semaphore(
+                self.max_gateway_polls
+            )
+        self.waiting += 1
+        self.peak_waiting = max(self.peak_waiting, self.waiting)
+        start = time.monotonic()
+        try:
+            # The gateway slot first, a poll waiting for its gateway must not
+            # hold a global slot other gateways could use
+            await gateway_slots.acquire()
+            try:
+                await self._slots.acquire()
+            except BaseException:
+                gateway_slots.release()
+                raise
+        finally:
+            self.waiting -= 1
+        self.wait_time.observe(time.monotonic() - start)
+        self.running += 1
+        try:
+            yield
+        finally:
+            self.running -= 1
+            self.polls += 1
+            self._slots.release()
+            gateway_slots.release()
+
+    def stats(self) -> dict:
+        return {
+            "members": len(self._members),
+            "gateways": len(set(self._members.values())),
+            "max_polls": self.max_polls,
+            "max_gateway_polls": self.max_gateway_polls,
+            "running": self.running,
+            "queue_depth": self.queue_depth,
+            "peak_queue_depth": self.peak_waiting,
+            "polls": self.polls,
+            "wait_time": self.wait_time.as_dict(),
+        }
+
+
+def get_fleet_scheduler(hass: HomeAssistant) -> FleetScheduler:
+    """The fleet scheduler shared by all config entries"""
+    fleet = hass.data.get(DATA_FLEET)
+    if fleet is None:
+        fleet = hass.data[DATA_FLEET] = FleetScheduler()
+    return fleet
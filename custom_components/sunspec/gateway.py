@@ -0,0 +1,173 @@
+"""Modbus TCP connections shared by the units behind one gateway.
+
+Several SunSpec devices are often reached through a single Modbus TCP
+gateway that only accepts one or two clients. All config entries using the
+same host:port share one socket, requests are served in arrival order and
+addressed with the unit ID of the entry that issued them.
+"""
+
+import logging
+import threading
+import time
+
+from sunspec2.modbus.modbus import FUNC_READ_HOLDING
+from sunspec2.modbus.modbus import ModbusClientError
+from sunspec2.modbus.modbus import ModbusClientException
+from sunspec2.modbus.modbus import ModbusClientTCP
+from sunspec2.modbus.modbus import ModbusClientTimeout
+from sunspec2.modbus.modbus import REQ_COUNT_MAX
+from sunspec2.modbus.modbus import REQ_WRITE_COUNT_MAX
+
+from .telemetry import DeviceTelemetry
+from .timeouts import CONNECT_TIMEOUT
+from .timeouts import AdaptiveTimeout
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+
+class FairLock:
+    """Lock granting access in the order it was requested"""
+
+    def __init__(self) -> None:
+        self._condition = threading.Condition()
+        self._next_ticket = 0
+        self._serving = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of holders and waiters"""
+        return self._next_ticket - self._serving
+
+    def acquire(self):
+        with self._condition:
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            while ticket != self._serving:
+                self._condition.wait()
+
+    def release(self):
+        with self._condition:
+            self._serving += 1
+            self._condition.notify_all()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *args):
+        self.release()
+
+
+class SunSpecGateway:
+    """One Modbus TCP connection used by every unit behind host:port"""
+
+    def __init__(self, host, port, connect_timeout=CONNECT_TIMEOUT) -> None:
+        self.host = host
+        self.port = port
+        self.connect_timeout = connect_timeout
+        self.tcp = ModbusClientTCP(ipaddr=host, ipport=port, timeout=connect_timeout)
+        self.lock = FairLock()
+        self.units = set()
+        self.connect_count = 0
+
+    @property
+    def socket(self):
+        return self.tcp.socket
+
+    def is_connected(self) -> bool:
+        return self.tcp.socket is not None
+
+    def unit_client(self, unit_id, telemetry=None) -> "GatewayUnitClient":
+        return GatewayUnitClient(self, unit_id, telemetry)
+
+    def _ensure_connected(self, telemetry: DeviceTelemetry):
+        if self.tcp.socket is None:
+            _LOGGER.debug(f"Opening gateway connection to {self.host}:{self.port}")
+            self.tcp.connect(self.connect_timeout)
+            self.connect_count += 1
+            telemetry.record_connect()
+
+    def connect(self, unit_id, telemetry: DeviceTelemetry):
+        with self.lock:
+            self.units.add(unit_id)
+            self._ensure_connected(telemetry)
+
+    def disconnect(self, unit_id):
+        """Release the connection for unit_id, closing it when no unit uses it"""
+        with self.lock:
+            self.units.discard(unit_id)
+            if not self.units:
+                _LOGGER.debug(f"Closing gateway connection to {self.host}:{self.port}")
+                self.tcp.disconnect()
+
+    def request(self, unit: "GatewayUnitClient", method, *args):
+        """Run a read or write of the shared client for a unit"""
+        timeout = unit.timeout
+        telemetry = unit.telemetry
+        wait_start = time.monotonic()
+        with self.lock:
+            telemetry.gateway_wait.observe(time.monotonic() - wait_start)
+            self._ensure_connected(telemetry)
+            self.tcp.slave_id = unit.slave_id
+            self.tcp.socket.settimeout(timeout.timeout)
+            start = time.monotonic()
+            try:
+                result = getattr(self.tcp, method)(*args)
+            except ModbusClientException:
+                timeout.sample(time.monotonic() - start)
+                raise
+            except (ModbusClientTimeout, TimeoutError):
+                telemetry.record_error()
+                timeout.backoff()
+                # A late response would be taken as the answer to the next
+                # request of another unit, start over with a new connection
+                self.tcp.disconnect()
+                raise
+            except (ModbusClientError, OSError):
+                telemetry.record_error()
+                self.tcp.disconnect()
+                raise
+            timeout.sample(time.monotonic() - start)
+            return result
+
+
+def _transactions(count, max_count) -> int:
+    """Number of requests ModbusClientTCP splits count registers into"""
+    return max(1, -(-count // max_count))
+
+
+class GatewayUnitClient:
+    """Stand-in for the ModbusClientTCP of a device, addressing one unit over a gateway"""
+
+    def __init__(self, gateway: SunSpecGateway, unit_id, telemetry=None) -> None:
+        self.gateway = gateway
+        self.slave_id = unit_id
+        self.timeout = AdaptiveTimeout()
+        self.telemetry = DeviceTelemetry() if telemetry is None else telemetry
+
+    @property
+    def socket(self):
+        return self.gateway.socket
+
+    def connect(self, timeout=None):
+        self.gateway.connect(self.slave_id, self.telemetry)
+
+    def disconnect(self):
+        self.gateway.disconnect(self.slave_id)
+
+    def close(self):
+        self.disconnect()
+
+    def is_connected(self):
+        return self.gateway.is_connected()
+
+    def read(self, addr, count, op=FUNC_READ_HOLDING):
+        data = self.gateway.request(self, "read", addr, count, op)
+        self.telemetry.record_read(int(count), _transactions(int(count), REQ_COUNT_MAX))
+        return data
+
+    def write(self, addr, data):
+        result = self.gateway.request(self, "write", addr, data)
+        count = len(data) // 2
+        self.telemetry.record_write(count, _transactions(count, REQ_WRITE_COUNT_MAX))
+        return result
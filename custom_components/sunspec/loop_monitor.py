@@ -0,0 +1,104 @@
+"""Detection of SunSpec calls that block the event loop.
+
+When the loop block threshold option is set, the coroutines of the API client
+and the refreshes of the coordinator are stepped through a LoopMonitor. Each
+step is the time a coroutine runs on the event loop between two awaits, and
+the time spent in monitored calls it makes is attributed to those calls, so a
+slow step is logged with the innermost call that caused it.
+"""
+
+import contextvars
+import functools
+import logging
+import time
+
+from .telemetry import LatencyHistogram
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+# Time used by the monitored steps running inside the current step
+_NESTED = contextvars.ContextVar("sunspec_loop_nested", default=None)
+
+
+class _MonitoredCoroutine:
+    def __init__(self, monitor, name, coro) -> None:
+        self._monitor = monitor
+        self._name = name
+        self._coro = coro
+
+    def __await__(self):
+        coro = self._coro
+        value = error = None
+        while True:
+            nested = [0.0]
+            token = _NESTED.set(nested)
+            start = time.perf_counter()
+            try:
+                if error is not None:
+                    future = coro.throw(error)
+                else:
+                    future = coro.send(value)
+            except StopIteration as stop:
+                return stop.value
+            finally:
+                elapsed = time.perf_counter() - start
+                _NESTED.reset(token)
+                parent = _NESTED.get()
+                if parent is not None:
+                    parent[0] += elapsed
+                self._monitor.observe(self._name, elapsed - nested[0])
+            try:
+                value, error = (yield future), None
+            except GeneratorExit:
+                coro.close()
+                raise
+            except BaseException as err:  # pylint: disable=broad-except
+                value, error = None, err
+
+
+class LoopMonitor:
+    """Time spent on the event loop by the SunSpec calls of one device"""
+
+    def __init__(self, name, threshold) -> None:
+        self.name = name
+        self.threshold = threshold
+        self.sections = {}
+        self.slow_steps = 0
+
+    async def watch(self, name, coro):
+        """Await coro, logging its steps that block the loop for too long"""
+        return await _MonitoredCoroutine(self, name, coro)
+
+    def observe(self, name, seconds):
+        histogram = self.sections.get(name)
+        if histogram is None:
+            histogram = self.sections[name] = LatencyHistogram()
+        histogram.observe(seconds)
+        if seconds > self.threshold:
+            self.slow_steps += 1
+            _LOGGER.warning(
+                f"{name} of {self.name} blocked the event loop for {seconds * 1000:.0f} ms"
+            )
+
+    def stats(self) -> dict:
+        return {
+            "threshold": self.threshold,
+            "slow_steps": self.slow_steps,
+            "sections": {
+                name: histogram.as_dict()
+                for name, histogram in sorted(self.sections.items())
+            },
+        }
+
+
+def monitored(func):
+    """Step the coroutine method func through the loop monitor of its object"""
+
+    @functools.wraps(func)
+    async def wrapper(self, *args, **kwargs):
+        monitor = self.loop_monitor
+        if monitor is None:
+            return await func(self, *args, **kwargs)
+        return await monitor.watch(func.__qualname__, func(self, *args, **kwargs))
+
+    return wrapper
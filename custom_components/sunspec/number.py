@@ -51,6 +51,3 @@ class SunSpecNumberEntity(NumberEntity, SunSpecEntity):
 
     async def async_set_native_value(self, value: float) -> None:
         await self.write(value)
-
-        await self.coordinator.async_refresh()
-
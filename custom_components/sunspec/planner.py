@@ -0,0 +1,303 @@
+"""Read and write planning for SunSpec register blocks.
+
+Models that sit next to each other in the register map are merged into spans
+and every span is read using as few max size Modbus requests as possible.
+Scale factors rarely change and are only read now and then. Writes only
+cover the registers of points that have been changed.
+"""
+
+import logging
+import time
+import weakref
+
+from sunspec2 import mdef
+from sunspec2.modbus.modbus import ModbusClientException
+from sunspec2.modbus.modbus import REQ_COUNT_MAX
+from sunspec2.modbus.modbus import REQ_WRITE_COUNT_MAX
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+# Number of unused registers we are willing to read to save a round trip
+MAX_READ_GAP = 16
+
+# Seconds between reads of the scale factors of a model
+SF_REFRESH_INTERVAL = 3600
+
+
+def model_span(model):
+    """Return start address and register count (including ID and L) of a model"""
+    if model.model_len:
+        return model.model_addr, model.model_len + 2
+    return model.model_addr, model.len
+
+
+def dirty_points(group) -> list:
+    """Return the points of a model or group changed since the last write"""
+    points = [point for point in group.points.values() if point.dirty]
+    for sub in group.groups.values():
+        for g in sub if isinstance(sub, list) else [sub]:
+            points += dirty_points(g)
+    return points
+
+
+def discard_changes(model):
+    """Forget the changes of a model that could not be written"""
+    for point in dirty_points(model):
+        point.dirty = False
+
+
+def load_model(model, data=None):
+    """Load register data into a model, keeping values that are not written yet
+
+    The model is read from the device if no data is given.
+    """
+    pending = [(point, point.value) for point in dirty_points(model)]
+    if data is None:
+        model.read()
+    else:
+        model.set_mb(data=data, dirty=False)
+    for point, value in pending:
+        point.set_value(value, dirty=True)
+
+
+def _all_points(group) -> list:
+    points = list(group.points.values())
+    for sub in group.groups.values():
+        for g in sub if isinstance(sub, list) else [sub]:
+            points += _all_points(g)
+    return points
+
+
+def value_ranges(model) -> list:
+    """Return (addr, count) of the registers of a model that are not scale factors
+
+    The ID and L header registers are left out as well, they do not change.
+    """
+    addr, count = model_span(model)
+    static = {0, 1}
+    for point in _all_points(model):
+        if point.pdef.get(mdef.TYPE) == mdef.TYPE_SUNSSF:
+            static.update(range(point.offset, point.offset + int(point.len)))
+    ranges = []
+    for offset in range(count):
+        if offset in static:
+            continue
+        if ranges and ranges[-1][0] + ranges[-1][1] == addr + offset:
+            ranges[-1] = (ranges[-1][0], ranges[-1][1] + 1)
+        else:
+            ranges.append((addr + offset, 1))
+    return ranges
+
+
+class ReadSpan:
+    """A contiguous register range covering parts of one or more models"""
+
+    def __init__(self, addr, count) -> None:
+        self.addr = addr
+        self.count = count
+        self.models = []
+        # (addr, count, model) of the model registers in the span
+        self.pieces = []
+
+    @property
+    def end(self):
+        return self.addr + self.count
+
+    def blocks(self, max_count=REQ_COUNT_MAX):
+        """Split the span into (addr, count) requests of at most max_count registers"""
+        blocks = []
+        addr = self.addr
+        while addr < self.end:
+            count = min(max_count, self.end - addr)
+            blocks.append((addr, count))
+            addr += count
+        return blocks
+
+
+class ReadPlan:
+    """Coalesced read plan for a set of models
+
+    ranges limits the read of a model to some of its registers, the other
+    registers are taken from the model data in images.
+    """
+
+    def __init__(
+        self,
+        models,
+        max_count=REQ_COUNT_MAX,
+        max_gap=MAX_READ_GAP,
+        ranges=None,
+        images=None,
+    ) -> None:
+        self.max_count = max_count
+        self.max_gap = max_gap
+        self.models = list(models)
+        self.images = images or {}
+        ranges = ranges or {}
+        pieces = []
+        for model in self.models:
+            model_ranges = ranges.get(model)
+            if model_ranges is None or model not in self.images:
+                model_ranges = [model_span(model)]
+            pieces += [(addr, count, model) for addr, count in model_ranges]
+        self.spans = []
+        for addr, count, model in sorted(pieces, key=lambda p: p[0]):
+            span = self.spans[-1] if self.spans else None
+            if span is not None and addr - span.end <= max_gap:
+                span.count = max(span.end, addr + count) - span.addr
+            else:
+                span = ReadSpan(addr, count)
+                self.spans.append(span)
+            span.pieces.append((addr, count, model))
+            if model not in span.models:
+                span.models.append(model)
+
+    @property
+    def num_requests(self):
+        return sum(len(span.blocks(self.max_count)) for span in self.spans)
+
+    @property
+    def num_registers(self):
+        return sum(span.count for span in self.spans)
+
+    def buffers(self) -> dict:
+        """Model data to fill with the spans read"""
+        buffers = {}
+        for model in self.models:
+            image = self.images.get(model)
+            if image is None:
+                image = bytes(model_span(model)[1] * 2)
+            buffers[model] = bytearray(image)
+        return buffers
+
+    @staticmethod
+    def store(span, data, buffers):
+        """Copy the data read for span into the model buffers"""
+        for addr, count, model in span.pieces:
+            buffer = buffers.get(model)
+            if buffer is None:
+                continue
+            src = (addr - span.addr) * 2
+            dst = (addr - model.model_addr) * 2
+            buffer[dst : dst + count * 2] = data[src : src + count * 2]
+
+    def load(self, buffers) -> dict:
+        """Load the filled buffers into the models, returns the data per model"""
+        images = {}
+        for model, buffer in buffers.items():
+            images[model] = bytes(buffer)
+            load_model(model, images[model])
+        return images
+
+    def execute(self, read) -> dict:
+        """Read all spans using read(addr, count) and fill the model objects
+
+        Returns the register data of each model.
+        """
+        buffers = self.buffers()
+        for span in self.spans:
+            try:
+                data = b"".join(
+                    read(addr, count) for addr, count in span.blocks(self.max_count)
+                )
+            except ModbusClientException as err:
+                # Some devices refuse reads that cross model boundaries
+                _LOGGER.debug(
+                    f"Coalesced read at {span.addr} failed ({err}), reading models one by one"
+                )
+                for model in span.models:
+                    if buffers.pop(model, None) is not None:
+                        load_model(model)
+                continue
+            self.store(span, data, buffers)
+        return self.load(buffers)
+
+
+class ScaleFactorCache:
+    """Register data of the models of a device, used to skip scale factor reads
+
+    Scale factors are read with the rest of a model when it has no data
+    cached yet, after a write or reconnect and every refresh_interval seconds.
+    Other reads only cover the value registers.
+    """
+
+    def __init__(self, refresh_interval=SF_REFRESH_INTERVAL) -> None:
+        self.refresh_interval = refresh_interval
+        self._images = weakref.WeakKeyDictionary()
+        self._read_time = weakref.WeakKeyDictionary()
+        self._ranges = weakref.WeakKeyDictionary()
+
+    def plan(self, models, now=None) -> ReadPlan:
+        """Read plan for models, reading scale factors only where they are due"""
+        now = time.monotonic() if now is None else now
+        ranges = {}
+        images = {}
+        for model in models:
+            image = self._images.get(model)
+            if image is None or now - self._read_time[model] >= self.refresh_interval:
+                continue
+            if model not in self._ranges:
+                self._ranges[model] = value_ranges(model)
+            ranges[model] = self._ranges[model]
+            images[model] = image
+        return ReadPlan(models, ranges=ranges, images=images)
+
+    def update(self, plan: ReadPlan, images, now=None):
+        """Remember the data read using plan"""
+        now = time.monotonic() if now is None else now
+        for model, image in images.items():
+            if model not in plan.images:
+                self._read_time[model] = now
+            self._images[model] = image
+        for model in plan.models:
+            if model not in images:
+                self.invalidate(model)
+
+    def invalidate(self, model=None):
+        """Read the scale factors of model, or of all models, with the next read"""
+        if model is None:
+            self._images.clear()
+        else:
+            self._images.pop(model, None)
+
+
+class WritePlan:
+    """Smallest register ranges covering the changed points of a model"""
+
+    def __init__(self, model, max_count=REQ_WRITE_COUNT_MAX) -> None:
+        self.points = sorted(dirty_points(model), key=lambda p: p.offset)
+        self.writes = []
+        addr = count = None
+        data = b""
+        for point in self.points:
+            point_addr = model.model_addr + point.offset
+            point_len = int(point.len)
+            if data and (point_addr != addr + count or count + point_len > max_count):
+                self.writes.append((addr, data))
+                data = b""
+            if not data:
+                addr, count = point_addr, 0
+            data += point.info.to_data(point.value, point_len * 2)
+            count += point_len
+        if data:
+            self.writes.append((addr, data))
+
+    @property
+    def num_requests(self):
+        return len(self.writes)
+
+    def execute(self, write):
+        """Write the ranges using write(addr, data)
+
+        The changes are dropped when the device refuses a write as well, the
+        model has to be read back to get the values of the device again.
+        """
+        try:
+            for addr, data in self.writes:
+                write(addr, data)
+        finally:
+            self.done()
+
+    def done(self):
+        for point in self.points:
+            point.dirty = False
@@ -0,0 +1,234 @@
+"""On-demand profiling of SunSpec refreshes.
+
+The profile service runs cProfile and tracemalloc during the next refreshes
+of the selected devices, including the reads in the executor and the state
+updates of the entities. The statistics are written to the config directory
+and a summary of the most expensive functions and allocations is logged.
+"""
+
+import cProfile
+from contextlib import contextmanager
+import io
+import logging
+import pstats
+import time
+import tracemalloc
+
+from homeassistant.core import HomeAssistant
+from homeassistant.core import ServiceCall
+from homeassistant.core import callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.event import async_call_later
+import voluptuous as vol
+
+from .const import DOMAIN
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+SERVICE_PROFILE = "profile"
+ATTR_REFRESHES = "refreshes"
+ATTR_TOP = "top"
+ATTR_ENTRY_ID = "entry_id"
+ATTR_TIMEOUT = "timeout"
+
+DEFAULT_REFRESHES = 1
+DEFAULT_TOP = 20
+# Seconds after which profiling stops even if not all refreshes happened
+DEFAULT_TIMEOUT = 600
+
+DATA_PROFILER = f"{DOMAIN}_profiler"
+
+PROFILE_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_REFRESHES, default=DEFAULT_REFRESHES): vol.All(
+            vol.Coerce(int), vol.Range(min=1)
+        ),
+        vol.Optional(ATTR_TOP, default=DEFAULT_TOP): vol.All(
+            vol.Coerce(int), vol.Range(min=1)
+        ),
+        vol.Optional(ATTR_ENTRY_ID): str,
+        vol.Optional(ATTR_TIMEOUT, default=DEFAULT_TIMEOUT): vol.All(
+            vol.Coerce(int), vol.Range(min=1)
+        ),
+    }
+)
+
+
+class RefreshProfiler:
+    """Profiles the next refreshes of a set of coordinators"""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        coordinators,
+        refreshes=DEFAULT_REFRESHES,
+        top=DEFAULT_TOP,
+        timeout=DEFAULT_TIMEOUT,
+    ) -> None:
+        self.hass = hass
+        self.top = top
+        self.timeout = timeout
+        self._remaining = {coordinator: refreshes for coordinator in coordinators}
+        self._profile = cProfile.Profile()
+        # Sections of concurrent refreshes share the profile
+        self._active = 0
+        self._start_snapshot = None
+        self._own_tracemalloc = False
+        self._cancel_timeout = None
+        self._finishing = False
+        # Resolves to the paths of the files written
+        self.done = hass.loop.create_future()
+
+    def start(self):
+        # Only one profiler can run at a time since Python 3.12
+        try:
+            self._profile.enable()
+        except ValueError as err:
+            raise HomeAssistantError(f"Cannot profile SunSpec: {err}") from err
+        self._profile.disable()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._own_tracemalloc = True
+        self._start_snapshot = tracemalloc.take_snapshot()
+        for coordinator in self._remaining:
+            coordinator.profiler = self
+        self._cancel_timeout = async_call_later(
+            self.hass, self.timeout, self._async_timeout
+        )
+        _LOGGER.info(
+            f"Profiling the next refreshes of {len(self._remaining)} SunSpec devices"
+        )
+
+    @contextmanager
+    def section(self):
+        """Profile the code run until the section ends, on any thread"""
+        if self._finishing:
+            yield
+            return
+        if self._active == 0:
+            try:
+                self._profile.enable()
+            except ValueError as err:
+                # Another profiler was started, the refresh must go on
+                _LOGGER.warning(f"SunSpec profiling stopped: {err}")
+                self._finish(HomeAssistantError(str(err)))
+                yield
+                return
+        self._active += 1
+        try:
+            yield
+        finally:
+            if not self._finishing:
+                self._active -= 1
+                if self._active == 0:
+                    self._profile.disable()
+
+    @callback
+    def refresh_done(self, coordinator):
+        remaining = self._remaining.get(coordinator)
+        if remaining is None:
+            return
+        if remaining > 1:
+            self._remaining[coordinator] = remaining - 1
+            return
+        del self._remaining[coordinator]
+        coordinator.profiler = None
+        if not self._remaining:
+            self._finish()
+
+    async def _async_timeout(self, _now):
+        self._cancel_timeout = None
+        _LOGGER.warning(
+            f"Profiling timed out with {len(self._remaining)} devices not refreshed"
+        )
+        self._finish()
+
+    @callback
+    def _finish(self, error=None):
+        if self._finishing:
+            return
+        self._finishing = True
+        if self._cancel_timeout is not None:
+            self._cancel_timeout()
+            self._cancel_timeout = None
+        for coordinator in self._remaining:
+            coordinator.profiler = None
+        self._remaining = {}
+        if self._active:
+            # Refreshes still in progress are only partially profiled
+            self._profile.disable()
+            self._active = 0
+        snapshot = tracemalloc.take_snapshot()
+        if self._own_tracemalloc:
+            tracemalloc.stop()
+        if error is not None:
+            self.done.set_exception(error)
+            self.done.exception()
+            self.hass.data.pop(DATA_PROFILER, None)
+            return
+        self.hass.async_create_background_task(
+            self._async_write(snapshot), f"{DOMAIN} write profile"
+        )
+
+    async def _async_write(self, snapshot):
+        try:
+            paths = await self.hass.async_add_executor_job(self._write, snapshot)
+        except Exception as err:  # pylint: disable=broad-except
+            _LOGGER.error(f"Writing the profile failed: {err}")
+            self.done.set_exception(err)
+            self.done.exception()
+        else:
+            self.done.set_result(paths)
+        finally:
+            self.hass.data.pop(DATA_PROFILER, None)
+
+    def _write(self, snapshot):
+        timestamp = int(time.time())
+        profile_path = self.hass.config.path(f"{DOMAIN}_profile.{timestamp}.pstats")
+        snapshot_path = self.hass.config.path(f"{DOMAIN}_memory.{timestamp}.snapshot")
+        self._profile.dump_stats(profile_path)
+        snapshot.dump(snapshot_path)
+
+        stream = io.StringIO()
+        pstats.Stats(self._profile, stream=stream).sort_stats(
+            pstats.SortKey.CUMULATIVE
+        ).print_stats(self.top)
+        allocations = "\n".join(
+            str(stat)
+            for stat in snapshot.compare_to(self._start_snapshot, "lineno")[: self.top]
+        )
+        _LOGGER.info(
+            f"SunSpec profile written to {profile_path} and {snapshot_path}\n"
+            f"{stream.getvalue()}\nTop allocations:\n{allocations}"
+        )
+        return profile_path, snapshot_path
+
+
+@callback
+def async_setup_services(hass: HomeAssistant):
+    """Register the profile service"""
+
+    async def async_profile(call: ServiceCall):
+        if hass.data.get(DATA_PROFILER) is not None:
+            raise HomeAssistantError("SunSpec profiling is already running")
+        entry_id = call.data.get(ATTR_ENTRY_ID)
+        coordinators = [
+            coordinator
+            for coordinator_entry_id, coordinator in hass.data.get(DOMAIN, {}).items()
+            if entry_id is None or coordinator_entry_id == entry_id
+        ]
+        if not coordinators:
+            raise HomeAssistantError("No SunSpec device to profile")
+        profiler = RefreshProfiler(
+            hass,
+            coordinators,
+            call.data[ATTR_REFRESHES],
+            call.data[ATTR_TOP],
+            call.data[ATTR_TIMEOUT],
+        )
+        profiler.start()
+        hass.data[DATA_PROFILER] = profiler
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_PROFILE, async_profile, schema=PROFILE_SCHEMA
+    )
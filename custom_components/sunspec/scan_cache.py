@@ -0,0 +1,248 @@
+"""Persistent cache of discovered SunSpec model maps.
+
+A full scan walks every model header of the device with a delay between
+models. The resulting map is stored per device and validated on the next
+connect with a few reads: the SunSpec marker and the common model, the
+headers and repeating group counts of the models that have them, the header
+of the last model and the end marker. Reads close to each other are merged.
+"""
+
+import logging
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+from sunspec2 import device as sunspec_device
+from sunspec2 import mb
+from sunspec2 import mdef
+from sunspec2.modbus.modbus import REQ_COUNT_MAX
+
+from .const import DOMAIN
+from .planner import MAX_READ_GAP
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+STORAGE_KEY = f"{DOMAIN}.scan_cache"
+STORAGE_VERSION = 1
+SAVE_DELAY = 10
+
+DATA_SCAN_CACHE = f"{DOMAIN}_scan_cache"
+
+COMMON_MODEL_ID = 1
+
+
+class ScanCache:
+    """Model maps of scanned devices, keyed by host:port:slave_id"""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self._hass = hass
+        self._store = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        self._data = {}
+
+    async def async_load(self):
+        self._data = await self._store.async_load() or {}
+
+    def get(self, key):
+        return self._data.get(key)
+
+    def set(self, key, entry):
+        """Store a model map, safe to call from executor threads"""
+        self._data[key] = entry
+        self._hass.loop.call_soon_threadsafe(
+            self._store.async_delay_save, lambda: self._data, SAVE_DELAY
+        )
+
+    def remove(self, key):
+        if self._data.pop(key, None) is not None:
+            self._hass.loop.call_soon_threadsafe(
+                self._store.async_delay_save, lambda: self._data, SAVE_DELAY
+            )
+
+
+async def async_get_scan_cache(hass: HomeAssistant) -> ScanCache:
+    cache = hass.data.get(DATA_SCAN_CACHE)
+    if cache is None:
+        cache = ScanCache(hass)
+        await cache.async_load()
+        hass.data[DATA_SCAN_CACHE] = cache
+    return cache
+
+
+def _group_counts(model):
+    counts = {}
+    if model.model_def is None:
+        return counts
+    for name in mdef.get_group_len_points(model.model_def[mdef.GROUP]):
+        point = model.points.get(name)
+        if point is not None and point.value is not None:
+            counts[name] = point.value
+    return counts
+
+
+def serial_number(device):
+    models = device.models.get(COMMON_MODEL_ID)
+    if not models:
+        return None
+    return models[0].points["SN"].value
+
+
+def create_model_map(device) -> dict:
+    """Describe the models of a scanned device"""
+    return {
+        "base_addr": device.base_addr,
+        "serial": serial_number(device),
+        "models": [
+            {
+                "id": model.model_id,
+                "addr": model.model_addr,
+                "len": model.model_len,
+                "counts": _group_counts(model),
+            }
+            for model in device.model_list
+        ],
+    }
+
+
+def _count_offsets(model_id, counts) -> dict:
+    """Register offsets of the repeating group counts of a model"""
+    offsets = {}
+    if not counts:
+        return offsets
+    gdef = sunspec_device.get_model_def(model_id)[mdef.GROUP]
+    offset = 0
+    for pdef in gdef.get(mdef.POINTS, []):
+        if pdef[mdef.NAME] in counts:
+            offsets[pdef[mdef.NAME]] = offset
+        offset += int(
+            pdef.get(mdef.SIZE) or mdef.point_type_info[pdef[mdef.TYPE]]["len"]
+        )
+    return offsets
+
+
+def _checked_models(entry) -> list:
+    """Models after the common model whose header is checked"""
+    models = entry["models"]
+    return [
+        item
+        for index, item in enumerate(models)
+        if index > 0 and (item["counts"] or index == len(models) - 1)
+    ]
+
+
+def _end_addr(entry):
+    last = entry["models"][-1]
+    return last["addr"] + last["len"] + 2
+
+
+def verify_reads(entry) -> list:
+    """Return the (addr, count) reads used to validate a cached model map"""
+    common = entry["models"][0]
+    ranges = [
+        (entry["base_addr"], common["addr"] - entry["base_addr"] + common["len"] + 2)
+    ]
+    for item in _checked_models(entry):
+        offsets = _count_offsets(item["id"], item["counts"])
+        ranges.append((item["addr"], max([2] + [o + 1 for o in offsets.values()])))
+    ranges.append((_end_addr(entry), 2))
+
+    reads = []
+    for addr, count in sorted(ranges):
+        if reads:
+            last_addr, last_count = reads[-1]
+            end = max(last_addr + last_count, addr + count)
+            if addr - (last_addr + last_count) <= MAX_READ_GAP and (
+                end - last_addr <= REQ_COUNT_MAX
+            ):
+                reads[-1] = (last_addr, end - last_addr)
+                continue
+        reads.append((addr, count))
+    return reads
+
+
+def _registers(reads, data, addr, count):
+    """Data of count registers at addr taken from the data of reads"""
+    for (read_addr, read_count), read_data in zip(reads, data):
+        if read_addr <= addr and addr + count <= read_addr + read_count:
+            offset = (addr - read_addr) * 2
+            return read_data[offset : offset + count * 2]
+    return None
+
+
+def _headers_match(entry, reads, data) -> bool:
+    for item in _checked_models(entry):
+        header = _registers(reads, data, item["addr"], 2)
+        if (
+            header is None
+            or len(header) != 4
+            or mb.data_to_u16(header[0:2]) != item["id"]
+            or mb.data_to_u16(header[2:4]) != item["len"]
+        ):
+            return False
+        for name, offset in _count_offsets(item["id"], item["counts"]).items():
+            count = _registers(reads, data, item["addr"] + offset, 1)
+            if count is None or mb.data_to_u16(count) != item["counts"][name]:
+                return False
+    end = _registers(reads, data, _end_addr(entry), 1)
+    return end is not None and mb.data_to_u16(end) == mb.SUNS_END_MODEL_ID
+
+
+def _header_data(model_id, model_len, counts):
+    """Model data holding only the header and the repeating group counts"""
+    regs = 2
+    if counts:
+        gdef = sunspec_device.get_model_def(model_id)[mdef.GROUP]
+        regs = max(regs, mdef.get_group_len_points_index(gdef))
+    data = bytearray(regs * 2)
+    data[0:4] = mb.u16_to_data(model_id) + mb.u16_to_data(model_len)
+    for name, offset in _count_offsets(model_id, counts).items():
+        if offset < regs:
+            data[offset * 2 : offset * 2 + 2] = mb.u16_to_data(counts[name])
+    return bytes(data)
+
+
+def restore_model_map(device, entry, data) -> bool:
+    """Recreate the models of device from a cached map
+
+    data holds the registers read for each of the verify_reads of the map,
+    the map is only used if they match it.
+    """
+    models = entry.get("models") or []
+    if not models or models[0]["id"] != COMMON_MODEL_ID:
+        return False
+    base_addr = entry["base_addr"]
+    common = models[0]
+    reads = verify_reads(entry)
+    if len(data) != len(reads) or data[0][:4] != b"SunS":
+        return False
+    common_data = _registers(reads, data, common["addr"], common["len"] + 2)
+    if (
+        common_data is None
+        or len(common_data) != (common["len"] + 2) * 2
+        or mb.data_to_u16(common_data[0:2]) != COMMON_MODEL_ID
+        or mb.data_to_u16(common_data[2:4]) != common["len"]
+    ):
+        return False
+    if not _headers_match(entry, reads, data):
+        _LOGGER.debug("Cached model map does not match the model headers")
+        return False
+
+    device.base_addr = base_addr
+    device.delete_models()
+    for mid, item in enumerate(models):
+        if mid == 0:
+            model_data = common_data
+        else:
+            model_data = _header_data(item["id"], item["len"], item["counts"])
+        model = device.model_class(
+            model_id=item["id"],
+            model_addr=item["addr"],
+            model_len=item["len"],
+            data=model_data,
+            mb_device=device,
+        )
+        model.mid = f"{device.did}_{mid}"
+        device.add_model(model)
+        if mid == 0 and serial_number(device) != entry.get("serial"):
+            _LOGGER.debug("Cached model map belongs to another device")
+            device.delete_models()
+            return False
+    return True
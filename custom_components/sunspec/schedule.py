@@ -0,0 +1,62 @@
+"""Per model polling schedule for SunSpec devices."""
+
+import logging
+import time
+
+from .const import NAMEPLATE_INTERVAL
+from .const import NAMEPLATE_MODELS
+from .const import SETTINGS_INTERVAL
+from .const import SETTINGS_MODELS
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+
+def default_model_interval(model_id, scan_interval) -> int:
+    """Polling interval for a model by its class, measurements use scan_interval"""
+    if model_id in NAMEPLATE_MODELS:
+        return max(NAMEPLATE_INTERVAL, scan_interval)
+    if model_id in SETTINGS_MODELS:
+        return max(SETTINGS_INTERVAL, scan_interval)
+    return scan_interval
+
+
+class ModelScheduler:
+    """Tracks which models are due for reading on each coordinator tick"""
+
+    def __init__(self, intervals: dict, scan_interval) -> None:
+        self.intervals = {int(model_id): int(i) for model_id, i in intervals.items()}
+        self.scan_interval = scan_interval
+        self._last_read = {}
+
+    def interval(self, model_id):
+        interval = self.intervals.get(model_id)
+        if interval is None:
+            return default_model_interval(model_id, self.scan_interval)
+        return interval
+
+    @property
+    def tick(self):
+        """Shortest interval, used as the coordinator update interval"""
+        return min([self.scan_interval] + list(self.intervals.values()))
+
+    def due(self, model_ids, now=None) -> set:
+        """Return the models that have never been read or are due"""
+        now = time.monotonic() if now is None else now
+        # Read a model on the tick closest to its due time rather than one late
+        slack = self.tick / 2
+        due = set()
+        for model_id in model_ids:
+            last_read = self._last_read.get(model_id)
+            if last_read is None or now - last_read + slack >= self.interval(model_id):
+                due.add(model_id)
+        return due
+
+    def mark_read(self, model_ids, now=None):
+        now = time.monotonic() if now is None else now
+        for model_id in model_ids:
+            self._last_read[model_id] = now
+
+    def expire(self, model_ids):
+        """Read the models on the next tick, e.g. after a write"""
+        for model_id in model_ids:
+            self._last_read.pop(model_id, None)
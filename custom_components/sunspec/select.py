@@ -8,6 +8,7 @@ from homeassistant.components.select import SelectEntity
 from homeassistant.core import HomeAssistant, callback
 
 from .entity import SunSpecEntity
+from .symbols import SymbolTable
 
 _LOGGER: logging.Logger = logging.getLogger(__package__)
 
@@ -28,8 +29,8 @@ class SunSpecSelect(SunSpecEntity, SelectEntity):
         self.enum_value = None
         self._attr_options = []
 
-        self._attr_options = self._point_meta.get("symbols", None)
-        self._attr_options = [item["name"] for item in self._attr_options]
+        self._symbols = SymbolTable(self._point_meta.get("symbols", None))
+        self._attr_options = self._symbols.names
 
         _LOGGER.debug("Valid options for select: %s", self._attr_options)
         self._attr_extra_state_attributes["options"] = self._attr_options
@@ -39,13 +40,8 @@ class SunSpecSelect(SunSpecEntity, SelectEntity):
 
     async def async_select_option(self, option: str) -> None:
         """Change the selected option."""
-        symbols = self._point_meta.get("symbols", None)
-        if symbols is None:
-            _LOGGER.error("No symbols to convert option")
-            return
-        symbol = list(filter(lambda s: s["name"] == option, symbols))
-        if len(symbol) == 1:
-            val = symbol[0]["value"]
+        val = self._symbols.value(option)
+        if val is not None:
             await self.write(val)
         else:
             _LOGGER.error("Invalid option selected.")
@@ -74,12 +70,8 @@ class SunSpecSelect(SunSpecEntity, SelectEntity):
             _LOGGER.error("Model %s not found", self.model_id)
             return None
         self.enum_value = val
-        symbols = self._point_meta.get("symbols", None)
-        if symbols is None:
-            return None
-        symbol = list(filter(lambda s: s["value"] == val, symbols))
-        if len(symbol) == 1:
-            self._attr_current_option = symbol[0]["name"][:255]
-            return self._attr_current_option
-        return None
+        name = self._symbols.enum_name(val)
+        if name is not None:
+            self._attr_current_option = name
+        return name
 
@@ -4,15 +4,76 @@ import logging
 from homeassistant.components.sensor import (
     RestoreSensor, SensorDeviceClass, SensorEntity, SensorStateClass
 )
+from homeassistant.const import EntityCategory, UnitOfInformation, UnitOfTime
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
+from .const import CONF_TELEMETRY_SENSORS, DOMAIN
 from .entity import SunSpecEntity, HA_META
+from .symbols import SymbolTable
 
 _LOGGER: logging.Logger = logging.getLogger(__package__)
 
+# Name, unit, device class and state class of the telemetry sensors,
+# by key of DeviceTelemetry.summary()
+TELEMETRY_SENSORS = {
+    "transactions": [
+        "Modbus transactions",
+        None,
+        None,
+        SensorStateClass.TOTAL_INCREASING,
+    ],
+    "errors": ["Modbus errors", None, None, SensorStateClass.TOTAL_INCREASING],
+    "bytes_read": [
+        "Bytes read",
+        UnitOfInformation.BYTES,
+        SensorDeviceClass.DATA_SIZE,
+        SensorStateClass.TOTAL_INCREASING,
+    ],
+    "bytes_written": [
+        "Bytes written",
+        UnitOfInformation.BYTES,
+        SensorDeviceClass.DATA_SIZE,
+        SensorStateClass.TOTAL_INCREASING,
+    ],
+    "reconnects": ["Reconnects", None, None, SensorStateClass.TOTAL_INCREASING],
+    "lock_wait": [
+        "Lock wait",
+        UnitOfTime.SECONDS,
+        SensorDeviceClass.DURATION,
+        SensorStateClass.TOTAL_INCREASING,
+    ],
+    "gateway_wait": [
+        "Gateway wait",
+        UnitOfTime.SECONDS,
+        SensorDeviceClass.DURATION,
+        SensorStateClass.TOTAL_INCREASING,
+    ],
+    "io_wait": [
+        "I/O queue wait",
+        UnitOfTime.SECONDS,
+        SensorDeviceClass.DURATION,
+        SensorStateClass.TOTAL_INCREASING,
+    ],
+    "refresh_duration": [
+        "Refresh duration",
+        UnitOfTime.SECONDS,
+        SensorDeviceClass.DURATION,
+        SensorStateClass.MEASUREMENT,
+    ],
+}
+
 
 async def async_setup_entry(hass, entry, async_add_devices):
     """Setup sensor platform."""
     await SunSpecEntity.async_setup_entry(hass, entry, async_add_devices, create_device_callback)
+    if entry.options.get(CONF_TELEMETRY_SENSORS, False):
+        coordinator = hass.data[DOMAIN][entry.entry_id]
+        async_add_devices(
+            [
+                SunSpecTelemetrySensor(coordinator, entry, key)
+                for key in TELEMETRY_SENSORS
+            ]
+        )
 
 
 def create_device_callback(coordinator, entry, data, meta):
@@ -35,6 +96,7 @@ class SunSpecSensor(SunSpecEntity, SensorEntity):
     def __init__(self, coordinator, config_entry, data):
         super().__init__(coordinator, config_entry, data)
         self._options = []
+        self._symbols = None
         # Used if this is an energy sensor and the read value is 0
         # Updated wheneve the value read is not 0
         self.lastKnown = None
@@ -45,12 +107,12 @@ class SunSpecSensor(SunSpecEntity, SensorEntity):
             self.use_device_class = None
             self._attr_native_unit_of_measurement = None
         if vtype in ("enum16", "bitfield32"):
-            self._options = self._point_meta.get("symbols", None)
-            if self._options is None:
+            symbols = self._point_meta.get("symbols", None)
+            if symbols is None:
                 self.use_device_class = None
             else:
-                self._options = [item["name"] for item in self._options]
-                self._options.append("")
+                self._symbols = SymbolTable(symbols)
+                self._options = self._symbols.names + [""]
 
         _LOGGER.debug(
             "Created sensor entity for %s device class %s unit %s",
@@ -95,22 +157,11 @@ class SunSpecSensor(SunSpecEntity, SensorEntity):
             return None
         vtype = self._meta["type"]
         if vtype in ("enum16", "bitfield32"):
-            symbols = self._point_meta.get("symbols", None)
-            if symbols is None:
+            if self._symbols is None:
                 return val
             if vtype == "enum16":
-                symbol = list(filter(lambda s: s["value"] == val, symbols))
-                if len(symbol) == 1:
-                    return symbol[0]["name"][:255]
-                else:
-                    return None
-            else:
-                symbols = list(
-                    filter(lambda s: (val >> int(s["value"])) & 1 == 1, symbols)
-                )
-                if len(symbols) > 0:
-                    return ",".join(map(lambda s: s["name"], symbols))[:255]
-                return ""
+                return self._symbols.enum_name(val)
+            return self._symbols.bitfield_names(val)
         return val
 
     @property
@@ -158,3 +209,43 @@ class SunSpecEnergySensor(SunSpecSensor, RestoreSensor):
             self.last_known_value = state.native_value
         else:
             _LOGGER.debug(f"{self.name} No previous state was found")
+
+
+class SunSpecTelemetrySensor(CoordinatorEntity, SensorEntity):
+    """Poll statistics of the device, updated after every refresh"""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    # Named after the device, like the other diagnostic entities in HA
+    _attr_has_entity_name = True
+
+    def __init__(self, coordinator, config_entry, key):
+        super().__init__(coordinator)
+        self.config_entry = config_entry
+        self.key = key
+        name, unit, device_class, state_class = TELEMETRY_SENSORS[key]
+        self._attr_name = name
+        self._attr_unique_id = f"{config_entry.entry_id}_telemetry_{key}"
+        self._attr_native_unit_of_measurement = unit
+        self._attr_device_class = device_class
+        self._attr_state_class = state_class
+
+    @property
+    def available(self):
+        # Statistics are most useful while the device does not respond
+        return True
+
+    @property
+    def native_value(self):
+        return self.coordinator.api.telemetry.summary()[self.key]
+
+    @property
+    def device_info(self):
+        device_data = self.coordinator.api.first_wrapper
+        model_info = device_data.getGroupMeta()
+        return {
+            "identifiers": {(DOMAIN, self.config_entry.entry_id, model_info["name"])},
+            "name": model_info["label"],
+            "model": device_data.getValue("Md"),
+            "sw_version": device_data.getValue("Vr"),
+            "manufacturer": device_data.getValue("Mn"),
+        }
@@ -0,0 +1,52 @@
+"""Lookup tables for the symbols of enum and bitfield points."""
+
+# Number of distinct bitfield values remembered per table
+MAX_BITMASK_CACHE = 64
+
+# Longest state HA accepts
+MAX_STATE_LENGTH = 255
+
+
+class SymbolTable:
+    """Symbols of a point, indexed by value, name and bit"""
+
+    def __init__(self, symbols) -> None:
+        self.names = [symbol["name"] for symbol in symbols]
+        self._by_value = self._unique(
+            (symbol["value"], symbol["name"]) for symbol in symbols
+        )
+        self._by_name = self._unique(
+            (symbol["name"], symbol["value"]) for symbol in symbols
+        )
+        self._bits = [(1 << int(symbol["value"]), symbol["name"]) for symbol in symbols]
+        self._bitmasks = {}
+
+    @staticmethod
+    def _unique(items) -> dict:
+        """Map keys to values, keys that occur more than once map to None"""
+        table = {}
+        for key, value in items:
+            table[key] = None if key in table else value
+        return table
+
+    def enum_name(self, value):
+        """Name of an enum value, None if it has no symbol"""
+        name = self._by_value.get(value)
+        if name is None:
+            return None
+        return name[:MAX_STATE_LENGTH]
+
+    def bitfield_names(self, value) -> str:
+        """Comma separated names of the bits set in value"""
+        names = self._bitmasks.get(value)
+        if names is None:
+            names = ",".join(name for bit, name in self._bits if value & bit)
+            names = names[:MAX_STATE_LENGTH]
+            if len(self._bitmasks) >= MAX_BITMASK_CACHE:
+                self._bitmasks.clear()
+            self._bitmasks[value] = names
+        return names
+
+    def value(self, name):
+        """Value of a symbol name, None if there is no such symbol"""
+        return self._by_name.get(name)
@@ -0,0 +1,165 @@
+"""Poll telemetry of a SunSpec device.
+
+Counts the Modbus traffic of a device and times its reads, waits for the
+connection and refreshes, so slow devices and gateways can be found in the
+diagnostics download or with the optional diagnostic sensors.
+"""
+
+import bisect
+import math
+
+# Upper bounds in seconds of the latency histogram buckets
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Bytes of register data per register
+REGISTER_SIZE = 2
+
+
+class LatencyHistogram:
+    """Count, total, maximum and bucket counts of measured durations"""
+
+    def __init__(self, bounds=LATENCY_BUCKETS) -> None:
+        self.bounds = bounds
+        # The last bucket counts everything above the largest bound
+        self.buckets = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = None
+
+    def observe(self, seconds):
+        self.buckets[bisect.bisect_left(self.bounds, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.last = seconds
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q quantile, None without samples"""
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(q * self.count))
+        seen = 0
+        for bound, count in zip(self.bounds, self.buckets):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.max
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.mean,
+            "max": self.max,
+            "last": self.last,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "buckets": {
+                **{
+                    str(bound): count for bound, count in zip(self.bounds, self.buckets)
+                },
+                "+Inf": self.buckets[-1],
+            },
+        }
+
+
+class DeviceTelemetry:
+    """Modbus traffic and timings of one device"""
+
+    def __init__(self) -> None:
+        self.transactions = 0
+        self.registers_read = 0
+        self.registers_written = 0
+        self.errors = 0
+        self.connects = 0
+        # Time waiting for the device lock and for the shared gateway connection
+        self.lock_wait = LatencyHistogram()
+        self.gateway_wait = LatencyHistogram()
+        # Time the blocking I/O waited in the queue of the gateway worker
+        self.io_wait = LatencyHistogram()
+        self.refresh = LatencyHistogram()
+        self.refresh_errors = 0
+        # Duration of the reads that included a model, by model id
+        self.model_latency = {}
+
+    @property
+    def bytes_read(self) -> int:
+        return self.registers_read * REGISTER_SIZE
+
+    @property
+    def bytes_written(self) -> int:
+        return self.registers_written * REGISTER_SIZE
+
+    @property
+    def reconnects(self) -> int:
+        """Connections opened after the first one"""
+        return max(self.connects - 1, 0)
+
+    def record_read(self, registers, transactions=1):
+        self.transactions += transactions
+        self.registers_read += registers
+
+    def record_write(self, registers, transactions=1):
+        self.transactions += transactions
+        self.registers_written += registers
+
+    def record_error(self):
+        self.errors += 1
+
+    def record_connect(self):
+        self.connects += 1
+
+    def record_model_reads(self, model_ids, seconds):
+        for model_id in model_ids:
+            histogram = self.model_latency.get(model_id)
+            if histogram is None:
+                histogram = self.model_latency[model_id] = LatencyHistogram()
+            histogram.observe(seconds)
+
+    def record_refresh(self, seconds, failed=False):
+        self.refresh.observe(seconds)
+        if failed:
+            self.refresh_errors += 1
+
+    def summary(self) -> dict:
+        """Counters and the latest timings, as shown by the diagnostic sensors"""
+        return {
+            "transactions": self.transactions,
+            "errors": self.errors,
+            "registers_read": self.registers_read,
+            "registers_written": self.registers_written,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "connects": self.connects,
+            "reconnects": self.reconnects,
+            "lock_wait": self.lock_wait.total,
+            "gateway_wait": self.gateway_wait.total,
+            "io_wait": self.io_wait.total,
+            "refresh_duration": self.refresh.last,
+        }
+
+    def as_dict(self) -> dict:
+        return {
+            "transactions": self.transactions,
+            "errors": self.errors,
+            "registers_read": self.registers_read,
+            "registers_written": self.registers_written,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "connects": self.connects,
+            "reconnects": self.reconnects,
+            "lock_wait": self.lock_wait.as_dict(),
+            "gateway_wait": self.gateway_wait.as_dict(),
+            "io_wait": self.io_wait.as_dict(),
+            "refresh": self.refresh.as_dict(),
+            "refresh_errors": self.refresh_errors,
+            "model_latency": {
+                str(model_id): histogram.as_dict()
+                for model_id, histogram in sorted(self.model_latency.items())
+            },
+        }
@@ -0,0 +1,46 @@
+"""Request timeouts adapted to the measured round trip time of a device.
+
+The retransmission timeout estimator of TCP (RFC 6298) is applied to Modbus
+requests: a fast device gets a short timeout so a stalled one is noticed
+within a few seconds, a slow device gets as much time as it needs.
+"""
+
+CONNECT_TIMEOUT = 3.0
+MIN_READ_TIMEOUT = 1.0
+MAX_READ_TIMEOUT = 5.0
+
+RTT_ALPHA = 1 / 8
+RTT_BETA = 1 / 4
+
+
+class AdaptiveTimeout:
+    """Read timeout of a device derived from smoothed round trip times"""
+
+    def __init__(
+        self, min_timeout=MIN_READ_TIMEOUT, max_timeout=MAX_READ_TIMEOUT
+    ) -> None:
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.srtt = None
+        self.rttvar = None
+        # Until the first response is seen allow the maximum
+        self.timeout = max_timeout
+
+    def sample(self, rtt):
+        """Record the round trip time of a request that got a response"""
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = (1 - RTT_BETA) * self.rttvar + RTT_BETA * abs(self.srtt - rtt)
+            self.srtt = (1 - RTT_ALPHA) * self.srtt + RTT_ALPHA * rtt
+        self.timeout = min(
+            max(self.srtt + 4 * self.rttvar, self.min_timeout), self.max_timeout
+        )
+
+    def backoff(self):
+        """Allow more time after a request timed out"""
+        self.timeout = min(self.timeout * 2, self.max_timeout)
+
+    def stats(self) -> dict:
+        return {"srtt": self.srtt, "rttvar": self.rttvar, "timeout": self.timeout}
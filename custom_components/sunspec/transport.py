@@ -0,0 +1,332 @@
+"""Asyncio Modbus TCP transport for SunSpec devices.
+
+Speaks Modbus TCP directly on the event loop so a slow device does not hold
+an executor thread. The register data is loaded into the regular pysunspec2
+model objects, so everything above the transport works unchanged.
+"""
+
+import asyncio
+import logging
+import struct
+import time
+
+from sunspec2 import mb
+import sunspec2.modbus.client as modbus_client
+from sunspec2.modbus.modbus import FUNC_READ_HOLDING
+from sunspec2.modbus.modbus import FUNC_WRITE_MULTIPLE
+from sunspec2.modbus.modbus import FUNC_WRITE_SINGLE
+from sunspec2.modbus.modbus import ModbusClientError
+from sunspec2.modbus.modbus import ModbusClientException
+from sunspec2.modbus.modbus import ModbusClientTimeout
+from sunspec2.modbus.modbus import REQ_COUNT_MAX
+from sunspec2.modbus.modbus import REQ_WRITE_COUNT_MAX
+
+from .connection import DEFAULT_IDLE_TIMEOUT
+from .planner import ReadPlan
+from .planner import WritePlan
+from .planner import model_span
+from .telemetry import DeviceTelemetry
+from .timeouts import CONNECT_TIMEOUT
+from .timeouts import AdaptiveTimeout
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+MBAP_HEADER = struct.Struct(">HHHB")
+
+
+class AsyncModbusTCPClient:
+    """Modbus TCP client connection running on the event loop"""
+
+    def __init__(
+        self,
+        host,
+        port,
+        connect_timeout=CONNECT_TIMEOUT,
+        idle_timeout=DEFAULT_IDLE_TIMEOUT,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.connect_timeout = connect_timeout
+        # Read timeouts per unit id, the units behind a gateway may differ
+        self.timeouts = {}
+        self.idle_timeout = idle_timeout
+        self.connect_count = 0
+        self.connected_at = None
+        self.last_used = None
+        self._reader = None
+        self._writer = None
+        self._transaction_id = 0
+        self._lock = asyncio.Lock()
+
+    @property
+    def is_connected(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+
+    @property
+    def connection_age(self):
+        if self.connected_at is None:
+            return None
+        return time.monotonic() - self.connected_at
+
+    async def connect(self, telemetry: DeviceTelemetry = None):
+        await self.close()
+        _LOGGER.debug(f"Opening asyncio Modbus connection to {self.host}:{self.port}")
+        try:
+            self._reader, self._writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port), self.connect_timeout
+            )
+        except (OSError, asyncio.TimeoutError) as err:
+            raise ModbusClientError(f"Connection error: {err}") from err
+        self.connect_count += 1
+        self.connected_at = self.last_used = time.monotonic()
+        if telemetry is not None:
+            telemetry.record_connect()
+
+    async def close(self):
+        writer = self._writer
+        self._reader = self._writer = None
+        self.connected_at = None
+        if writer is not None:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+    async def close_if_idle(self) -> bool:
+        if self.connected_at is None or self.last_used is None:
+            return False
+        idle = time.monotonic() - self.last_used
+        if idle < self.idle_timeout:
+            return False
+        async with self._lock:
+            await self.close()
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "connected": self.connected_at is not None,
+            "connect_count": self.connect_count,
+            "connection_age": self.connection_age,
+        }
+
+    def timeout(self, unit_id) -> AdaptiveTimeout:
+        timeout = self.timeouts.get(unit_id)
+        if timeout is None:
+            timeout = self.timeouts[unit_id] = AdaptiveTimeout()
+        return timeout
+
+    async def _request(self, unit_id, pdu, telemetry: DeviceTelemetry) -> bytes:
+        timeout = self.timeout(unit_id)
+        wait_start = time.monotonic()
+        async with self._lock:
+            telemetry.gateway_wait.observe(time.monotonic() - wait_start)
+            if not self.is_connected:
+                await self.connect(telemetry)
+            self._transaction_id = (self._transaction_id + 1) & 0xFFFF
+            tid = self._transaction_id
+            self._writer.write(MBAP_HEADER.pack(tid, 0, len(pdu) + 1, unit_id) + pdu)
+            start = time.monotonic()
+            try:
+                await self._writer.drain()
+                while True:
+                    header = await asyncio.wait_for(
+                        self._reader.readexactly(MBAP_HEADER.size), timeout.timeout
+                    )
+                    resp_tid, _, length, _ = MBAP_HEADER.unpack(header)
+                    resp = await asyncio.wait_for(
+                        self._reader.readexactly(length - 1), timeout.timeout
+                    )
+                    if resp_tid == tid:
+                        break
+                    _LOGGER.debug(f"Dropping stale response for transaction {resp_tid}")
+            except asyncio.TimeoutError as err:
+                telemetry.record_error()
+                timeout.backoff()
+                # The connection state is unknown after a timeout
+                await self.close()
+                raise ModbusClientTimeout("Response timeout") from err
+            except (OSError, asyncio.IncompleteReadError) as err:
+                telemetry.record_error()
+                await self.close()
+                raise ModbusClientError(f"Connection error: {err}") from err
+            except asyncio.CancelledError:
+                # The response to the request sent would be read by the next one
+                await self.close()
+                raise
+            self.last_used = time.monotonic()
+            timeout.sample(self.last_used - start)
+
+        if resp[0] & 0x80:
+            raise ModbusClientException(f"Modbus exception {resp[1]}")
+        return resp
+
+    async def read(
+        self, unit_id, addr, count, op=FUNC_READ_HOLDING, telemetry=None
+    ) -> bytes:
+        telemetry = DeviceTelemetry() if telemetry is None else telemetry
+        data = bytearray()
+        addr, count = int(addr), int(count)
+        while count > 0:
+            read_count = min(count, REQ_COUNT_MAX)
+            resp = await self._request(
+                unit_id, struct.pack(">BHH", op, addr, read_count), telemetry
+            )
+            if resp[1] != read_count * 2 or len(resp) != read_count * 2 + 2:
+                telemetry.record_error()
+                raise ModbusClientError(
+                    f"Expected {read_count * 2} bytes, response has {len(resp) - 2}"
+                )
+            telemetry.record_read(read_count)
+            data += resp[2:]
+            addr += read_count
+            count -= read_count
+        return bytes(data)
+
+    async def write(self, unit_id, addr, data, telemetry=None):
+        telemetry = DeviceTelemetry() if telemetry is None else telemetry
+        addr = int(addr)
+        if len(data) == 2:
+            await self._request(
+                unit_id, struct.pack(">BH", FUNC_WRITE_SINGLE, addr) + data, telemetry
+            )
+            telemetry.record_write(1)
+            return
+        offset = 0
+        while offset < len(data):
+            chunk = data[offset : offset + REQ_WRITE_COUNT_MAX * 2]
+            await self._request(
+                unit_id,
+                struct.pack(
+                    ">BHHB", FUNC_WRITE_MULTIPLE, addr, len(chunk) // 2, len(chunk)
+                )
+                + chunk,
+                telemetry,
+            )
+            telemetry.record_write(len(chunk) // 2)
+            addr += len(chunk) // 2
+            offset += len(chunk)
+
+
+class AsyncSunSpecModbusDevice(modbus_client.SunSpecModbusClientDevice):
+    """pysunspec2 device whose registers are read through an AsyncModbusTCPClient
+
+    The blocking read and write of the pysunspec2 device are not available,
+    models are read and written by the coroutines below.
+    """
+
+    def __init__(
+        self, transport: AsyncModbusTCPClient, slave_id, telemetry=None
+    ) -> None:
+        super().__init__()
+        self.transport = transport
+        self.slave_id = slave_id
+        self.telemetry = DeviceTelemetry() if telemetry is None else telemetry
+
+    def is_connected(self):
+        return self.transport.is_connected
+
+    def read(self, addr, count, op=FUNC_READ_HOLDING):
+        raise modbus_client.SunSpecModbusClientError(
+            "Blocking read is not supported by the asyncio transport"
+        )
+
+    def write(self, addr, data):
+        raise modbus_client.SunSpecModbusClientError(
+            "Blocking write is not supported by the asyncio transport"
+        )
+
+    async def async_read(self, addr, count) -> bytes:
+        return await self.transport.read(
+            self.slave_id, addr, count, telemetry=self.telemetry
+        )
+
+    async def async_scan(self):
+        """Discover the models of the device, reading each model in full"""
+        self.base_addr = None
+        self.delete_models()
+
+        data = b""
+        error = ""
+        for addr in self.base_addr_list:
+            try:
+                data = await self.async_read(addr, 2)
+            except ModbusClientException:
+                continue
+            except ModbusClientTimeout as err:
+                error = error or str(err)
+                continue
+            if data == b"SunS":
+                self.base_addr = addr
+                break
+            error = "Device responded - not SunSpec register map"
+        if self.base_addr is None:
+            raise modbus_client.SunSpecModbusClientError(error or "Unknown error")
+
+        addr = self.base_addr + 2
+        model_id, model_len = await self._async_read_header(addr)
+        mid = 0
+        while model_id != mb.SUNS_END_MODEL_ID:
+            _LOGGER.debug(f"Scanning model {model_id}")
+            # Reads stay within the model, some devices refuse reads across
+            model_data = await self.async_read(addr, model_len + 2)
+            model = self.model_class(
+                model_id=model_id,
+                model_addr=addr,
+                model_len=model_len,
+                data=model_data,
+                mb_device=self,
+            )
+            model.mid = f"{self.did}_{mid}"
+            mid += 1
+            self.add_model(model)
+
+            addr += model_len + 2
+            model_id, model_len = await self._async_read_header(addr)
+
+    async def _async_read_header(self, addr):
+        """Return the ID and length of the model at addr"""
+        try:
+            data = await self.async_read(addr, 2)
+        except ModbusClientException:
+            # The end marker may have no length register
+            data = await self.async_read(addr, 1)
+            if mb.data_to_u16(data) != mb.SUNS_END_MODEL_ID:
+                raise
+            return mb.SUNS_END_MODEL_ID, 0
+        return mb.data_to_u16(data[:2]), mb.data_to_u16(data[2:])
+
+    async def async_read_models(self, models, plan: ReadPlan = None) -> dict:
+        """Read models with coalesced requests, returns the register data per model"""
+        plan = plan or ReadPlan(models)
+        buffers = plan.buffers()
+        for span in plan.spans:
+            try:
+                data = b"".join(
+                    [
+                        await self.async_read(a, c)
+                        for a, c in span.blocks(plan.max_count)
+                    ]
+                )
+            except ModbusClientException:
+                # Some devices refuse reads that cross model boundaries
+                for model in span.models:
+                    if model in buffers:
+                        buffers[model] = bytearray(
+                            await self.async_read(*model_span(model))
+                        )
+                continue
+            plan.store(span, data, buffers)
+        return plan.load(buffers)
+
+    async def async_write_model(self, model):
+        """Write the changed points of model"""
+        plan = WritePlan(model)
+        try:
+            for addr, data in plan.writes:
+                await self.transport.write(
+                    self.slave_id, addr, data, telemetry=self.telemetry
+                )
+        finally:
+            # A refused value must not be sent again with the next write
+            plan.done()
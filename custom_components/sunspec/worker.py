@@ -0,0 +1,184 @@
+"""Threads running the blocking Modbus I/O of a gateway.
+
+pysunspec2 blocks while it waits for a device, for up to the read timeout
+per request and longer during a scan. Each gateway (host:port) gets its own
+worker thread with its own queue, so a device that stops responding only
+delays the devices behind the same gateway, which have to wait for the shared
+connection anyway, and never the executor of HA that other integrations use.
+A worker thread starts with the first job and ends once it has been idle for
+IDLE_TIMEOUT, so a gateway that is no longer used does not keep a thread.
+"""
+
+import asyncio
+import logging
+import queue
+import threading
+import time
+
+from .telemetry import LatencyHistogram
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+# Seconds a worker thread waits for a job before it ends
+IDLE_TIMEOUT = 60
+
+# Seconds shutdown waits for the workers, a stuck device cannot delay it longer
+SHUTDOWN_TIMEOUT = 5
+
+# Workers by gateway
+_WORKERS = {}
+_WORKERS_LOCK = threading.Lock()
+
+
+class _Job:
+    __slots__ = ("func", "args", "future", "loop", "queued", "queue_wait")
+
+    def __init__(self, func, args, future, loop, queue_wait) -> None:
+        self.func = func
+        self.args = args
+        self.future = future
+        self.loop = loop
+        self.queue_wait = queue_wait
+        self.queued = time.monotonic()
+
+
+def _set_result(future, result):
+    if not future.done():
+        future.set_result(result)
+
+
+def _set_exception(future, err):
+    if not future.done():
+        future.set_exception(err)
+
+
+class IOWorker:
+    """Thread running the jobs of one gateway in the order they were submitted"""
+
+    def __init__(self, name, idle_timeout=IDLE_TIMEOUT) -> None:
+        self.name = name
+        self.idle_timeout = idle_timeout
+        self.jobs = 0
+        self.queue_wait = LatencyHistogram()
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def _submit(self, job):
+        with self._lock:
+            self._queue.put(job)
+            if self._thread is None:
+                _LOGGER.debug(f"Starting the I/O worker of {self.name}")
+                self._thread = threading.Thread(
+                    target=self._run, name=f"sunspec {self.name}", daemon=True
+                )
+                self._thread.start()
+
+    def _next_job(self):
+        try:
+            return self._queue.get(timeout=self.idle_timeout)
+        except queue.Empty:
+            pass
+        with self._lock:
+            # A job may have been queued since, it would never run once the
+            # thread has gone
+            if not self._queue.empty():
+                return self._queue.get()
+            if self._thread is threading.current_thread():
+                self._thread = None
+        return None
+
+    async def async_run(self, func, *args, queue_wait: LatencyHistogram = None):
+        """Run func(*args) on the worker thread and return its result
+
+        A job that is cancelled before it started is skipped, a running job
+        cannot be interrupted and its result is dropped.
+        """
+        loop = asyncio.get_running_loop()
+        job = _Job(func, args, loop.create_future(), loop, queue_wait)
+        self._submit(job)
+        # Cancelling the caller cancels the future as well
+        return await job.future
+
+    def _run(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                break
+            if job.future.cancelled():
+                continue
+            wait = time.monotonic() - job.queued
+            self.queue_wait.observe(wait)
+            if job.queue_wait is not None:
+                job.queue_wait.observe(wait)
+            self.jobs += 1
+            try:
+                result = job.func(*job.args)
+            except BaseException as err:  # pylint: disable=broad-except
+                callback, value = _set_exception, err
+            else:
+                callback, value = _set_result, result
+            try:
+                job.loop.call_soon_threadsafe(callback, job.future, value)
+            except RuntimeError:
+                # The event loop has been closed
+                pass
+
+    def stop(self):
+        """Let the thread end once the jobs queued have run, returns the thread"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is not None:
+                self._queue.put(None)
+        return thread
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "running": self.running,
+            "jobs": self.jobs,
+            "queue_depth": self.queue_depth,
+            "queue_wait": self.queue_wait.as_dict(),
+        }
+
+
+def get_worker(gateway) -> IOWorker:
+    """Worker of gateway, shared by all slave ids behind it"""
+    with _WORKERS_LOCK:
+        worker = _WORKERS.get(gateway)
+        if worker is None:
+            worker = _WORKERS[gateway] = IOWorker(gateway)
+    return worker
+
+
+def find_worker(gateway):
+    """Worker of gateway if it has one, without creating it"""
+    with _WORKERS_LOCK:
+        return _WORKERS.get(gateway)
+
+
+def shutdown_workers(timeout=SHUTDOWN_TIMEOUT):
+    """Stop all workers and wait up to timeout seconds for their threads to end
+
+    Threads still running a job are left behind, they are daemon threads and
+    do not keep the process alive.
+    """
+    with _WORKERS_LOCK:
+        workers = list(_WORKERS.values())
+        _WORKERS.clear()
+    threads = [(worker, worker.stop()) for worker in workers]
+    deadline = time.monotonic() + timeout
+    for worker, thread in threads:
+        if thread is None:
+            continue
+        thread.join(max(deadline - time.monotonic(), 0))
+        if thread.is_alive():
+            _LOGGER.warning(f"The I/O worker of {worker.name} did not stop in time")
@@ -0,0 +1,74 @@
+"""Debounced write queue for SunSpec control entities."""
+
+import asyncio
+import logging
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.event import async_call_later
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+# Seconds to wait for more writes before sending them
+WRITE_DELAY = 0.25
+
+
+class WriteQueue:
+    """Merges the writes of a device issued within a short window
+
+    All changes to the same model are sent as one write of its changed
+    points, after which only the written models are read back.
+    """
+
+    def __init__(self, hass: HomeAssistant, coordinator, delay=WRITE_DELAY) -> None:
+        self.hass = hass
+        self.coordinator = coordinator
+        self.delay = delay
+        self._pending = {}
+        self._cancel_flush = None
+        self._flush_lock = asyncio.Lock()
+
+    async def async_write(self, model_id, model_index):
+        """Queue a write of model and wait until it has been written and read back"""
+        future = self.hass.loop.create_future()
+        self._pending.setdefault((model_id, model_index), []).append(future)
+        if self._cancel_flush is None:
+            self._cancel_flush = async_call_later(
+                self.hass, self.delay, self._async_flush
+            )
+        await future
+
+    async def _async_flush(self, _now=None, refresh=True):
+        self._cancel_flush = None
+        async with self._flush_lock:
+            pending, self._pending = self._pending, {}
+            if not pending:
+                return
+            _LOGGER.debug(f"Writing models {list(pending.keys())}")
+            errors = {}
+            for key in pending:
+                try:
+                    await self.coordinator.api.write(*key)
+                except Exception as err:  # pylint: disable=broad-except
+                    errors[key] = err
+            if refresh:
+                model_ids = {model_id for model_id, _ in pending}
+                try:
+                    await self.coordinator.async_refresh_models(model_ids)
+                except Exception as err:  # pylint: disable=broad-except
+                    _LOGGER.warning(f"Reading back models {model_ids} failed: {err}")
+                    # Read them with the next poll instead
+                    self.coordinator.scheduler.expire(model_ids)
+            for key, futures in pending.items():
+                for future in futures:
+                    if future.done():
+                        continue
+                    if key in errors:
+                        future.set_exception(errors[key])
+                    else:
+                        future.set_result(None)
+
+    async def async_shutdown(self):
+        """Send queued writes without waiting for the window to end"""
+        if self._cancel_flush is not None:
+            self._cancel_flush()
+        await self._async_flush(refresh=False)
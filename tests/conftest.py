@@ -7,9 +7,14 @@ from unittest.mock import patch
 
 import pytest
 import sunspec2.file.client as modbus_client
+import sunspec2.modbus.client as sunspec_modbus_client
 
 from custom_components.sunspec.api import ConnectionError
 from custom_components.sunspec.api import ConnectionTimeoutError
+from custom_components.sunspec.worker import shutdown_workers
+
+from .modbus_server import ModbusTestServer
+from .modbus_server import create_register_image
 
 pytest_plugins = "pytest_homeassistant_custom_component"
 _LOGGER: logging.Logger = logging.getLogger(__package__)
@@ -38,6 +43,34 @@ class MockFileClientDevice(modbus_client.FileClientDevice):
         return True
 
 
+class MockModbusClientDevice(sunspec_modbus_client.SunSpecModbusClientDevice):
+    """Modbus client device that serves registers from memory and counts requests"""
+
+    def __init__(self, filename="./tests/test_data/inverter.json"):
+        super().__init__()
+        self.image_addr, self.image = create_register_image(filename)
+        self.base_addr_list = [self.image_addr]
+        self.requests = []
+        self.writes = []
+
+    def is_connected(self):
+        return True
+
+    def connect(self):
+        return True
+
+    def read(self, addr, count):
+        addr, count = int(addr), int(count)
+        self.requests.append((addr, count))
+        offset = (addr - self.image_addr) * 2
+        return bytes(self.image[offset : offset + count * 2])
+
+    def write(self, addr, data):
+        self.writes.append((int(addr), len(data) // 2))
+        offset = (int(addr) - self.image_addr) * 2
+        self.image[offset : offset + len(data)] = data
+
+
 # This fixture is used to prevent HomeAssistant from attempting to create and dismiss persistent
 # notifications. These calls would fail without this fixture since the persistent_notification
 # integration is never loaded during a test.
@@ -50,6 +83,13 @@ def skip_notifications_fixture():
         yield
 
 
+@pytest.fixture(name="stop_io_workers", autouse=True)
+def stop_io_workers_fixture(verify_cleanup):
+    """End the I/O worker threads before the test checks for lingering threads."""
+    yield
+    shutdown_workers()
+
+
 @pytest.fixture(name="auto_enable_custom_integrations", autouse=True)
 def auto_enable_custom_integrations(
     hass: Any, enable_custom_integrations: Any  # noqa: F811
@@ -88,6 +128,29 @@ def sunspec_client_mock():
         yield
 
 
+@pytest.fixture
+def sunspec_modbus_device_mock():
+    """Serve a scanned in-memory Modbus device instead of connecting."""
+    client = MockModbusClientDevice()
+    client.scan(connect=False, full_model_read=False)
+    client.requests.clear()
+    with patch(
+        "custom_components.sunspec.SunSpecApiClient.modbus_connect", return_value=client
+    ), patch(
+        "custom_components.sunspec.SunSpecApiClient.check_port", return_value=True
+    ):
+        yield client
+
+
+@pytest.fixture
+async def modbus_server(socket_enabled):
+    """Run a loopback Modbus TCP server with the test inverter registers."""
+    server = ModbusTestServer()
+    server.address = await server.start()
+    yield server
+    await server.stop()
+
+
 # In this fixture, we are forcing calls to async_get_data to raise an Exception. This is useful
 # for exception handling.
 @pytest.fixture
@@ -158,6 +221,9 @@ def error_on_get_data():
     ), patch(
         "custom_components.sunspec.SunSpecApiClient.async_get_data",
         side_effect=ConnectionError,
+    ), patch(
+        "custom_components.sunspec.SunSpecApiClient.async_read_models",
+        side_effect=ConnectionError,
     ):
         yield
 
@@ -176,6 +242,9 @@ def timeout_error_on_get_data():
     ), patch(
         "custom_components.sunspec.SunSpecApiClient.async_get_data",
         side_effect=ConnectionTimeoutError,
+    ), patch(
+        "custom_components.sunspec.SunSpecApiClient.async_read_models",
+        side_effect=ConnectionTimeoutError,
     ):
         yield
 
@@ -193,6 +262,9 @@ def connect_error_on_get_data():
     ), patch(
         "custom_components.sunspec.SunSpecApiClient.async_get_data",
         side_effect=ConnectionError,
+    ), patch(
+        "custom_components.sunspec.SunSpecApiClient.async_read_models",
+        side_effect=ConnectionError,
     ):
         yield
 
@@ -0,0 +1,259 @@
+"""Loopback Modbus TCP simulator serving SunSpec test data.
+
+A ModbusTestServer listens on one port and answers for any number of unit
+IDs, optionally with latency, jitter, dropped connections and a limit on the
+number of clients. ModbusSimulator runs a fleet of them on several ports:
+
+    python -m tests.modbus_server --ports 10 --units 50 --latency 0.02
+"""
+
+import argparse
+import asyncio
+import random
+import struct
+
+import sunspec2.file.client as file_client
+import sunspec2.mb as mb
+
+MBAP_HEADER = struct.Struct(">HHHB")
+
+ILLEGAL_FUNCTION = 1
+ILLEGAL_ADDRESS = 2
+ILLEGAL_VALUE = 3
+
+
+def create_register_image(filename, base_addr=40000):
+    """Build a SunSpec holding register image from a json device file"""
+    device = file_client.FileClientDevice(filename)
+    device.scan()
+    image = bytearray(b"SunS")
+    for model in device.model_list:
+        image += model.get_mb()
+    image += mb.u16_to_data(mb.SUNS_END_MODEL_ID) + mb.u16_to_data(0)
+    return base_addr, image
+
+
+def model_addrs(base_addr, image):
+    """Addresses of the models in image and of its end marker"""
+    addrs = []
+    addr = base_addr + 2
+    while True:
+        offset = (addr - base_addr) * 2
+        model_id, model_len = struct.unpack(">HH", image[offset : offset + 4])
+        addrs.append(addr)
+        if model_id == 0xFFFF:
+            return addrs
+        addr += model_len + 2
+
+
+class ModbusTestServer:
+    """Modbus TCP server answering holding register requests from an image
+
+    Without units every unit ID is served from the same image, otherwise
+    units lists the unit IDs that get their own copy of it.
+    """
+
+    def __init__(
+        self,
+        filename="./tests/test_data/inverter.json",
+        units=None,
+        latency=0,
+        jitter=0,
+        drop_rate=0,
+        max_connections=None,
+        seed=None,
+    ) -> None:
+        self.image_addr, self.image = create_register_image(filename)
+        self.images = {unit_id: bytearray(self.image) for unit_id in units or []}
+        self.requests = []
+        self.connections = 0
+        # Seconds to wait before answering a request, plus up to jitter seconds
+        self.delay = latency
+        self.jitter = jitter
+        # Share of requests answered by closing the connection
+        self.drop_rate = drop_rate
+        self.max_connections = max_connections
+        self.dropped = 0
+        self.refused = 0
+        # Answer writes with an exception, like a device refusing a value
+        self.reject_writes = False
+        # Answer reads across model boundaries with an exception, like some
+        # devices do
+        self.reject_cross_model_reads = False
+        self.model_addrs = model_addrs(self.image_addr, self.image)
+        self._random = random.Random(seed)
+        self._server = None
+        self._writers = set()
+        self._tasks = set()
+
+    async def start(self, host="127.0.0.1", port=0):
+        self._server = await asyncio.start_server(self._handle, host, port)
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def stop(self):
+        self._server.close()
+        for writer in list(self._writers):
+            writer.close()
+        for task in list(self._tasks):
+            task.cancel()
+        await self._server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        if (
+            self.max_connections is not None
+            and len(self._writers) >= self.max_connections
+        ):
+            self.refused += 1
+            writer.close()
+            return
+        self._writers.add(writer)
+        self._tasks.add(asyncio.current_task())
+        self.connections += 1
+        try:
+            while True:
+                header = await reader.readexactly(MBAP_HEADER.size)
+                tid, _, length, unit_id = MBAP_HEADER.unpack(header)
+                pdu = await reader.readexactly(length - 1)
+                if self.drop_rate and self._random.random() < self.drop_rate:
+                    self.dropped += 1
+                    break
+                resp = self.process(unit_id, pdu)
+                if resp is None:
+                    # Unknown units do not answer, like behind a real gateway
+                    continue
+                delay = self.delay + self._random.uniform(0, self.jitter)
+                if delay:
+                    await asyncio.sleep(delay)
+                writer.write(MBAP_HEADER.pack(tid, 0, len(resp) + 1, unit_id) + resp)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            self._tasks.discard(asyncio.current_task())
+            writer.close()
+
+    def unit_image(self, unit_id):
+        """Register image of unit_id, None if the unit does not exist"""
+        if not self.images:
+            return self.image
+        return self.images.get(unit_id)
+
+    def _offset(self, addr, count):
+        offset = (addr - self.image_addr) * 2
+        if addr < self.image_addr or offset + count * 2 > len(self.image):
+            return None
+        return offset
+
+    def process(self, unit_id, pdu):
+        image = self.unit_image(unit_id)
+        if image is None:
+            return None
+        func = pdu[0]
+        if func == 3:
+            addr, count = struct.unpack(">HH", pdu[1:5])
+            self.requests.append((unit_id, func, addr, count))
+            offset = self._offset(addr, count)
+            if offset is None:
+                return bytes([func | 0x80, ILLEGAL_ADDRESS])
+            if self.reject_cross_model_reads and any(
+                addr < model_addr < addr + count for model_addr in self.model_addrs
+            ):
+                return bytes([func | 0x80, ILLEGAL_ADDRESS])
+            data = image[offset : offset + count * 2]
+            return bytes([func, len(data)]) + data
+        if func == 6:
+            addr = struct.unpack(">H", pdu[1:3])[0]
+            self.requests.append((unit_id, func, addr, 1))
+            offset = self._offset(addr, 1)
+            if offset is None:
+                return bytes([func | 0x80, ILLEGAL_ADDRESS])
+            if self.reject_writes:
+                return bytes([func | 0x80, ILLEGAL_VALUE])
+            image[offset : offset + 2] = pdu[3:5]
+            return pdu[:5]
+        if func == 16:
+            addr, count, _ = struct.unpack(">HHB", pdu[1:6])
+            self.requests.append((unit_id, func, addr, count))
+            offset = self._offset(addr, count)
+            if offset is None:
+                return bytes([func | 0x80, ILLEGAL_ADDRESS])
+            if self.reject_writes:
+                return bytes([func | 0x80, ILLEGAL_VALUE])
+            image[offset : offset + count * 2] = pdu[6 : 6 + count * 2]
+            return pdu[:5]
+        return bytes([func | 0x80, ILLEGAL_FUNCTION])
+
+
+class ModbusSimulator:
+    """A fleet of simulated devices, units 1..units on each of ports servers"""
+
+    def __init__(self, ports=1, units=1, **kwargs) -> None:
+        self.servers = [
+            ModbusTestServer(units=range(1, units + 1), **kwargs) for _ in range(ports)
+        ]
+        self.addresses = []
+
+    @property
+    def devices(self):
+        """(host, port, unit_id) of every simulated device"""
+        return [
+            (host, port, unit_id)
+            for server, (host, port) in zip(self.servers, self.addresses)
+            for unit_id in server.images
+        ]
+
+    @property
+    def requests(self):
+        return sum(len(server.requests) for server in self.servers)
+
+    async def start(self, host="127.0.0.1", base_port=0):
+        self.addresses = []
+        for i, server in enumerate(self.servers):
+            port = base_port + i if base_port else 0
+            self.addresses.append(await server.start(host, port))
+        return self.addresses
+
+    async def stop(self):
+        for server in self.servers:
+            await server.stop()
+
+
+async def _serve(args):
+    simulator = ModbusSimulator(
+        ports=args.ports,
+        units=args.units,
+        filename=args.file,
+        latency=args.latency,
+        jitter=args.jitter,
+        drop_rate=args.drop_rate,
+        max_connections=args.max_connections,
+    )
+    for host, port in await simulator.start(args.host, args.base_port):
+        print(f"Serving units 1-{args.units} on {host}:{port}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await simulator.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate SunSpec Modbus TCP devices")
+    parser.add_argument("--file", default="./tests/test_data/inverter.json")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--base-port", type=int, default=5020)
+    parser.add_argument("--ports", type=int, default=1)
+    parser.add_argument("--units", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0)
+    parser.add_argument("--jitter", type=float, default=0)
+    parser.add_argument("--drop-rate", type=float, default=0)
+    parser.add_argument("--max-connections", type=int, default=None)
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,22 @@
 """Tests for SunSpec api."""
 
+import asyncio
+import time
+from unittest.mock import patch
+
 import pytest
 from sunspec2.modbus.client import SunSpecModbusClientException
 from sunspec2.modbus.client import SunSpecModbusClientTimeout
 from sunspec2.modbus.modbus import ModbusClientError
 
+from custom_components.sunspec.api import CACHE_TTL
+from custom_components.sunspec.api import NAMEPLATE_CACHE_TTL
 from custom_components.sunspec.api import ConnectionError
 from custom_components.sunspec.api import ConnectionTimeoutError
+from custom_components.sunspec.api import ModelWrapperCacheItem
 from custom_components.sunspec.api import SunSpecApiClient
+from custom_components.sunspec.api import SunSpecModelWrapper
+from custom_components.sunspec.api import point_index
 
 
 async def test_api(hass, sunspec_client_mock):
@@ -138,3 +147,64 @@ async def test_read_model_error(hass, mocker):
 
     with pytest.raises(ConnectionError):
         await api.async_get_data(1)
+
+
+async def test_wrapper_point_index(hass, sunspec_modbus_device_mock):
+    models = sunspec_modbus_device_mock.models[160]
+    wrapper = SunSpecModelWrapper(models)
+
+    assert wrapper.getPoint("N") is models[0].points["N"]
+    assert (
+        wrapper.getPoint("module:1:DCW") is models[0].groups["module"][1].points["DCW"]
+    )
+    # The lookup table is built once per model object
+    assert point_index(models[0]) is point_index(models[0])
+    assert SunSpecModelWrapper(models)._index[0] is wrapper._index[0]
+    with pytest.raises(KeyError):
+        wrapper.getPoint("Missing")
+
+
+async def test_concurrent_reads_share_one_request(hass, sunspec_modbus_device_mock):
+    SunSpecApiClient.CLIENT_CACHE = {}
+    api = SunSpecApiClient(host="test", port=123, slave_id=1, hass=hass)
+    await api.async_get_models()
+    sunspec_modbus_device_mock.requests.clear()
+
+    wrappers = await asyncio.gather(
+        api.read(103), api.read(103), api.async_read_models([103, 160])
+    )
+    assert wrappers[0] is wrappers[1] is wrappers[2][103]
+    model = sunspec_modbus_device_mock.models[103][0]
+    requests = sunspec_modbus_device_mock.requests
+    assert [req for req in requests if req[0] == model.model_addr] == [
+        (model.model_addr, model.len + 2)
+    ]
+    assert api._inflight == {}
+    SunSpecApiClient.CLIENT_CACHE = {}
+
+
+async def test_shared_read_error(hass):
+    api = SunSpecApiClient(host="test", port=123, slave_id=1, hass=hass)
+    with patch.object(api, "read_model", side_effect=SunSpecModbusClientException):
+        results = await asyncio.gather(
+            api.async_get_data(1), api.async_get_data(1), return_exceptions=True
+        )
+    assert all(isinstance(result, ConnectionError) for result in results)
+    assert api._inflight == {}
+
+
+def test_cache_ttl(hass):
+    api = SunSpecApiClient(
+        host="test", port=123, slave_id=1, hass=hass, cache_ttls={"103": 5}
+    )
+    assert api.cache_ttl(103) == 5
+    assert api.cache_ttl(160) == CACHE_TTL
+    assert api.cache_ttl(1) == NAMEPLATE_CACHE_TTL
+
+    item = ModelWrapperCacheItem(None, ttl=5)
+    assert not item.isExpired()
+    with patch(
+        "custom_components.sunspec.api.time.monotonic",
+        return_value=time.monotonic() + 6,
+    ):
+        assert item.isExpired()
@@ -7,8 +7,11 @@ from homeassistant import data_entry_flow
 import pytest
 from pytest_homeassistant_custom_component.common import MockConfigEntry
 
+from custom_components.sunspec.const import CONF_CACHE_TTLS
 from custom_components.sunspec.const import CONF_ENABLED_MODELS
+from custom_components.sunspec.const import CONF_MODEL_INTERVALS
 from custom_components.sunspec.const import CONF_SCAN_INTERVAL
+from custom_components.sunspec.const import CONF_SETTLE_TIMES
 from custom_components.sunspec.const import DOMAIN
 
 from . import MockSunSpecDataUpdateCoordinator
@@ -135,6 +138,41 @@ async def test_options_flow(hass, sunspec_client_mock):
     # assert entry.options == {BINARY_SENSOR: True, SENSOR: False, SWITCH: True}
 
 
+async def test_options_flow_model_intervals(hass, sunspec_client_mock):
+    """Test the polling intervals and settle times of the options flow."""
+    entry = MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG, entry_id="test")
+    entry.add_to_hass(hass)
+    coordinator = MockSunSpecDataUpdateCoordinator(hass, [1, 2])
+    hass.data[DOMAIN] = {entry.entry_id: coordinator}
+
+    result = await hass.config_entries.options.async_init(entry.entry_id)
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"], user_input=MOCK_CONFIG_STEP_1
+    )
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"],
+        user_input={CONF_ENABLED_MODELS: [103, 704], CONF_SCAN_INTERVAL: 10},
+    )
+    assert result["type"] == data_entry_flow.RESULT_TYPE_FORM
+    assert result["step_id"] == "model_intervals"
+
+    # Only the values changed from the default are stored
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"],
+        user_input={
+            "103": 10,
+            "103_cache": 5,
+            "704": 60,
+            "704_cache": 1,
+            "704_settle": 2,
+        },
+    )
+    assert result["type"] == data_entry_flow.RESULT_TYPE_CREATE_ENTRY
+    assert entry.options[CONF_MODEL_INTERVALS] == {"704": 60}
+    assert entry.options[CONF_SETTLE_TIMES] == {"704": 2}
+    assert entry.options[CONF_CACHE_TTLS] == {"103": 5}
+
+
 # Test faild connection in options flow
 async def test_options_flow_connect_error(hass, sunspec_client_mock_connect_error):
     """Test an options flow."""
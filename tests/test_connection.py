@@ -0,0 +1,92 @@
+"""Tests for SunSpec connection management."""
+
+import socket
+import time
+
+import sunspec2.modbus.client as modbus_client
+
+from custom_components.sunspec.api import SunSpecApiClient
+from custom_components.sunspec.connection import SunSpecConnection
+
+
+def listen():
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(("127.0.0.1", 0))
+    server.listen(4)
+    return server
+
+
+def tcp_device(server):
+    host, port = server.getsockname()
+    return modbus_client.SunSpecModbusClientDeviceTCP(
+        slave_id=1, ipaddr=host, ipport=port, timeout=2
+    )
+
+
+def test_connection_keepalive_options(socket_enabled):
+    server = listen()
+    connection = SunSpecConnection(tcp_device(server))
+    connection.connect()
+    peer, _ = server.accept()
+
+    sock = connection.socket
+    assert sock.getsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE) == 1
+    assert sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY) == 1
+    assert connection.connect_count == 1
+    assert connection.connection_age >= 0
+    assert connection.is_alive()
+
+    connection.close()
+    assert connection.stats()["connected"] is False
+    peer.close()
+    server.close()
+
+
+def test_connection_detects_dead_socket(socket_enabled):
+    server = listen()
+    connection = SunSpecConnection(tcp_device(server))
+    connection.connect()
+    peer, _ = server.accept()
+
+    peer.close()
+    time.sleep(0.05)
+    assert not connection.is_alive()
+
+    connection.ensure_connected()
+    peer, _ = server.accept()
+    assert connection.is_alive()
+    assert connection.connect_count == 2
+
+    connection.close()
+    peer.close()
+    server.close()
+
+
+def test_connection_close_if_idle(socket_enabled):
+    server = listen()
+    connection = SunSpecConnection(tcp_device(server), idle_timeout=60)
+    connection.connect()
+    peer, _ = server.accept()
+
+    assert not connection.close_if_idle()
+    connection.last_used -= 61
+    assert connection.close_if_idle()
+    assert connection.socket is None
+
+    peer.close()
+    server.close()
+
+
+async def test_connection_kept_between_reads(hass, sunspec_modbus_device_mock):
+    SunSpecApiClient.CLIENT_CACHE = {}
+    api = SunSpecApiClient(host="test", port=123, slave_id=1, hass=hass)
+
+    await api.async_read_models([103])
+    api.wrapper_cache = {}
+    await api.async_read_models([103])
+    assert api.connection.connect_count == 1
+
+    api.reconnect_next()
+    await api.async_reconnect()
+    assert api.connection.connect_count == 2
+    SunSpecApiClient.CLIENT_CACHE = {}
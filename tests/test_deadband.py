@@ -0,0 +1,41 @@
+"""Tests for SunSpec deadbands."""
+
+import pytest
+import voluptuous as vol
+
+from custom_components.sunspec.deadband import Deadband
+from custom_components.sunspec.deadband import DeadbandFilter
+from custom_components.sunspec.deadband import deadbands_validator
+from custom_components.sunspec.deadband import parse_deadbands
+
+
+def test_deadband_exceeded():
+    deadband = Deadband.parse("0.5")
+    assert not deadband.exceeded(230.0, 230.5)
+    assert deadband.exceeded(230.0, 230.6)
+    assert deadband.exceeded("ON", "OFF")
+
+    deadband = Deadband.parse("2%")
+    assert not deadband.exceeded(100, 102)
+    assert deadband.exceeded(100, 97)
+
+
+def test_parse_deadbands():
+    deadbands = parse_deadbands("V=0.5, Hz = 0.01,160:module:0:DCA=1%")
+    assert deadbands["V"].value == 0.5
+    assert deadbands["Hz"].value == 0.01
+    assert deadbands["160:module:0:DCA"].percent
+    assert parse_deadbands("") == {}
+    with pytest.raises(ValueError):
+        parse_deadbands("V")
+    with pytest.raises(vol.Invalid):
+        deadbands_validator("V=-1")
+
+
+def test_deadband_filter():
+    deadbands = DeadbandFilter("V=0.5", "103:PhVphA=1, 103:PhVphB=0")
+    assert deadbands.deadband(103, "PhVphA", "V").value == 1
+    assert deadbands.deadband(103, "PhVphC", "V").value == 0.5
+    # A zero override disables the deadband of the unit
+    assert deadbands.deadband(103, "PhVphB", "V") is None
+    assert deadbands.deadband(103, "W", "W") is None
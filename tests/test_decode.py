@@ -0,0 +1,73 @@
+"""Tests for bulk decoding of SunSpec register blocks."""
+
+from sunspec2 import mb
+
+from custom_components.sunspec.api import SunSpecModelWrapper
+from custom_components.sunspec.api import point_index
+from custom_components.sunspec.decode import decode_model
+from custom_components.sunspec.decode import model_layout
+from custom_components.sunspec.planner import ReadPlan
+
+from .conftest import MockModbusClientDevice
+
+
+def read_device():
+    device = MockModbusClientDevice()
+    device.scan(connect=False, full_model_read=False)
+    images = ReadPlan(device.model_list).execute(device.read)
+    return device, images
+
+
+def test_decode_matches_pysunspec():
+    device, images = read_device()
+    for model in device.model_list:
+        snapshot = decode_model(model, images[model])
+        for key, point in point_index(model).items():
+            slot = snapshot.slot(key)
+            assert slot is not None, key
+            assert snapshot.values[slot] == point.value, key
+            assert snapshot.cvalues[slot] == point.cvalue, key
+            assert snapshot.sfs[slot] == point.sf_value, key
+
+
+def test_decode_not_implemented():
+    device, images = read_device()
+    model = device.models[103][0]
+    layout = model_layout(model)
+    data = bytearray(images[model])
+    offset = model.points["W"].offset * 2
+    data[offset : offset + 2] = mb.s16_to_data(mb.SUNS_UNIMPL_INT16)
+    offset = model.points["W_SF"].offset * 2
+    data[offset : offset + 2] = mb.s16_to_data(mb.SUNS_UNIMPL_INT16)
+
+    snapshot = layout.decode(bytes(data))
+    assert snapshot.values[snapshot.slot("W")] is None
+    # Without a scale factor the value is returned as read
+    slot = snapshot.slot("WH")
+    assert snapshot.cvalues[slot] == snapshot.values[slot]
+    assert snapshot.sfs[slot] == model.points["WH_SF"].value
+    assert decode_model(model, bytes(data[:-2])) is None
+
+
+def test_wrapper_uses_snapshot():
+    device, images = read_device()
+    models = device.models[103]
+    wrapper = SunSpecModelWrapper(models, images)
+    expected = models[0].points["W"].cvalue
+
+    # Later reads of the model do not change the values of a wrapper
+    models[0].points["W"].value = 1
+    assert wrapper.getValue("W") == expected
+    assert wrapper.getSf("W") == models[0].points["W_SF"].value
+
+    wrapper.setValueRaw("W", 2)
+    assert wrapper.getValueRaw("W") == 2
+
+
+def test_wrapper_keeps_pending_changes():
+    device, images = read_device()
+    models = device.models[103]
+    models[0].points["W"].value = 2
+    # The registers read do not have the value that has not been written yet
+    wrapper = SunSpecModelWrapper(models, images)
+    assert wrapper.getValueRaw("W") == 2
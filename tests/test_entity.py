@@ -0,0 +1,128 @@
+"""Tests for the SunSpec entity base class."""
+
+import time
+from unittest.mock import patch
+
+from custom_components.sunspec.api import SunSpecApiClient
+from custom_components.sunspec.const import CONF_DEADBANDS
+from custom_components.sunspec.const import CONF_MAX_AGE
+from custom_components.sunspec.const import DOMAIN
+
+from . import TEST_INVERTER_SENSOR_POWER_ENTITY_ID
+from . import create_mock_sunspec_config_entry
+from . import setup_mock_sunspec_config_entry
+
+
+async def test_unchanged_state_not_written(hass, sunspec_modbus_device_mock):
+    SunSpecApiClient.CLIENT_CACHE = {}
+    entry = await setup_mock_sunspec_config_entry(hass)
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+    coordinator.state_writes = coordinator.state_writes_skipped = 0
+    last_updated = hass.states.get(TEST_INVERTER_SENSOR_POWER_ENTITY_ID).last_updated
+
+    coordinator.api.wrapper_cache = {}
+    coordinator.scheduler.mark_read([103], now=time.monotonic() - 3600)
+    await coordinator.async_refresh()
+    await hass.async_block_till_done()
+    assert coordinator.state_writes == 0
+    assert coordinator.state_writes_skipped > 0
+    assert coordinator.state_write_skip_rate == 1.0
+    assert (
+        hass.states.get(TEST_INVERTER_SENSOR_POWER_ENTITY_ID).last_updated
+        == last_updated
+    )
+
+    # Only the entity of the changed point is written
+    model = sunspec_modbus_device_mock.models[103][0]
+    offset = (
+        model.model_addr
+        + model.points["W"].offset
+        - sunspec_modbus_device_mock.image_addr
+    ) * 2
+    sunspec_modbus_device_mock.image[offset : offset + 2] = b"\x00\x10"
+    coordinator.api.wrapper_cache = {}
+    coordinator.scheduler.mark_read([103], now=time.monotonic() - 3600)
+    await coordinator.async_refresh()
+    await hass.async_block_till_done()
+    assert coordinator.state_writes == 1
+    assert (
+        hass.states.get(TEST_INVERTER_SENSOR_POWER_ENTITY_ID).last_updated
+        > last_updated
+    )
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    SunSpecApiClient.CLIENT_CACHE = {}
+
+
+async def test_deadband_skips_small_changes(hass, sunspec_modbus_device_mock):
+    SunSpecApiClient.CLIENT_CACHE = {}
+    entry = create_mock_sunspec_config_entry(
+        hass, options={CONF_DEADBANDS: "W=100", CONF_MAX_AGE: 60}
+    )
+    await setup_mock_sunspec_config_entry(hass, config_entry=entry)
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+    model = sunspec_modbus_device_mock.models[103][0]
+    offset = (
+        model.model_addr
+        + model.points["W"].offset
+        - sunspec_modbus_device_mock.image_addr
+    ) * 2
+    value = int.from_bytes(sunspec_modbus_device_mock.image[offset : offset + 2], "big")
+
+    async def refresh(new_value):
+        sunspec_modbus_device_mock.image[offset : offset + 2] = new_value.to_bytes(
+            2, "big"
+        )
+        coordinator.state_writes = 0
+        coordinator.api.wrapper_cache = {}
+        coordinator.scheduler.mark_read([103], now=time.monotonic() - 3600)
+        await coordinator.async_refresh()
+        await hass.async_block_till_done()
+        return coordinator.state_writes
+
+    # W is not scaled in the test data, 50W is inside the deadband
+    assert await refresh(value + 50) == 0
+    assert await refresh(value + 2000) == 1
+
+    # Values inside the deadband are written once they get too old
+    with patch(
+        "custom_components.sunspec.entity.time.monotonic",
+        return_value=time.monotonic() + 60,
+    ):
+        assert await refresh(value + 2010) == 1
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    SunSpecApiClient.CLIENT_CACHE = {}
+
+
+async def test_model_refresh_updates_model_entities(hass, sunspec_modbus_device_mock):
+    SunSpecApiClient.CLIENT_CACHE = {}
+    entry = await setup_mock_sunspec_config_entry(hass)
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+    coordinator.state_writes = coordinator.state_writes_skipped = 0
+    data = coordinator.data
+    model = sunspec_modbus_device_mock.models[103][0]
+    offset = (
+        model.model_addr
+        + model.points["W"].offset
+        - sunspec_modbus_device_mock.image_addr
+    ) * 2
+    sunspec_modbus_device_mock.image[offset : offset + 2] = b"\x00\x10"
+    sunspec_modbus_device_mock.requests.clear()
+    coordinator.api.wrapper_cache = {}
+
+    await coordinator.async_refresh_models([103])
+    await hass.async_block_till_done()
+    # The header and scale factors are not read again
+    assert sunspec_modbus_device_mock.requests == [(model.model_addr + 2, model.len)]
+    assert coordinator.data[160] is data[160]
+    assert coordinator.state_writes == 1
+    # Only the entities of the refreshed model were checked for changes
+    assert (
+        coordinator.state_writes_skipped == len(coordinator._model_listeners[103]) - 1
+    )
+    assert hass.states.get(TEST_INVERTER_SENSOR_POWER_ENTITY_ID).state == "16"
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    assert not coordinator._model_listeners[103]
+    SunSpecApiClient.CLIENT_CACHE = {}
@@ -0,0 +1,59 @@
+"""Tests for the fleet scheduler of SunSpec polls."""
+
+import asyncio
+
+from custom_components.sunspec.api import SunSpecApiClient
+from custom_components.sunspec.fleet import DATA_FLEET
+from custom_components.sunspec.fleet import FleetScheduler
+
+from . import setup_mock_sunspec_config_entry
+
+
+async def test_fleet_limits_concurrency():
+    fleet = FleetScheduler(max_polls=2, max_gateway_polls=1)
+    gateways = ["a:502", "a:502", "b:502", "b:502", "c:502", "c:502"]
+    running = {gateway: 0 for gateway in gateways}
+    peaks = []
+    release = asyncio.Event()
+
+    async def poll(gateway):
+        async with fleet.poll(gateway):
+            running[gateway] += 1
+            peaks.append((fleet.running, running[gateway]))
+            await release.wait()
+            running[gateway] -= 1
+
+    tasks = [asyncio.create_task(poll(gateway)) for gateway in gateways]
+    await asyncio.sleep(0)
+    assert fleet.running == 2
+    assert fleet.queue_depth == 4
+    release.set()
+    await asyncio.gather(*tasks)
+
+    assert fleet.polls == 6
+    assert fleet.queue_depth == 0
+    assert fleet.stats()["peak_queue_depth"] == 4
+    assert max(total for total, _ in peaks) == 2
+    assert max(per_gateway for _, per_gateway in peaks) == 1
+
+
+def test_fleet_phases():
+    fleet = FleetScheduler()
+    phases = [fleet.register(object(), f"host:{i}", 30) for i in range(10)]
+    assert phases[0] == 0
+    assert all(0 <= phase < 30 for phase in phases)
+    # No two devices share a phase and no two are much closer than even spacing
+    phases.sort()
+    assert min(b - a for a, b in zip(phases, phases[1:])) > 1
+
+
+async def test_fleet_membership(hass, sunspec_modbus_device_mock):
+    SunSpecApiClient.CLIENT_CACHE = {}
+    entry = await setup_mock_sunspec_config_entry(hass)
+    fleet = hass.data[DATA_FLEET]
+    assert fleet.stats()["members"] == 1
+    assert fleet.polls == 1
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    assert fleet.stats()["members"] == 0
+    SunSpecApiClient.CLIENT_CACHE = {}
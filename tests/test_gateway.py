@@ -0,0 +1,89 @@
+"""Tests for connections shared by the units behind a gateway."""
+
+import threading
+import time
+from unittest.mock import patch
+
+from custom_components.sunspec.api import SunSpecApiClient
+from custom_components.sunspec.const import TRANSPORT_ASYNCIO
+from custom_components.sunspec.gateway import FairLock
+
+
+def create_apis(hass, server, transport=None):
+    SunSpecApiClient.CLIENT_CACHE = {}
+    SunSpecApiClient.GATEWAY_CACHE = {}
+    SunSpecApiClient.ASYNC_CLIENT_CACHE = {}
+    SunSpecApiClient.ASYNC_GATEWAY_CACHE = {}
+    host, port = server.address
+    kwargs = {} if transport is None else {"transport": transport}
+    return [
+        SunSpecApiClient(host=host, port=port, slave_id=slave_id, hass=hass, **kwargs)
+        for slave_id in (1, 2)
+    ]
+
+
+def test_fair_lock_order():
+    lock = FairLock()
+    order = []
+
+    def worker(i):
+        with lock:
+            order.append(i)
+
+    lock.acquire()
+    threads = []
+    for i in range(5):
+        threads.append(threading.Thread(target=worker, args=(i,)))
+        threads[-1].start()
+        # Make sure the threads queue up in order
+        while lock.queue_depth != i + 2:
+            time.sleep(0.001)
+    lock.release()
+    for thread in threads:
+        thread.join()
+    assert order == list(range(5))
+
+
+async def test_gateway_shared_connection(hass, modbus_server):
+    apis = create_apis(hass, modbus_server)
+
+    with patch(
+        "custom_components.sunspec.SunSpecApiClient.check_port", return_value=True
+    ) as check_port, patch("sunspec2.modbus.client.time.sleep"):
+        for api in apis:
+            wrappers = await api.async_read_models([1, 103])
+            assert wrappers[1].getValue("SN") == "sn-123456789"
+    # Connecting does not need a separate probe connection
+    assert check_port.call_count == 0
+
+    assert modbus_server.connections == 1
+    assert {req[0] for req in modbus_server.requests} == {1, 2}
+    assert SunSpecApiClient.GATEWAY_CACHE[
+        f"{modbus_server.address[0]}:{modbus_server.address[1]}"
+    ].units == {1, 2}
+
+    # The connection stays open until the last unit releases it
+    await apis[0].async_close()
+    assert apis[1].connection.is_alive()
+    await apis[1].async_close()
+    assert apis[1].connection.socket is None
+    SunSpecApiClient.CLIENT_CACHE = {}
+    SunSpecApiClient.GATEWAY_CACHE = {}
+
+
+async def test_gateway_shared_connection_asyncio(hass, modbus_server):
+    apis = create_apis(hass, modbus_server, TRANSPORT_ASYNCIO)
+
+    for api in apis:
+        wrappers = await api.async_read_models([1, 103])
+        assert wrappers[1].getValue("SN") == "sn-123456789"
+
+    assert modbus_server.connections == 1
+    assert {req[0] for req in modbus_server.requests} == {1, 2}
+    assert apis[0].connection is apis[1].connection
+
+    await apis[0].async_close()
+    assert apis[1].connection.is_connected
+    await apis[1].async_close()
+    SunSpecApiClient.ASYNC_CLIENT_CACHE = {}
+    SunSpecApiClient.ASYNC_GATEWAY_CACHE = {}
@@ -9,6 +9,8 @@ from custom_components.sunspec import SunSpecDataUpdateCoordinator
 from custom_components.sunspec import async_reload_entry
 from custom_components.sunspec import async_setup_entry
 from custom_components.sunspec import async_unload_entry
+from custom_components.sunspec.api import CACHE_TTL
+from custom_components.sunspec.const import CONF_CACHE_TTLS
 from custom_components.sunspec.const import DOMAIN
 
 from . import setup_mock_sunspec_config_entry
@@ -50,6 +52,22 @@ async def test_setup_unload_and_reload_entry(
     assert config_entry.entry_id not in hass.data[DOMAIN]
 
 
+async def test_setup_entry_cache_ttls(hass, bypass_get_data, sunspec_client_mock):
+    """Test the cache times of the entry options."""
+    config_entry = MockConfigEntry(
+        domain=DOMAIN,
+        data=MOCK_CONFIG,
+        options={CONF_CACHE_TTLS: {"103": 5}},
+        entry_id="test",
+        state=ConfigEntryState.LOADED,
+    )
+    assert await async_setup_entry(hass, config_entry)
+    api = hass.data[DOMAIN][config_entry.entry_id].api
+    assert api.cache_ttl(103) == 5
+    assert api.cache_ttl(160) == CACHE_TTL
+    assert await async_unload_entry(hass, config_entry)
+
+
 async def test_setup_entry_exception(hass, error_on_get_data):
     """Test ConfigEntryNotReady when API raises an exception during entry setup."""
     config_entry = MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG, entry_id="test")
@@ -0,0 +1,95 @@
+"""Tests for the detection of SunSpec calls blocking the event loop."""
+
+import asyncio
+import time
+from unittest.mock import patch
+
+import pytest
+
+from custom_components.sunspec.api import SunSpecApiClient
+from custom_components.sunspec.const import CONF_LOOP_BLOCK_THRESHOLD
+from custom_components.sunspec.const import DOMAIN
+from custom_components.sunspec.loop_monitor import LoopMonitor
+from custom_components.sunspec.loop_monitor import monitored
+
+from . import create_mock_sunspec_config_entry
+from . import setup_mock_sunspec_config_entry
+from .modbus_server import ModbusTestServer
+
+
+class Device:
+    def __init__(self, threshold) -> None:
+        self.loop_monitor = LoopMonitor("test", threshold)
+
+    @monitored
+    async def poll(self):
+        await asyncio.sleep(0)
+        return await self.read()
+
+    @monitored
+    async def read(self):
+        await asyncio.sleep(0)
+        time.sleep(0.05)
+        return 42
+
+
+async def test_blocking_call_is_logged(caplog):
+    device = Device(threshold=0.02)
+    assert await device.poll() == 42
+
+    monitor = device.loop_monitor
+    assert monitor.slow_steps == 1
+    assert "Device.read of test blocked the event loop" in caplog.text
+    # The blocking time is attributed to read only, not to poll calling it
+    assert monitor.sections["Device.read"].max >= 0.05
+    assert monitor.sections["Device.poll"].max < 0.02
+    assert monitor.stats()["sections"]["Device.poll"]["count"] == 3
+
+
+async def test_monitored_errors_and_cancellation():
+    monitor = LoopMonitor("test", 1)
+
+    async def fail():
+        await asyncio.sleep(0)
+        raise ValueError
+
+    with pytest.raises(ValueError):
+        await monitor.watch("fail", fail())
+    task = asyncio.create_task(monitor.watch("sleep", asyncio.sleep(10)))
+    await asyncio.sleep(0)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert monitor.slow_steps == 0
+
+
+async def test_slow_device_does_not_block_loop(hass, socket_enabled, caplog):
+    SunSpecApiClient.CLIENT_CACHE = {}
+    SunSpecApiClient.GATEWAY_CACHE = {}
+    server = ModbusTestServer(latency=0.1)
+    host, port = await server.start()
+    entry = create_mock_sunspec_config_entry(
+        hass,
+        data={"host": host, "port": port, "slave_id": 1},
+        options={CONF_LOOP_BLOCK_THRESHOLD: 50},
+    )
+    client = SunSpecApiClient(host=host, port=port, slave_id=1, hass=hass)
+    with patch("sunspec2.modbus.client.time.sleep"):
+        await setup_mock_sunspec_config_entry(hass, config_entry=entry, client=client)
+        coordinator = hass.data[DOMAIN][entry.entry_id]
+        coordinator.api.wrapper_cache = {}
+        coordinator.scheduler.mark_read([103], now=time.monotonic() - 3600)
+        start = time.monotonic()
+        await coordinator.async_refresh()
+    assert coordinator.last_update_success
+    # Every read waited for the device, none of them on the event loop
+    assert time.monotonic() - start >= 0.1
+    monitor = coordinator.loop_monitor
+    assert "SunSpecApiClient.async_read_models" in monitor.sections
+    assert "SunSpecDataUpdateCoordinator._async_refresh" in monitor.sections
+    assert monitor.slow_steps == 0, caplog.text
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    await server.stop()
+    SunSpecApiClient.CLIENT_CACHE = {}
+    SunSpecApiClient.GATEWAY_CACHE = {}
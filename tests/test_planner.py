@@ -0,0 +1,170 @@
+"""Tests for SunSpec read planning."""
+
+from sunspec2.modbus.modbus import ModbusClientException
+
+from custom_components.sunspec.api import SunSpecApiClient
+from custom_components.sunspec.planner import ReadPlan
+from custom_components.sunspec.planner import ScaleFactorCache
+from custom_components.sunspec.planner import WritePlan
+from custom_components.sunspec.planner import model_span
+from custom_components.sunspec.planner import value_ranges
+
+from .conftest import MockModbusClientDevice
+
+
+def scanned_device():
+    device = MockModbusClientDevice()
+    device.scan(connect=False, full_model_read=False)
+    device.requests.clear()
+    return device
+
+
+def test_plan_merges_adjacent_models():
+    device = scanned_device()
+    models = device.models[1] + device.models[304] + device.models[103]
+    plan = ReadPlan(models)
+
+    assert len(plan.spans) == 1
+    span = plan.spans[0]
+    assert span.addr == model_span(device.models[1][0])[0]
+    assert span.count == sum(model_span(m)[1] for m in models)
+    assert plan.num_requests == 2
+    assert all(count <= 125 for _, count in span.blocks())
+
+
+def test_plan_reads_across_small_gap():
+    device = scanned_device()
+    # Model 304 (20 registers) sits between model 1 and 103
+    plan = ReadPlan(device.models[1] + device.models[103], max_gap=20)
+    assert len(plan.spans) == 1
+    assert plan.spans[0].models == device.models[1] + device.models[103]
+
+    plan = ReadPlan(device.models[1] + device.models[103])
+    assert len(plan.spans) == 2
+
+
+def test_plan_execute_fills_models():
+    device = scanned_device()
+    plan = ReadPlan(device.models[103] + device.models[160] + device.models[701])
+    plan.execute(device.read)
+
+    assert len(device.requests) == plan.num_requests
+    assert device.models[103][0].W.cvalue == 800
+    assert device.models[701][0].W.cvalue == 9800
+    assert device.models[701][1].W.cvalue == 9700
+
+
+def test_plan_execute_falls_back_to_model_reads():
+    device = scanned_device()
+
+    def read(addr, count):
+        raise ModbusClientException("illegal address")
+
+    plan = ReadPlan(device.models[1] + device.models[103])
+    plan.execute(read)
+
+    assert len(device.requests) == 2
+    assert device.models[1][0].SN.value == "sn-123456789"
+    assert device.models[103][0].W.cvalue == 800
+
+
+def test_value_ranges_skip_scale_factors():
+    device = scanned_device()
+    model = device.models[160][0]
+    addr, count = model_span(model)
+    # ID, L and the four scale factors lead the model
+    assert value_ranges(model) == [(addr + 6, count - 6)]
+
+
+def test_scale_factor_cache():
+    device = scanned_device()
+    models = device.models[103] + device.models[160]
+    cache = ScaleFactorCache(refresh_interval=60)
+
+    plan = cache.plan(models, now=0)
+    cache.update(plan, plan.execute(device.read), now=0)
+    full = {model: model.get_mb() for model in models}
+
+    plan = cache.plan(models, now=10)
+    assert plan.num_registers < sum(model_span(m)[1] for m in models)
+    # Scale factors changed on the device are not read until the next refresh
+    model = device.models[160][0]
+    offset = (model.model_addr + model.points["DCA_SF"].offset - device.image_addr) * 2
+    device.image[offset : offset + 2] = b"\xff\xfe"
+    images = plan.execute(device.read)
+    cache.update(plan, images, now=10)
+    assert {model: model.get_mb() for model in models} == full
+    assert images[model] == full[model]
+
+    plan = cache.plan(models, now=60)
+    cache.update(plan, plan.execute(device.read), now=60)
+    assert model.points["DCA_SF"].value == -2
+
+    cache.invalidate(model)
+    plan = cache.plan(models, now=61)
+    assert plan.images.keys() == {device.models[103][0]}
+
+
+def test_write_plan_covers_dirty_points():
+    device = scanned_device()
+    model = device.models[704][0]
+    model.read()
+    model.points["PFWInjEna"].value = 1
+    model.points["PFWInjEnaRvrt"].value = 1
+    model.points["WRmp"].value = 20
+
+    plan = WritePlan(model)
+    assert plan.num_requests == 2
+    plan.execute(device.write)
+    assert device.writes == [(model.model_addr + 2, 2), (model.model_addr + 49, 1)]
+    assert WritePlan(model).num_requests == 0
+
+    device.models[704][0].read()
+    assert device.models[704][0].points["WRmp"].value == 20
+
+
+def test_read_keeps_unwritten_values():
+    device = scanned_device()
+    model = device.models[704][0]
+    model.points["WRmp"].value = 20
+
+    ReadPlan([model]).execute(device.read)
+    assert model.points["WRmp"].value == 20
+    assert model.points["WRmp"].dirty
+
+
+async def test_write_model(hass, sunspec_modbus_device_mock):
+    SunSpecApiClient.CLIENT_CACHE = {}
+    api = SunSpecApiClient(
+        host="test", port=123, slave_id=1, hass=hass, settle_times={"704": 0.01}
+    )
+    assert api.settle_time(704) == 0.01
+    assert api.settle_time(103) == 0
+
+    wrapper = await api.async_get_data(704)
+    wrapper.setValueRaw("WRmp", 20)
+    await api.write(704, 0)
+
+    model = sunspec_modbus_device_mock.models[704][0]
+    assert sunspec_modbus_device_mock.writes == [(model.model_addr + 49, 1)]
+    SunSpecApiClient.CLIENT_CACHE = {}
+
+
+async def test_read_models_coalesced(hass, sunspec_modbus_device_mock):
+    SunSpecApiClient.CLIENT_CACHE = {}
+    api = SunSpecApiClient(host="test", port=123, slave_id=1, hass=hass)
+    model_ids = [1, 103, 160, 701, 702, 703, 704]
+
+    wrappers = await api.async_read_models(model_ids)
+
+    assert sorted(wrappers.keys()) == model_ids
+    assert wrappers[701].num_models == 2
+    assert wrappers[103].getValue("W") == 800
+    assert len(sunspec_modbus_device_mock.requests) < len(model_ids)
+
+    # Served from the wrapper cache
+    sunspec_modbus_device_mock.requests.clear()
+    model = await api.async_get_data(103)
+    assert model.getValue("W") == 800
+    assert sunspec_modbus_device_mock.requests == []
+    SunSpecApiClient.CLIENT_CACHE = {}
@@ -0,0 +1,84 @@
+"""Tests for the SunSpec profile service."""
+
+import cProfile
+import pstats
+import time
+import tracemalloc
+
+from homeassistant.exceptions import HomeAssistantError
+import pytest
+
+from custom_components.sunspec.api import SunSpecApiClient
+from custom_components.sunspec.const import DOMAIN
+from custom_components.sunspec.profiler import DATA_PROFILER
+from custom_components.sunspec.profiler import SERVICE_PROFILE
+
+from . import setup_mock_sunspec_config_entry
+
+
+async def test_profile_service(hass, sunspec_modbus_device_mock, tmp_path):
+    SunSpecApiClient.CLIENT_CACHE = {}
+    entry = await setup_mock_sunspec_config_entry(hass)
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+    hass.config.config_dir = str(tmp_path)
+
+    await hass.services.async_call(
+        DOMAIN, SERVICE_PROFILE, {"refreshes": 2, "top": 5}, blocking=True
+    )
+    profiler = hass.data[DATA_PROFILER]
+    assert coordinator.profiler is profiler
+    with pytest.raises(HomeAssistantError):
+        await hass.services.async_call(DOMAIN, SERVICE_PROFILE, {}, blocking=True)
+
+    for _ in range(2):
+        coordinator.api.wrapper_cache = {}
+        coordinator.scheduler.mark_read([103], now=time.monotonic() - 3600)
+        await coordinator.async_refresh()
+    profile_path, snapshot_path = await profiler.done
+    assert coordinator.profiler is None
+    assert DATA_PROFILER not in hass.data
+    assert not tracemalloc.is_tracing()
+
+    functions = {func[2] for func in pstats.Stats(profile_path).stats}
+    # The reads run in the executor, the entity updates on the event loop
+    assert "read_models" in functions
+    assert "_handle_coordinator_update" in functions
+    assert tracemalloc.Snapshot.load(snapshot_path).traces
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    SunSpecApiClient.CLIENT_CACHE = {}
+
+
+async def test_profile_with_other_profiler(hass, sunspec_modbus_device_mock, tmp_path):
+    SunSpecApiClient.CLIENT_CACHE = {}
+    entry = await setup_mock_sunspec_config_entry(hass)
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+    hass.config.config_dir = str(tmp_path)
+
+    other = cProfile.Profile()
+    other.enable()
+    try:
+        with pytest.raises(HomeAssistantError):
+            await hass.services.async_call(DOMAIN, SERVICE_PROFILE, {}, blocking=True)
+    finally:
+        other.disable()
+    assert DATA_PROFILER not in hass.data
+    assert coordinator.profiler is None
+
+    # A profiler started after the service stops profiling, not the refresh
+    await hass.services.async_call(DOMAIN, SERVICE_PROFILE, {}, blocking=True)
+    profiler = hass.data[DATA_PROFILER]
+    other.enable()
+    try:
+        await coordinator.async_refresh()
+    finally:
+        other.disable()
+    assert coordinator.last_update_success
+    assert coordinator.profiler is None
+    assert DATA_PROFILER not in hass.data
+    assert not tracemalloc.is_tracing()
+    with pytest.raises(HomeAssistantError):
+        await profiler.done
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    SunSpecApiClient.CLIENT_CACHE = {}
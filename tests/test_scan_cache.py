@@ -0,0 +1,175 @@
+"""Tests for the SunSpec scan cache."""
+
+from unittest.mock import patch
+
+import pytest
+from sunspec2.modbus.modbus import ModbusClientException
+
+from custom_components.sunspec.api import SunSpecApiClient
+from custom_components.sunspec.const import TRANSPORT_ASYNCIO
+from custom_components.sunspec.const import TRANSPORT_EXECUTOR
+from custom_components.sunspec.scan_cache import async_get_scan_cache
+from custom_components.sunspec.scan_cache import create_model_map
+from custom_components.sunspec.scan_cache import restore_model_map
+from custom_components.sunspec.scan_cache import verify_reads
+
+from .conftest import MockModbusClientDevice
+
+
+def scanned_device():
+    device = MockModbusClientDevice()
+    device.scan(connect=False, full_model_read=False)
+    device.models[1][0].read()
+    return device
+
+
+def read_all(device, entry):
+    return [device.read(*read) for read in verify_reads(entry)]
+
+
+def test_restore_model_map():
+    device = scanned_device()
+    entry = create_model_map(device)
+
+    restored = MockModbusClientDevice()
+    assert restore_model_map(restored, entry, read_all(restored, entry))
+    # The common model, the models with repeating groups and the last model
+    # with the end marker, far fewer reads than models
+    assert len(restored.requests) == len(verify_reads(entry)) == 8
+    assert [m.model_id for m in restored.model_list] == [
+        m.model_id for m in device.model_list
+    ]
+    assert restored.models[1][0].points["SN"].value == "sn-123456789"
+    # Repeating groups are rebuilt from the cached counts
+    assert len(restored.models[160][0].groups["module"]) == 2
+
+    for model in restored.model_list:
+        model.read()
+    for model, orig in zip(restored.model_list, device.model_list):
+        orig.read()
+        assert model.get_mb() == orig.get_mb()
+
+
+def test_restore_model_map_other_device():
+    entry = create_model_map(scanned_device())
+    entry["serial"] = "another"
+
+    restored = MockModbusClientDevice()
+    assert not restore_model_map(restored, entry, read_all(restored, entry))
+    assert restored.model_list == []
+
+
+@pytest.mark.parametrize("change", ["moved", "length", "counts", "last"])
+def test_restore_model_map_changed_models(change):
+    """Models moved by a firmware update, the serial number stays the same"""
+    entry = create_model_map(scanned_device())
+    model_705 = next(item for item in entry["models"] if item["id"] == 705)
+    if change == "moved":
+        for item in entry["models"][1:]:
+            item["addr"] += 2
+    elif change == "length":
+        entry["models"][-1]["len"] += 1
+    elif change == "counts":
+        model_705["counts"]["NCrv"] += 1
+    else:
+        entry["models"].pop()
+
+    restored = MockModbusClientDevice()
+    assert not restore_model_map(restored, entry, read_all(restored, entry))
+
+
+async def test_scan_cache_skips_scan(hass):
+    devices = []
+
+    def create_device(*args, **kwargs):
+        devices.append(MockModbusClientDevice())
+        return devices[-1]
+
+    with patch(
+        "sunspec2.modbus.client.SunSpecModbusClientDeviceTCP", side_effect=create_device
+    ), patch(
+        "custom_components.sunspec.SunSpecApiClient.check_port", return_value=True
+    ), patch(
+        "sunspec2.modbus.client.time.sleep"
+    ):
+        SunSpecApiClient.CLIENT_CACHE = {}
+        api = SunSpecApiClient(host="test", port=123, slave_id=1, hass=hass)
+        assert await api.async_get_models() == [1, 103, 160, 304] + list(
+            range(701, 713)
+        )
+        assert len(devices[0].requests) > 1
+        assert (await async_get_scan_cache(hass)).get("test:123:1") is not None
+
+        SunSpecApiClient.CLIENT_CACHE = {}
+        api = SunSpecApiClient(host="test", port=123, slave_id=1, hass=hass)
+        assert await api.async_get_models() == [1, 103, 160, 304] + list(
+            range(701, 713)
+        )
+        cache = await async_get_scan_cache(hass)
+        assert len(devices[1].requests) == len(verify_reads(cache.get("test:123:1")))
+
+        # A map that does not match the device is replaced by a new scan
+        cache.get("test:123:1")["models"][-1]["len"] += 1
+        SunSpecApiClient.CLIENT_CACHE = {}
+        api = SunSpecApiClient(host="test", port=123, slave_id=1, hass=hass)
+        await api.async_get_models()
+        assert len(devices[2].requests) > 8
+        assert cache.get("test:123:1") == create_model_map(devices[2])
+    SunSpecApiClient.CLIENT_CACHE = {}
+
+
+async def test_scan_cache_asyncio(hass, modbus_server):
+    host, port = modbus_server.address
+    SunSpecApiClient.ASYNC_CLIENT_CACHE = {}
+    api = SunSpecApiClient(
+        host=host, port=port, slave_id=1, hass=hass, transport=TRANSPORT_ASYNCIO
+    )
+    models = await api.async_get_models()
+    await api.async_close()
+
+    modbus_server.requests.clear()
+    SunSpecApiClient.ASYNC_CLIENT_CACHE = {}
+    api = SunSpecApiClient(
+        host=host, port=port, slave_id=1, hass=hass, transport=TRANSPORT_ASYNCIO
+    )
+    assert await api.async_get_models() == models
+    assert len(modbus_server.requests) == 8
+
+    device_info = await api.async_get_device_info()
+    assert device_info.getValue("SN") == "sn-123456789"
+    await api.async_close()
+    SunSpecApiClient.ASYNC_CLIENT_CACHE = {}
+
+
+@pytest.mark.parametrize("transport", [TRANSPORT_EXECUTOR, TRANSPORT_ASYNCIO])
+async def test_scan_cache_read_error(hass, modbus_server, transport):
+    SunSpecApiClient.CLIENT_CACHE = {}
+    SunSpecApiClient.GATEWAY_CACHE = {}
+    SunSpecApiClient.ASYNC_CLIENT_CACHE = {}
+    host, port = modbus_server.address
+    key = f"{host}:{port}:1"
+
+    def create_api():
+        return SunSpecApiClient(
+            host=host, port=port, slave_id=1, hass=hass, transport=transport
+        )
+
+    with patch("sunspec2.modbus.client.time.sleep"):
+        models = await create_api().async_get_models()
+        cache = await async_get_scan_cache(hass)
+        assert cache.get(key) is not None
+        SunSpecApiClient.CLIENT_CACHE = {}
+        SunSpecApiClient.ASYNC_CLIENT_CACHE = {}
+        api = create_api()
+        assert await api.async_get_models() == models
+
+        # The device no longer has the registers of the last model
+        del modbus_server.image[-20:]
+        with pytest.raises(ModbusClientException):
+            await api.async_read_models([160])
+    assert cache.get(key) is None
+    assert api.connection is None
+    await api.async_close()
+    SunSpecApiClient.CLIENT_CACHE = {}
+    SunSpecApiClient.GATEWAY_CACHE = {}
+    SunSpecApiClient.ASYNC_CLIENT_CACHE = {}
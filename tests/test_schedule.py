@@ -0,0 +1,115 @@
+"""Tests for per model polling intervals."""
+
+import time
+from unittest.mock import patch
+
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.sunspec import SunSpecDataUpdateCoordinator
+from custom_components.sunspec.api import SunSpecApiClient
+from custom_components.sunspec.const import CONF_ENABLED_MODELS
+from custom_components.sunspec.const import CONF_MODEL_INTERVALS
+from custom_components.sunspec.const import DOMAIN
+from custom_components.sunspec.schedule import ModelScheduler
+from custom_components.sunspec.schedule import default_model_interval
+
+from .const import MOCK_CONFIG
+
+
+def test_default_model_interval():
+    assert default_model_interval(1, 30) == 3600
+    assert default_model_interval(121, 30) == 300
+    assert default_model_interval(704, 30) == 300
+    assert default_model_interval(103, 30) == 30
+    assert default_model_interval(121, 600) == 600
+
+
+def test_model_scheduler():
+    scheduler = ModelScheduler({"1": 120}, 30)
+    assert scheduler.tick == 30
+    assert scheduler.due([1, 103], now=0) == {1, 103}
+    scheduler.mark_read([1, 103], now=0)
+    assert scheduler.due([1, 103], now=30) == {103}
+    # Read on the tick closest to the due time
+    assert scheduler.due([1, 103], now=106) == {1, 103}
+
+    scheduler.mark_read([1, 103], now=106)
+    scheduler.expire([1])
+    assert scheduler.due([1, 103], now=110) == {1}
+
+
+async def test_coordinator_reads_due_models(hass, sunspec_modbus_device_mock):
+    SunSpecApiClient.CLIENT_CACHE = {}
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data=MOCK_CONFIG,
+        options={CONF_ENABLED_MODELS: [1, 103], CONF_MODEL_INTERVALS: {"103": 10}},
+    )
+    api = SunSpecApiClient(host="test", port=123, slave_id=1, hass=hass)
+    coordinator = SunSpecDataUpdateCoordinator(hass, client=api, entry=entry)
+    assert coordinator.update_interval.total_seconds() == 10
+
+    await coordinator.async_refresh()
+    assert set(coordinator.data.keys()) == {1, 103}
+    common = coordinator.data[1]
+
+    api.wrapper_cache = {}
+    sunspec_modbus_device_mock.requests.clear()
+    # Model 103 is due after 10s, the common model after an hour
+    coordinator.scheduler.mark_read([1, 103], now=time.monotonic() - 10)
+    await coordinator.async_refresh()
+    assert coordinator.data[1] is common
+    model = sunspec_modbus_device_mock.models[103][0]
+    # The header and scale factors are not read again
+    assert sunspec_modbus_device_mock.requests == [(model.model_addr + 2, model.len)]
+    coordinator.unsub()
+    await coordinator.async_close()
+    SunSpecApiClient.CLIENT_CACHE = {}
+
+
+async def test_coordinator_reads_models_once(hass, sunspec_modbus_device_mock):
+    SunSpecApiClient.CLIENT_CACHE = {}
+    entry = MockConfigEntry(
+        domain=DOMAIN, data=MOCK_CONFIG, options={CONF_ENABLED_MODELS: [1, 103]}
+    )
+    # A poll that takes longer than the cache time of the models
+    api = SunSpecApiClient(
+        host="test", port=123, slave_id=1, hass=hass, cache_ttls={"1": 0, "103": 0}
+    )
+    coordinator = SunSpecDataUpdateCoordinator(hass, client=api, entry=entry)
+    await coordinator.async_refresh()
+
+    sunspec_modbus_device_mock.requests.clear()
+    coordinator.scheduler.mark_read([103], now=time.monotonic() - 3600)
+    await coordinator.async_refresh()
+    model = sunspec_modbus_device_mock.models[103][0]
+    assert sunspec_modbus_device_mock.requests == [(model.model_addr + 2, model.len)]
+    coordinator.unsub()
+    await coordinator.async_close()
+    SunSpecApiClient.CLIENT_CACHE = {}
+
+
+async def test_coordinator_caches_model_ids(hass, sunspec_modbus_device_mock):
+    SunSpecApiClient.CLIENT_CACHE = {}
+    entry = MockConfigEntry(
+        domain=DOMAIN, data=MOCK_CONFIG, options={CONF_ENABLED_MODELS: [1, 103, 999]}
+    )
+    api = SunSpecApiClient(host="test", port=123, slave_id=1, hass=hass)
+    coordinator = SunSpecDataUpdateCoordinator(hass, client=api, entry=entry)
+
+    with patch.object(
+        api, "async_get_models", wraps=api.async_get_models
+    ) as get_models:
+        await coordinator.async_refresh()
+        await coordinator.async_refresh()
+        assert get_models.call_count == 1
+        assert set(coordinator.data.keys()) == {1, 103}
+
+        # A new connection may be a different device
+        api.reconnect_next()
+        await api.async_reconnect()
+        await coordinator.async_refresh()
+        assert get_models.call_count == 2
+    coordinator.unsub()
+    await coordinator.async_close()
+    SunSpecApiClient.CLIENT_CACHE = {}
@@ -0,0 +1,48 @@
+"""Tests for the simulated SunSpec Modbus TCP devices."""
+
+import pytest
+from sunspec2.modbus.modbus import ModbusClientError
+
+from custom_components.sunspec.transport import AsyncModbusTCPClient
+
+from .modbus_server import ModbusSimulator
+from .modbus_server import ModbusTestServer
+
+
+async def test_simulator_units_and_ports(socket_enabled):
+    simulator = ModbusSimulator(ports=2, units=3)
+    addresses = await simulator.start()
+    assert len(simulator.devices) == 6
+
+    transports = [AsyncModbusTCPClient(*address) for address in addresses]
+    await transports[0].write(1, 40010, b"\x00\x07")
+    assert await transports[0].read(1, 40010, 1) == b"\x00\x07"
+    # Every unit on every port has its own registers
+    assert await transports[0].read(2, 40010, 1) != b"\x00\x07"
+    assert await transports[1].read(1, 40010, 1) != b"\x00\x07"
+    assert simulator.requests == 4
+
+    for transport in transports:
+        await transport.close()
+    await simulator.stop()
+
+
+async def test_simulator_faults(socket_enabled):
+    server = ModbusTestServer(drop_rate=1, max_connections=1)
+    address = await server.start()
+
+    transport = AsyncModbusTCPClient(*address)
+    with pytest.raises(ModbusClientError):
+        await transport.read(1, 40000, 2)
+    assert server.dropped == 1
+
+    server.drop_rate = 0
+    other = AsyncModbusTCPClient(*address)
+    assert await other.read(1, 40000, 2) == b"SunS"
+    with pytest.raises(ModbusClientError):
+        await transport.read(1, 40000, 2)
+    assert server.refused == 1
+
+    await other.close()
+    await transport.close()
+    await server.stop()
@@ -0,0 +1,33 @@
+"""Tests for the enum and bitfield symbol tables."""
+
+from custom_components.sunspec.symbols import SymbolTable
+
+SYMBOLS = [
+    {"name": "OFF", "value": 1},
+    {"name": "SLEEPING", "value": 2},
+    {"name": "MPPT", "value": 4},
+]
+
+
+def test_enum_lookup():
+    table = SymbolTable(SYMBOLS)
+    assert table.names == ["OFF", "SLEEPING", "MPPT"]
+    assert table.enum_name(2) == "SLEEPING"
+    assert table.enum_name(3) is None
+    assert table.value("MPPT") == 4
+    assert table.value("Missing") is None
+
+
+def test_enum_duplicate_symbols():
+    table = SymbolTable(SYMBOLS + [{"name": "STANDBY", "value": 2}])
+    assert table.enum_name(2) is None
+    assert table.value("STANDBY") == 2
+
+
+def test_bitfield_lookup():
+    table = SymbolTable(SYMBOLS)
+    assert table.bitfield_names(0) == ""
+    assert table.bitfield_names((1 << 1) | (1 << 4)) == "OFF,MPPT"
+    # Repeated bitmasks come from the cache
+    assert table.bitfield_names(1 << 2) == "SLEEPING"
+    assert (1 << 2) in table._bitmasks
@@ -0,0 +1,98 @@
+"""Tests for the poll telemetry of SunSpec devices."""
+
+from unittest.mock import patch
+
+import pytest
+
+from custom_components.sunspec.api import SunSpecApiClient
+from custom_components.sunspec.const import CONF_TELEMETRY_SENSORS
+from custom_components.sunspec.const import DOMAIN
+from custom_components.sunspec.const import TRANSPORT_ASYNCIO
+from custom_components.sunspec.const import TRANSPORT_EXECUTOR
+from custom_components.sunspec.diagnostics import async_get_config_entry_diagnostics
+from custom_components.sunspec.telemetry import LatencyHistogram
+from custom_components.sunspec.worker import find_worker
+from custom_components.sunspec.worker import shutdown_workers
+
+from . import create_mock_sunspec_config_entry
+from . import setup_mock_sunspec_config_entry
+
+
+def test_latency_histogram():
+    histogram = LatencyHistogram(bounds=(0.1, 1))
+    assert histogram.quantile(0.5) is None
+    for seconds in (0.05, 0.1, 0.5, 3):
+        histogram.observe(seconds)
+    assert histogram.buckets == [2, 1, 1]
+    assert histogram.quantile(0.5) == 0.1
+    assert histogram.quantile(0.75) == 1
+    # Above the largest bound the maximum is the best estimate
+    assert histogram.quantile(1) == 3
+    assert histogram.as_dict()["buckets"] == {"0.1": 2, "1": 1, "+Inf": 1}
+
+
+@pytest.mark.parametrize("transport", [TRANSPORT_EXECUTOR, TRANSPORT_ASYNCIO])
+async def test_telemetry_counts_requests(hass, modbus_server, transport):
+    SunSpecApiClient.CLIENT_CACHE = {}
+    SunSpecApiClient.GATEWAY_CACHE = {}
+    SunSpecApiClient.ASYNC_CLIENT_CACHE = {}
+    SunSpecApiClient.ASYNC_GATEWAY_CACHE = {}
+    host, port = modbus_server.address
+    api = SunSpecApiClient(
+        host=host, port=port, slave_id=1, hass=hass, transport=transport
+    )
+
+    with patch(
+        "custom_components.sunspec.SunSpecApiClient.check_port", return_value=True
+    ), patch("sunspec2.modbus.client.time.sleep"):
+        await api.async_read_models([103, 160])
+        api.wrapper_cache = {}
+        await api.async_read_models([103])
+
+    telemetry = api.telemetry
+    assert telemetry.transactions == len(modbus_server.requests)
+    assert telemetry.registers_read == sum(r[3] for r in modbus_server.requests)
+    assert telemetry.bytes_read == 2 * telemetry.registers_read
+    assert telemetry.connects == 1
+    assert telemetry.reconnects == 0
+    assert telemetry.lock_wait.count == 2
+    assert telemetry.model_latency[103].count == 2
+    assert telemetry.model_latency[160].count == 1
+    await api.async_close()
+
+
+async def test_diagnostics_and_sensors(hass, sunspec_modbus_device_mock):
+    SunSpecApiClient.CLIENT_CACHE = {}
+    entry = create_mock_sunspec_config_entry(
+        hass, options={CONF_TELEMETRY_SENSORS: True}
+    )
+    # The I/O worker of the client is the one of the entry's gateway
+    client = SunSpecApiClient(
+        host=entry.data["host"], port=entry.data["port"], slave_id=1, hass=hass
+    )
+    await setup_mock_sunspec_config_entry(hass, config_entry=entry, client=client)
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+
+    diagnostics = await async_get_config_entry_diagnostics(hass, entry)
+    assert diagnostics["entry"]["data"]["host"] == "**REDACTED**"
+    assert diagnostics["coordinator"]["models"] == sorted(coordinator.data)
+    telemetry = diagnostics["telemetry"]
+    assert telemetry["refresh"]["count"] == 1
+    assert telemetry["refresh_errors"] == 0
+    assert "103" in telemetry["model_latency"]
+    assert diagnostics["fleet"]["members"] == 1
+    assert diagnostics["worker"]["jobs"] > 0
+
+    # Diagnostics do not start a worker for a gateway without one
+    shutdown_workers()
+    diagnostics = await async_get_config_entry_diagnostics(hass, entry)
+    assert diagnostics["worker"] is None
+    assert find_worker(coordinator.gateway) is None
+
+    state = hass.states.get("sensor.common_refresh_duration")
+    assert state is not None
+    assert float(state.state) == pytest.approx(coordinator.api.telemetry.refresh.last)
+    assert hass.states.get("sensor.common_bytes_read") is not None
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    SunSpecApiClient.CLIENT_CACHE = {}
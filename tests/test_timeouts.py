@@ -0,0 +1,59 @@
+"""Tests for adaptive request timeouts."""
+
+import time
+
+import pytest
+from sunspec2.modbus.modbus import ModbusClientTimeout
+
+from custom_components.sunspec.gateway import SunSpecGateway
+from custom_components.sunspec.timeouts import MAX_READ_TIMEOUT
+from custom_components.sunspec.timeouts import MIN_READ_TIMEOUT
+from custom_components.sunspec.timeouts import AdaptiveTimeout
+from custom_components.sunspec.transport import AsyncModbusTCPClient
+
+
+def test_adaptive_timeout():
+    timeout = AdaptiveTimeout()
+    assert timeout.timeout == MAX_READ_TIMEOUT
+
+    for _ in range(20):
+        timeout.sample(0.01)
+    assert timeout.timeout == MIN_READ_TIMEOUT
+
+    timeout = AdaptiveTimeout()
+    for i in range(20):
+        timeout.sample(0.8 if i % 2 else 1.6)
+    assert MIN_READ_TIMEOUT < timeout.timeout < MAX_READ_TIMEOUT
+
+    timeout.backoff()
+    timeout.backoff()
+    assert timeout.timeout == MAX_READ_TIMEOUT
+
+
+async def test_transport_timeout(modbus_server):
+    transport = AsyncModbusTCPClient(*modbus_server.address)
+    transport.timeouts[1] = AdaptiveTimeout(min_timeout=0.05, max_timeout=0.2)
+    await transport.read(1, 40000, 2)
+    assert transport.timeouts[1].srtt is not None
+
+    modbus_server.delay = 1
+    start = time.monotonic()
+    with pytest.raises(ModbusClientTimeout):
+        await transport.read(1, 40000, 2)
+    assert time.monotonic() - start < 0.5
+    assert not transport.is_connected
+    await transport.close()
+
+
+async def test_gateway_timeout(hass, modbus_server):
+    gateway = SunSpecGateway(*modbus_server.address)
+    unit = gateway.unit_client(1)
+    unit.timeout = AdaptiveTimeout(min_timeout=0.05, max_timeout=0.2)
+    assert await hass.async_add_executor_job(unit.read, 40000, 2) == b"SunS"
+
+    modbus_server.delay = 1
+    start = time.monotonic()
+    with pytest.raises(ModbusClientTimeout):
+        await hass.async_add_executor_job(unit.read, 40000, 2)
+    assert time.monotonic() - start < 0.5
+    assert not gateway.is_connected()
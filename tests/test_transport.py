@@ -0,0 +1,116 @@
+"""Tests for the SunSpec asyncio Modbus transport."""
+
+import asyncio
+
+import pytest
+from sunspec2.modbus.modbus import ModbusClientError
+from sunspec2.modbus.modbus import ModbusClientException
+
+from custom_components.sunspec.api import SunSpecApiClient
+from custom_components.sunspec.const import TRANSPORT_ASYNCIO
+from custom_components.sunspec.transport import AsyncModbusTCPClient
+
+
+def create_asyncio_api(hass, server):
+    SunSpecApiClient.ASYNC_CLIENT_CACHE = {}
+    SunSpecApiClient.ASYNC_GATEWAY_CACHE = {}
+    host, port = server.address
+    return SunSpecApiClient(
+        host=host, port=port, slave_id=1, hass=hass, transport=TRANSPORT_ASYNCIO
+    )
+
+
+async def test_transport_read_write(modbus_server):
+    transport = AsyncModbusTCPClient(*modbus_server.address)
+
+    assert await transport.read(1, 40000, 2) == b"SunS"
+    # Reads larger than a single request are split
+    data = await transport.read(1, 40000, 300)
+    assert len(data) == 600
+    assert len(modbus_server.requests) == 4
+
+    await transport.write(1, 40010, b"\x00\x07")
+    await transport.write(1, 40011, b"\x00\x08\x00\x09")
+    assert await transport.read(1, 40010, 3) == b"\x00\x07\x00\x08\x00\x09"
+
+    with pytest.raises(ModbusClientException):
+        await transport.read(1, 1, 1)
+    assert transport.connect_count == 1
+    await transport.close()
+
+
+async def test_transport_cancelled_request(modbus_server):
+    transport = AsyncModbusTCPClient(*modbus_server.address)
+    modbus_server.delay = 0.1
+    task = asyncio.create_task(transport.read(1, 40000, 2))
+    await asyncio.sleep(0.05)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    # The late response must not be read by the next request
+    assert not transport.is_connected
+    assert await transport.read(1, 40002, 1) == b"\x00\x01"
+    await transport.close()
+
+
+async def test_transport_short_response(modbus_server):
+    transport = AsyncModbusTCPClient(*modbus_server.address)
+    process = modbus_server.process
+    modbus_server.process = lambda unit_id, pdu: process(unit_id, pdu)[:-2]
+    with pytest.raises(ModbusClientError):
+        await transport.read(1, 40000, 2)
+    await transport.close()
+
+
+async def test_asyncio_api(hass, modbus_server):
+    api = create_asyncio_api(hass, modbus_server)
+
+    models = await api.async_get_models()
+    assert models == [1, 103, 160, 304] + list(range(701, 713))
+
+    device_info = await api.async_get_device_info()
+    assert device_info.getValue("Mn") == "SunSpecTest"
+    assert device_info.getValue("SN") == "sn-123456789"
+
+    model = await api.async_get_data(701)
+    assert model.num_models == 2
+    assert model.getValue("W") == 9800
+    assert model.getValue("W", 1) == 9700
+
+    modbus_server.requests.clear()
+    api.wrapper_cache = {}
+    await api.async_read_models([1, 103, 304])
+    assert len(modbus_server.requests) == 2
+    await api.async_close()
+
+
+async def test_asyncio_api_write(hass, modbus_server):
+    api = create_asyncio_api(hass, modbus_server)
+
+    model = await api.async_get_data(703)
+    model.setValue("ESDlyTms", 200)
+    modbus_server.requests.clear()
+    await api.write(703, 0)
+    assert [r[1:] for r in modbus_server.requests] == [
+        (16, model.getPoint("ESDlyTms").model.model_addr + 9, 2)
+    ]
+
+    api.wrapper_cache = {}
+    SunSpecApiClient.ASYNC_CLIENT_CACHE = {}
+    model = await api.async_get_data(703)
+    assert model.getValue("ESDlyTms") == 200
+    await api.async_close()
+
+
+async def test_asyncio_scan_within_models(hass, modbus_server):
+    modbus_server.reject_cross_model_reads = True
+    api = create_asyncio_api(hass, modbus_server)
+
+    models = await api.async_get_models()
+    assert models == [1, 103, 160, 304] + list(range(701, 713))
+    # The header of each model is read on its own, then the model
+    headers = [r[2] for r in modbus_server.requests if r[3] == 2]
+    assert headers == [40000] + modbus_server.model_addrs
+    model = await api.async_get_data(701)
+    assert model.getValue("W") == 9800
+    await api.async_close()
@@ -0,0 +1,97 @@
+"""Tests for the I/O worker threads of SunSpec gateways."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from custom_components.sunspec.api import SunSpecApiClient
+from custom_components.sunspec.telemetry import LatencyHistogram
+from custom_components.sunspec.worker import IOWorker
+from custom_components.sunspec.worker import get_worker
+from custom_components.sunspec.worker import shutdown_workers
+
+from . import setup_mock_sunspec_config_entry
+
+
+async def test_worker_runs_jobs_in_order():
+    worker = IOWorker("test:1")
+    calls = []
+    queue_wait = LatencyHistogram()
+    results = await asyncio.gather(
+        *(worker.async_run(calls.append, i, queue_wait=queue_wait) for i in range(5))
+    )
+    assert results == [None] * 5
+    assert calls == list(range(5))
+    assert worker.jobs == 5
+    assert worker.queue_wait.count == queue_wait.count == 5
+
+    with pytest.raises(ZeroDivisionError):
+        await worker.async_run(lambda: 1 / 0)
+    worker.stop().join()
+
+
+async def test_worker_skips_cancelled_jobs():
+    worker = IOWorker("test:1")
+    release = threading.Event()
+    calls = []
+    blocked = asyncio.create_task(worker.async_run(release.wait))
+    skipped = asyncio.create_task(worker.async_run(calls.append, "skipped"))
+    await asyncio.sleep(0)
+    skipped.cancel()
+    release.set()
+    assert await blocked
+    await worker.async_run(calls.append, "run")
+    assert calls == ["run"]
+    assert skipped.cancelled()
+    worker.stop().join()
+
+
+async def test_stuck_gateway_does_not_stall_others():
+    stuck = get_worker("stuck:502")
+    release = threading.Event()
+    blocked = asyncio.create_task(stuck.async_run(release.wait))
+    await asyncio.sleep(0)
+
+    start = time.monotonic()
+    assert await get_worker("other:502").async_run(sum, [1, 2]) == 3
+    assert time.monotonic() - start < 1
+    assert stuck.queue_depth == 0 and not blocked.done()
+    release.set()
+    await blocked
+
+
+async def test_worker_ends_when_idle():
+    worker = IOWorker("test:1", idle_timeout=0.01)
+    await worker.async_run(time.sleep, 0)
+    while worker.running:
+        await asyncio.sleep(0.01)
+    # The next job starts a new thread
+    assert await worker.async_run(abs, -1) == 1
+    worker.stop().join()
+
+
+async def test_shutdown_does_not_wait_for_stuck_worker(caplog):
+    stuck = get_worker("stuck:502")
+    release = threading.Event()
+    blocked = asyncio.create_task(stuck.async_run(release.wait))
+    await asyncio.sleep(0)
+
+    start = time.monotonic()
+    shutdown_workers(timeout=0.05)
+    assert time.monotonic() - start < 1
+    assert "The I/O worker of stuck:502 did not stop in time" in caplog.text
+    release.set()
+    await blocked
+    while any(thread.name == "sunspec stuck:502" for thread in threading.enumerate()):
+        await asyncio.sleep(0.01)
+
+
+async def test_api_io_runs_on_gateway_worker(hass, sunspec_modbus_device_mock):
+    SunSpecApiClient.CLIENT_CACHE = {}
+    await setup_mock_sunspec_config_entry(hass)
+    worker = get_worker("test:123")
+    assert worker.jobs > 0
+    assert worker.queue_wait.count == worker.jobs
+    SunSpecApiClient.CLIENT_CACHE = {}
@@ -0,0 +1,153 @@
+"""Tests for the SunSpec write queue."""
+
+import asyncio
+from unittest.mock import patch
+
+import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.sunspec import SunSpecDataUpdateCoordinator
+from custom_components.sunspec.api import ModelWrapperCacheItem
+from custom_components.sunspec.api import SunSpecApiClient
+from custom_components.sunspec.api import SunSpecModelWrapper
+from custom_components.sunspec.const import CONF_ENABLED_MODELS
+from custom_components.sunspec.const import DOMAIN
+from custom_components.sunspec.write_queue import WriteQueue
+
+from .const import MOCK_CONFIG
+
+
+async def test_write_queue_merges_writes(hass, sunspec_modbus_device_mock):
+    SunSpecApiClient.CLIENT_CACHE = {}
+    entry = MockConfigEntry(
+        domain=DOMAIN, data=MOCK_CONFIG, options={CONF_ENABLED_MODELS: [704]}
+    )
+    api = SunSpecApiClient(host="test", port=123, slave_id=1, hass=hass)
+    coordinator = SunSpecDataUpdateCoordinator(hass, client=api, entry=entry)
+    coordinator.write_queue = WriteQueue(hass, coordinator, delay=0.01)
+    await coordinator.async_refresh()
+
+    wrapper = coordinator.data[704]
+    wrapper.setValueRaw("PFWInjEna", 1)
+    wrapper.setValueRaw("PFWInjEnaRvrt", 1)
+    wrapper.setValueRaw("WRmp", 20)
+    sunspec_modbus_device_mock.requests.clear()
+    with patch.object(coordinator, "async_refresh") as full_refresh, patch.object(
+        coordinator, "async_refresh_models", wraps=coordinator.async_refresh_models
+    ) as refresh:
+        await asyncio.gather(
+            coordinator.write_queue.async_write(704, 0),
+            coordinator.write_queue.async_write(704, 0),
+            coordinator.write_queue.async_write(704, 0),
+        )
+    assert refresh.call_count == 1
+    assert full_refresh.call_count == 0
+
+    model = sunspec_modbus_device_mock.models[704][0]
+    assert sunspec_modbus_device_mock.writes == [
+        (model.model_addr + 2, 2),
+        (model.model_addr + 49, 1),
+    ]
+    # Only the written model is read back
+    assert sunspec_modbus_device_mock.requests == [(model.model_addr, model.len + 2)]
+    assert coordinator.data[704].getValueRaw("WRmp") == 20
+    coordinator.unsub()
+    await coordinator.async_close()
+    SunSpecApiClient.CLIENT_CACHE = {}
+
+
+async def test_write_read_back_is_fresh(hass, sunspec_modbus_device_mock):
+    SunSpecApiClient.CLIENT_CACHE = {}
+    entry = MockConfigEntry(
+        domain=DOMAIN, data=MOCK_CONFIG, options={CONF_ENABLED_MODELS: [704]}
+    )
+    api = SunSpecApiClient(host="test", port=123, slave_id=1, hass=hass)
+    coordinator = SunSpecDataUpdateCoordinator(hass, client=api, entry=entry)
+    coordinator.write_queue = WriteQueue(hass, coordinator, delay=0.01)
+    await coordinator.async_refresh()
+
+    model = sunspec_modbus_device_mock.models[704][0]
+    stale = SunSpecModelWrapper([model], {model: model.get_mb()})
+    # A poll that started before the write and is still running
+    poll = hass.loop.create_future()
+    api._inflight[704] = poll
+    write = api._async_write
+
+    async def write_during_poll(*args):
+        await write(*args)
+        # A read cached the values from before the write meanwhile
+        api.wrapper_cache[704] = ModelWrapperCacheItem(stale, 60)
+
+    coordinator.data[704].setValueRaw("WRmp", 20)
+    with patch.object(api, "_async_write", write_during_poll):
+        await asyncio.wait_for(coordinator.write_queue.async_write(704, 0), 5)
+    assert stale.getValueRaw("WRmp") != 20
+    assert coordinator.data[704].getValueRaw("WRmp") == 20
+    # The read back did not wait for the poll
+    assert not poll.done()
+
+    poll.cancel()
+    coordinator.unsub()
+    await coordinator.async_close()
+    SunSpecApiClient.CLIENT_CACHE = {}
+
+
+async def test_write_queue_error(hass):
+    coordinator = SunSpecDataUpdateCoordinator(
+        hass,
+        client=SunSpecApiClient(host="test", port=123, slave_id=1, hass=hass),
+        entry=MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG),
+    )
+    queue = WriteQueue(hass, coordinator, delay=0.01)
+    with patch.object(
+        coordinator.api, "write", side_effect=ConnectionError
+    ), patch.object(coordinator, "async_refresh_models"):
+        with pytest.raises(ConnectionError):
+            await queue.async_write(704, 0)
+    coordinator.unsub()
+
+
+async def test_refused_write_is_dropped(hass, modbus_server):
+    SunSpecApiClient.CLIENT_CACHE = {}
+    SunSpecApiClient.GATEWAY_CACHE = {}
+    host, port = modbus_server.address
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={"host": host, "port": port, "slave_id": 1},
+        options={CONF_ENABLED_MODELS: [704]},
+    )
+    api = SunSpecApiClient(host=host, port=port, slave_id=1, hass=hass)
+    with patch(
+        "custom_components.sunspec.SunSpecApiClient.check_port", return_value=True
+    ), patch("sunspec2.modbus.client.time.sleep"):
+        coordinator = SunSpecDataUpdateCoordinator(hass, client=api, entry=entry)
+        coordinator.write_queue = WriteQueue(hass, coordinator, delay=0.01)
+        await coordinator.async_refresh()
+        enabled = coordinator.data[704].getValueRaw("PFWInjEna")
+
+        # Two adjacent points, written with a single FC16 request
+        coordinator.data[704].setValueRaw("PFWInjEna", 1)
+        coordinator.data[704].setValueRaw("PFWInjEnaRvrt", 1)
+        modbus_server.reject_writes = True
+        with pytest.raises(Exception):
+            await coordinator.write_queue.async_write(704, 0)
+        assert modbus_server.requests[-2][1] == 16
+        # The value of the device is shown again
+        assert coordinator.data[704].getValueRaw("PFWInjEna") == enabled
+
+        modbus_server.reject_writes = False
+        modbus_server.requests.clear()
+        coordinator.data[704].setValueRaw("WRmp", 20)
+        await coordinator.write_queue.async_write(704, 0)
+
+    model = api.connection.client.models[704][0]
+    # Only the new value is written, the refused ones are not sent again
+    assert [r for r in modbus_server.requests if r[1] != 3] == [
+        (1, 6, model.model_addr + 49, 1)
+    ]
+    assert coordinator.data[704].getValueRaw("WRmp") == 20
+    assert coordinator.data[704].getValueRaw("PFWInjEna") == enabled
+    coordinator.unsub()
+    await coordinator.async_close()
+    SunSpecApiClient.CLIENT_CACHE = {}
+    SunSpecApiClient.GATEWAY_CACHE = {}